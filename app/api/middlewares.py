@@ -0,0 +1,65 @@
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import configuration
+from app.utils.compression import compress, negotiate_encoding, should_compress
+
+
+class CompressionMiddleware:
+    """
+    Compresses the response body with the encoding negotiated from the `Accept-Encoding` header of the request.
+    Responses that are already encoded (say pre-compressed cached payloads), streamed, small or not text like are
+    sent as they are. Large bodies (say the papers shuffled for a candidate) are compressed in the threadpool.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message
+
+            # Headers can only be decided once the body is available, so hold the start message till then
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            initial_message, start_message = start_message, None
+            headers = MutableHeaders(raw=initial_message["headers"])
+            body = message.get("body", b"")
+            if (
+                "content-encoding" in headers
+                or message.get("more_body", False)
+                or not should_compress(len(body), headers.get("content-type"))
+            ):
+                await send(initial_message)
+                await send(message)
+                return
+
+            if len(body) >= configuration.COMPRESSION_THREADPOOL_SIZE:
+                body = await run_in_threadpool(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
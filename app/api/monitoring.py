@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette import status as http_status
+
+from app.config import configuration
+from app.core.db.session import get_async_engine
+from app.core.metrics import db_pool_connections, metrics_registry
+from app.core.readiness import readiness
+
+monitoring_router = APIRouter(tags=["Monitoring"])
+
+
+@monitoring_router.get(path="/metrics", status_code=http_status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics of this worker in the Prometheus text format"""
+    # Pool usage is read at scrape time, the pool keeps these numbers anyway
+    pool = get_async_engine().pool
+    db_pool_connections.set("size", value=pool.size())
+    db_pool_connections.set("checked_out", value=pool.checkedout())
+    db_pool_connections.set("overflow", value=max(pool.overflow(), 0))
+    db_pool_connections.set("max_overflow", value=configuration.POSTGRES_MAX_OVERFLOW)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@monitoring_router.get(path="/ready", status_code=http_status.HTTP_200_OK, response_class=ORJSONResponse)
+async def get_readiness():
+    """Readiness of this worker, 503 until the startup is complete and the pool is warm"""
+    if readiness.startup_duration is not None and not readiness.is_ready:
+        # A required stage failed at the startup, e.g. the database was down, so it is tried again
+        await readiness.retry()
+
+    status_code = http_status.HTTP_200_OK if readiness.is_ready else http_status.HTTP_503_SERVICE_UNAVAILABLE
+    return ORJSONResponse(readiness.to_dict(), status_code=status_code)
@@ -2,30 +2,49 @@ from fastapi import Depends
 from sqlalchemy.orm import Session
 
 from app.core.db.session import get_async_session
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.services.attempts import AttemptsService
 from app.core.services.exams import ExamsService, PapersService, SectionsService, SubSectionsService
+from app.core.services.generator import PaperGeneratorService
 from app.core.services.questions import QuestionsService
+from app.core.services.statistics import ItemStatisticsService
 
 
 def get_questions_service(session: Session = Depends(get_async_session)):
     """Create questions service class instance"""
-    yield QuestionsService(session=session)
+    yield UnitOfWork.of(session).get_service(QuestionsService)
 
 
 def get_exams_service(session: Session = Depends(get_async_session)):
     """Create exams service class instance"""
-    yield ExamsService(session=session)
+    yield UnitOfWork.of(session).get_service(ExamsService)
 
 
 def get_papers_service(session: Session = Depends(get_async_session)):
     """Create papers service class instance"""
-    yield PapersService(session=session)
+    yield UnitOfWork.of(session).get_service(PapersService)
+
+
+def get_paper_generator_service(session: Session = Depends(get_async_session)):
+    """Create paper generator service class instance"""
+    yield UnitOfWork.of(session).get_service(PaperGeneratorService)
 
 
 def get_sections_service(session: Session = Depends(get_async_session)):
     """Create sections service class instance"""
-    yield SectionsService(session=session)
+    yield UnitOfWork.of(session).get_service(SectionsService)
 
 
 def get_sub_sections_service(session: Session = Depends(get_async_session)):
     """Create subsections service class instance"""
-    yield SubSectionsService(session=session)
+    yield UnitOfWork.of(session).get_service(SubSectionsService)
+
+
+def get_attempts_service(session: Session = Depends(get_async_session)):
+    """Create attempts service class instance"""
+    yield UnitOfWork.of(session).get_service(AttemptsService)
+
+
+def get_item_statistics_service(session: Session = Depends(get_async_session)):
+    """Create item statistics service class instance"""
+    yield UnitOfWork.of(session).get_service(ItemStatisticsService)
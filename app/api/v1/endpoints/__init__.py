@@ -1,3 +1,4 @@
+from .attempts import attempts_router
 from .exams import exams_router
 from .papers import papers_router, sections_router, sub_sections_router
 from .questions import questions_router
@@ -0,0 +1,110 @@
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Response
+from starlette import status as http_status
+
+from app.api.v1.dependencies import get_attempts_service
+from app.api.v1.routers import ExaminaRouteWrapper
+from app.core.services.attempts import AttemptsService
+from app.schemas import (
+    AttemptCreateSchema,
+    AttemptRankSchema,
+    AttemptResponseSchema,
+    AttemptTimerSchema,
+    AutosaveRequestSchema,
+    AutosaveResponseSchema,
+    CandidateResponseSchema,
+)
+
+attempts_router = APIRouter(prefix="/attempts", tags=["Attempts"], route_class=ExaminaRouteWrapper)
+
+
+@attempts_router.post(path="/", status_code=http_status.HTTP_201_CREATED, response_model=AttemptResponseSchema)
+async def create_attempt(
+    request_body: AttemptCreateSchema,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """Start the attempt of a paper by a candidate, the existing attempt is returned if already started"""
+    attempt_instance = await attempts_service.create_attempt(request_body)
+
+    return attempt_instance
+
+
+@attempts_router.put(
+    path="/{attempt_id}/responses", status_code=http_status.HTTP_202_ACCEPTED, response_model=AutosaveResponseSchema
+)
+async def autosave_responses(
+    attempt_id: UUID,
+    request_body: AutosaveRequestSchema,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """
+    Autosave the responses of an attempt. Responses are buffered and written to the database within the flush
+    interval, a response with a lower sequence than the saved one is ignored.
+    """
+    accepted = await attempts_service.save_responses(attempt_id, request_body.responses)
+
+    return AutosaveResponseSchema(attempt_id=attempt_id, accepted=accepted)
+
+
+@attempts_router.get(
+    path="/{attempt_id}/responses", status_code=http_status.HTTP_200_OK, response_model=List[CandidateResponseSchema]
+)
+async def get_responses(
+    attempt_id: UUID,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """Get the latest responses of an attempt, used to restore the attempt in the CBT client"""
+    responses = await attempts_service.get_responses(attempt_id)
+
+    return responses
+
+
+@attempts_router.get(path="/{attempt_id}/timer", status_code=http_status.HTTP_200_OK, response_model=AttemptTimerSchema)
+async def get_timer(
+    attempt_id: UUID,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """Get the deadlines of an attempt along with the server time, the attempt is submitted at its deadline"""
+    attempt_timer = await attempts_service.get_timer(attempt_id)
+
+    return attempt_timer
+
+
+@attempts_router.get(path="/{attempt_id}/sheet", status_code=http_status.HTTP_200_OK, response_class=Response)
+async def get_response_sheet(
+    attempt_id: UUID,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """
+    Export the responses of an attempt as a little endian float64 array, one value per question of the paper in the
+    order of the paper. Bitmask of the selected options for MCQ/MSQ, value for NAT and NaN if not answered.
+    """
+    response_sheet = await attempts_service.get_response_sheet(attempt_id)
+
+    return Response(response_sheet, media_type="application/octet-stream")
+
+
+@attempts_router.post(
+    path="/{attempt_id}/submit", status_code=http_status.HTTP_200_OK, response_model=AttemptResponseSchema
+)
+async def submit_attempt(
+    attempt_id: UUID,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """Submit the attempt, pending responses of the attempt are written along with the submission"""
+    attempt_instance = await attempts_service.submit(attempt_id)
+
+    return attempt_instance
+
+
+@attempts_router.get(path="/{attempt_id}/rank", status_code=http_status.HTTP_200_OK, response_model=AttemptRankSchema)
+async def get_rank(
+    attempt_id: UUID,
+    attempts_service: AttemptsService = Depends(get_attempts_service),
+):
+    """Get the rank and percentile of a submitted attempt in the paper and in every section"""
+    attempt_rank = await attempts_service.get_rank(attempt_id)
+
+    return attempt_rank
@@ -4,19 +4,32 @@ from uuid import UUID
 from fastapi import APIRouter, Depends
 from starlette import status as http_status
 
-from app.api.v1.dependencies import get_exams_service, get_papers_service
+from app.api.v1.dependencies import get_exams_service, get_paper_generator_service, get_papers_service
 from app.api.v1.routers import ExaminaRouteWrapper
 from app.core.schemas.exams import ExamsCreateDatabaseSchema
 from app.core.services.exams import ExamsService, PapersService
+from app.core.services.generator import PaperGeneratorService
 from app.enums import PapersStatusEnum
-from app.schemas import CBTRequestSchema, ExamsResponseSchema, PapersResponseSchema
+from app.schemas import (
+    CBTRequestSchema,
+    ExamsResponseSchema,
+    PaperBlueprintSchema,
+    PapersResponseSchema,
+    SoftDeleteCascadeSchema,
+)
+from app.utils.responses import ExaminaORJSONResponse
 
 exams_router = APIRouter(prefix="/exams", tags=["Exams"], route_class=ExaminaRouteWrapper)
 
 # FETCH API
 
 
-@exams_router.get(path="/", status_code=http_status.HTTP_200_OK, response_model=List[ExamsResponseSchema])
+@exams_router.get(
+    path="/",
+    status_code=http_status.HTTP_200_OK,
+    response_model=List[ExamsResponseSchema],
+    response_class=ExaminaORJSONResponse,
+)
 async def get_exams(
     include_inactive: bool = False,
     exams_service: ExamsService = Depends(get_exams_service),
@@ -24,11 +37,14 @@ async def get_exams(
     """Fetch all the exams that are available in the database"""
     exam_instances = await exams_service.get_exams(include_inactive)
 
-    return exam_instances
+    return ExaminaORJSONResponse([ExamsResponseSchema.from_orm(exam_instance) for exam_instance in exam_instances])
 
 
 @exams_router.get(
-    path="/{exam_id}/papers", status_code=http_status.HTTP_200_OK, response_model=List[PapersResponseSchema]
+    path="/{exam_id}/papers",
+    status_code=http_status.HTTP_200_OK,
+    response_model=List[PapersResponseSchema],
+    response_class=ExaminaORJSONResponse,
 )
 async def get_papers_by_exam_id(
     exam_id: UUID,
@@ -38,7 +54,7 @@ async def get_papers_by_exam_id(
     """Fetch all the papers for a particular exam"""
     paper_instances = await exams_service.get_papers(exam_id=exam_id, paper_status=paper_status)
 
-    return paper_instances
+    return ExaminaORJSONResponse([PapersResponseSchema.from_orm(paper_instance) for paper_instance in paper_instances])
 
 
 # CREATE API
@@ -68,20 +84,46 @@ async def create_paper(
     return paper_instance
 
 
+@exams_router.post(path="/{exam_id}/paper/generate", status_code=http_status.HTTP_201_CREATED)
+async def generate_paper(
+    exam_id: UUID,
+    request_body: PaperBlueprintSchema,
+    paper_generator_service: PaperGeneratorService = Depends(get_paper_generator_service),
+):
+    """Generate a new paper for an exam by sampling questions from the question bank as per the blueprint"""
+    paper_instance = await paper_generator_service.generate_paper(exam_id, request_body)
+
+    return paper_instance
+
+
 # DELETE API
 
 
 @exams_router.delete(path="/{exam_id}", status_code=http_status.HTTP_204_NO_CONTENT)
 async def delete_exam(
     exam_id: UUID,
+    include_questions: bool = True,
     exams_service: ExamsService = Depends(get_exams_service),
 ):
-    """Delete an exam from the database"""
-    await exams_service.delete(exam_id)
+    """Delete an exam along with its papers and the questions which are not used by the papers of other exams"""
+    await exams_service.delete(exam_id, include_questions)
 
     return None
 
 
+@exams_router.post(
+    path="/{exam_id}/restore", status_code=http_status.HTTP_200_OK, response_model=SoftDeleteCascadeSchema
+)
+async def restore_exam(
+    exam_id: UUID,
+    exams_service: ExamsService = Depends(get_exams_service),
+):
+    """Restore a deleted exam along with the papers and questions that were deleted with it"""
+    cascade = await exams_service.restore(exam_id)
+
+    return cascade
+
+
 # UPDATE API
 
 
@@ -1,6 +1,7 @@
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from starlette import status as http_status
 
 from app.api.v1.dependencies import get_papers_service, get_sections_service, get_sub_sections_service
@@ -8,7 +9,19 @@ from app.api.v1.routers import ExaminaRouteWrapper
 from app.core.schemas.exams import SectionsUpdateDatabaseSchema, SubSectionsUpdateDatabaseSchema
 from app.core.services.exams import PapersService, SectionsService, SubSectionsService
 from app.enums import PapersStatusEnum
-from app.schemas import CBTPaperBaseSchema, CBTQuestionUpdateSchema, CBTResponseSchema
+from app.schemas import (
+    CBTPaperBaseSchema,
+    CBTPaperCloneSchema,
+    CBTPermutationSchema,
+    CBTQuestionBatchUpdateSchema,
+    CBTQuestionsBatchUpdateResponseSchema,
+    CBTQuestionUpdateSchema,
+    CBTResponseSchema,
+    CBTSectionsResponseSchema,
+    CBTSkeletonSchema,
+    SoftDeleteCascadeSchema,
+)
+from app.utils.responses import ExaminaORJSONResponse, build_cached_response
 
 papers_router = APIRouter(prefix="/paper", tags=["Paper"], route_class=ExaminaRouteWrapper)
 sections_router = APIRouter(prefix="/sections", tags=["Sections"], route_class=ExaminaRouteWrapper)
@@ -17,26 +30,140 @@ sub_sections_router = APIRouter(prefix="/sub_sections", tags=["Sub Sections"], r
 # FETCH API
 
 
-@papers_router.get(path="/{paper_id}", status_code=http_status.HTTP_200_OK, response_model=CBTResponseSchema)
+@papers_router.get(
+    path="/{paper_id}",
+    status_code=http_status.HTTP_200_OK,
+    response_model=CBTResponseSchema,
+    response_class=ExaminaORJSONResponse,
+)
 async def get_paper_content(
+    request: Request,
     paper_id: UUID,
+    candidate_seed: Optional[str] = None,
     papers_service: PapersService = Depends(get_papers_service),
 ):
-    """Get content for CBT environment for a particular paper given its UUID"""
-    cbt_paper_instance = await papers_service.get_for_cbt(paper_id)
+    """
+    Get content for CBT environment for a particular paper given its UUID.
+    If candidate seed is passed, questions and options are shuffled for that candidate.
+    """
+    if candidate_seed:
+        cbt_paper_instance = await papers_service.get_for_cbt(paper_id, candidate_seed=candidate_seed)
+
+        # Paper is validated by the service, so it is serialized directly
+        return ExaminaORJSONResponse(cbt_paper_instance)
+
+    # Same paper is served to every candidate, so it is served with the payloads stored in the cache
+    cache_entry = await papers_service.get_cbt_entry(paper_id, decode=False)
+    return await build_cached_response(cache_entry, request.headers.get("accept-encoding"))
+
+
+@papers_router.get(
+    path="/{paper_id}/skeleton",
+    status_code=http_status.HTTP_200_OK,
+    response_model=CBTSkeletonSchema,
+    response_class=ExaminaORJSONResponse,
+)
+async def get_paper_skeleton(
+    request: Request,
+    paper_id: UUID,
+    candidate_seed: Optional[str] = None,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """
+    Get paper details with sections and subsections, having only the UUIDs of the questions.
+    Content of the sections is fetched separately, as and when the candidate opens them.
+    """
+    if candidate_seed:
+        skeleton = await papers_service.get_skeleton(paper_id, candidate_seed=candidate_seed)
+        return ExaminaORJSONResponse(skeleton)
+
+    cache_entry = await papers_service.get_skeleton_entry(paper_id)
+    return await build_cached_response(cache_entry, request.headers.get("accept-encoding"))
+
+
+@papers_router.get(
+    path="/{paper_id}/sections/{section_id}",
+    status_code=http_status.HTTP_200_OK,
+    response_model=CBTSectionsResponseSchema,
+    response_class=ExaminaORJSONResponse,
+)
+async def get_paper_section_content(
+    request: Request,
+    paper_id: UUID,
+    section_id: UUID,
+    candidate_seed: Optional[str] = None,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """
+    Get content for CBT environment for a section of the paper.
+    If candidate seed is passed, questions and options are shuffled in the same order as the full paper.
+    """
+    if candidate_seed:
+        section = await papers_service.get_section_for_cbt(paper_id, section_id, candidate_seed=candidate_seed)
+        return ExaminaORJSONResponse(section)
+
+    cache_entry = await papers_service.get_section_entry(paper_id, section_id)
+    return await build_cached_response(cache_entry, request.headers.get("accept-encoding"))
+
+
+@papers_router.get(
+    path="/{paper_id}/permutation",
+    status_code=http_status.HTTP_200_OK,
+    response_model=CBTPermutationSchema,
+    response_class=ExaminaORJSONResponse,
+)
+async def get_paper_permutation(
+    paper_id: UUID,
+    candidate_seed: str,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """Get the shuffling applied to a paper for a candidate along with its inverse, used to un-shuffle responses"""
+    permutation = await papers_service.get_permutation(paper_id, candidate_seed)
 
-    return cbt_paper_instance
+    return ExaminaORJSONResponse(permutation)
 
 
-@papers_router.get(path="/{paper_id}/solution", status_code=http_status.HTTP_200_OK)
+@papers_router.get(
+    path="/{paper_id}/solution", status_code=http_status.HTTP_200_OK, response_class=ExaminaORJSONResponse
+)
 async def get_paper_solution(
+    request: Request,
     paper_id: UUID,
     papers_service: PapersService = Depends(get_papers_service),
 ):
     """Get solution for a particular paper given its UUID"""
-    solutions = await papers_service.get_solution(paper_id)
+    cache_entry = await papers_service.get_solution_entry(paper_id)
 
-    return solutions
+    return await build_cached_response(cache_entry, request.headers.get("accept-encoding"))
+
+
+@papers_router.get(path="/{paper_id}/answer_key", status_code=http_status.HTTP_200_OK, response_class=Response)
+async def get_paper_answer_key(
+    paper_id: UUID,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """
+    Get the packed answer key of a paper, as little endian float64 arrays of the lower bounds (bitmask of the correct
+    options for MCQ/MSQ), upper bounds (NaN for MCQ/MSQ), positive marks and negative marks of the questions
+    """
+    answer_key = await papers_service.get_answer_key(paper_id)
+
+    return Response(answer_key.to_bytes(), media_type="application/octet-stream")
+
+
+# CREATE API
+
+
+@papers_router.post(path="/{paper_id}/clone", status_code=http_status.HTTP_201_CREATED)
+async def clone_paper(
+    paper_id: UUID,
+    clone_data: CBTPaperCloneSchema,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """Clone a paper as a new draft paper (e.g. next year's paper or another set), reusing its questions"""
+    paper_instance = await papers_service.clone_paper(paper_id, clone_data)
+
+    return paper_instance
 
 
 # DELETE API
@@ -45,14 +172,28 @@ async def get_paper_solution(
 @papers_router.delete(path="/{paper_id}", status_code=http_status.HTTP_204_NO_CONTENT)
 async def delete_paper(
     paper_id: UUID,
+    include_questions: bool = True,
     papers_service: PapersService = Depends(get_papers_service),
 ):
-    """Delete a paper from the database"""
-    await papers_service.delete(paper_id)
+    """Delete a paper along with the questions which are not used by other papers"""
+    await papers_service.delete(paper_id, include_questions)
 
     return None
 
 
+@papers_router.post(
+    path="/{paper_id}/restore", status_code=http_status.HTTP_200_OK, response_model=SoftDeleteCascadeSchema
+)
+async def restore_paper(
+    paper_id: UUID,
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """Restore a deleted paper along with the questions that were deleted with it"""
+    cascade = await papers_service.restore(paper_id)
+
+    return cascade
+
+
 # UPDATE API
 
 
@@ -80,6 +221,22 @@ async def update_paper(
     return paper_instance
 
 
+@papers_router.patch(
+    path="/{paper_id}/questions",
+    status_code=http_status.HTTP_200_OK,
+    response_model=CBTQuestionsBatchUpdateResponseSchema,
+)
+async def update_paper_questions(
+    paper_id: UUID,
+    questions_data: List[CBTQuestionBatchUpdateSchema],
+    papers_service: PapersService = Depends(get_papers_service),
+):
+    """Update many questions of the paper (content, subject, difficulty and marks) in a single transaction"""
+    batch_update = await papers_service.update_questions(paper_id, questions_data)
+
+    return batch_update
+
+
 @sections_router.patch(path="/{section_id}", status_code=http_status.HTTP_200_OK)
 async def update_section(
     section_id: UUID,
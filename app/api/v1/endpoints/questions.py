@@ -1,12 +1,15 @@
 from typing import List
+from uuid import UUID
 
 from fastapi import APIRouter, Depends
 from starlette import status as http_status
 
-from app.api.v1.dependencies import get_questions_service
+from app.api.v1.dependencies import get_item_statistics_service, get_questions_service
 from app.api.v1.routers import ExaminaRouteWrapper
 from app.core.schemas.questions import QuestionsUploadSchema
 from app.core.services.questions import QuestionsService
+from app.core.services.statistics import ItemStatisticsService, refresh_item_statistics
+from app.schemas import ItemStatisticsRunSchema, QuestionStatisticsResponseSchema
 
 questions_router = APIRouter(prefix="/questions", tags=["Questions"], route_class=ExaminaRouteWrapper)
 
@@ -31,3 +34,31 @@ async def bulk_create_questions(
     question_instance = await questions_service.create_bulk([question.dict() for question in request_body])
 
     return question_instance
+
+
+@questions_router.post(
+    path="/statistics/refresh", status_code=http_status.HTTP_200_OK, response_model=ItemStatisticsRunSchema
+)
+async def refresh_statistics():
+    """
+    Add the attempts graded since the previous run to the item statistics and recalibrate the difficulty of the
+    questions. Same as the batch job `python -m app.core.services.statistics`.
+    """
+    run = await refresh_item_statistics()
+
+    return run
+
+
+@questions_router.get(
+    path="/{question_id}/statistics",
+    status_code=http_status.HTTP_200_OK,
+    response_model=QuestionStatisticsResponseSchema,
+)
+async def get_statistics(
+    question_id: UUID,
+    item_statistics_service: ItemStatisticsService = Depends(get_item_statistics_service),
+):
+    """Get the item statistics of a question: p-value, discrimination index and selections of every option"""
+    question_statistics = await item_statistics_service.get_statistics(question_id)
+
+    return question_statistics
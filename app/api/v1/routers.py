@@ -1,22 +1,42 @@
+import time
 import uuid
 from typing import Callable
 
 from fastapi import Request, Response
 from fastapi.routing import APIRoute
 
+from app.config import configuration
+from app.core.db.instrumentation import track_queries
+from app.core.metrics import (
+    http_request_duration_seconds,
+    http_request_errors_total,
+    http_requests_in_flight,
+    http_requests_total,
+    http_response_size_bytes,
+)
 from app.logger import logger
+from app.utils.profiling import profiling_route_handler
+
+# SQL stats are added to the response headers only in debug mode
+SQL_STATS_HEADERS = str(configuration.PROJECT_DEBUG).lower() == "true"
 
 
 class ExaminaRouteWrapper(APIRoute):
     """
     Created this custom route wrapper for following reasons:
     1) For audit trail logging
+    2) For per request SQL statistics, keyed by the trace id
+    3) For request metrics (latency, in-flight, response size, errors) per route template
+    4) For profiling a request on demand
     """
 
     def get_route_handler(self) -> Callable:
         """Override the default route handler to add audit trail logging information"""
         # Get the original route handler
         original_route_handler = super().get_route_handler()
+        if configuration.PROFILING_ENABLED:
+            # Decided once per route, so there is no overhead on the requests when profiling is disabled
+            original_route_handler = profiling_route_handler(original_route_handler)
 
         async def custom_route_handler(request: Request) -> Response:
             """Custom route handler to add audit trail logging information"""
@@ -26,6 +46,7 @@ class ExaminaRouteWrapper(APIRoute):
             user_email_id = request.headers.get("x-user-email-id")
             user_name = request.headers.get("x-user-name")
             trace_id = request.headers.get("x-trace-id") or str(uuid.uuid4())
+            request.state.trace_id = trace_id
 
             # Setting the information in the in loguru logger
             with logger.contextualize(
@@ -34,11 +55,21 @@ class ExaminaRouteWrapper(APIRoute):
                 user_email_id=user_email_id,
                 user_name=user_name,
                 trace_id=trace_id,
-            ):
+            ), track_queries() as query_stats:
+                # Metrics are recorded against the route template, so that the labels do not grow with the uuids
+                method = request.method
+                http_requests_in_flight.inc(method, self.path)
+                start_time = time.perf_counter()
+                status_code = 500
+
                 # Call original route handler
                 try:
-                    return await original_route_handler(request)
+                    response = await original_route_handler(request)
+                    status_code = response.status_code
                 except Exception as e:
+                    status_code = getattr(e, "status_code", 500)
+                    http_request_errors_total.inc(method, self.path, str(status_code))
+
                     # Log the exception
                     message = "Error occurred while processing the request"
                     logger.exception(message)
@@ -47,5 +78,20 @@ class ExaminaRouteWrapper(APIRoute):
                         error_code=getattr(e, "status_code", None),
                     )
                     raise e
+                finally:
+                    http_requests_in_flight.dec(method, self.path)
+                    http_requests_total.inc(method, self.path, str(status_code))
+                    http_request_duration_seconds.observe(
+                        time.perf_counter() - start_time, method, self.path, str(status_code)
+                    )
+
+                    if query_stats.count:
+                        # The route template has braces of its own, so it is passed as an argument of the message
+                        logger.info("SQL statistics for {} {}", method, self.path, **query_stats.to_dict())
+
+                http_response_size_bytes.observe(int(response.headers.get("content-length", 0)), method, self.path)
+                if SQL_STATS_HEADERS:
+                    response.headers.update(query_stats.to_headers())
+                return response
 
         return custom_route_handler
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings
 
 from app.constants import CONFIGMAP_PATH
@@ -17,6 +19,71 @@ class AppSettings(Settings):
     PROJECT_PORT: int = 8001
     AUDIT_LOG_LOCATION: str
 
+    # Seconds after which the in-process question bank index used by the paper generator is rebuilt
+    QUESTION_BANK_INDEX_TTL: int = 300
+
+    # In-process cache of paper content (CBT payloads and solutions)
+    PAPER_CACHE_MAX_SIZE: int = 1024
+    PAPER_CACHE_TTL: int = 60
+
+    # Responses smaller than this (in bytes) are not compressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Responses of at least this size (in bytes) are compressed in the threadpool, so the event loop is not held
+    COMPRESSION_THREADPOOL_SIZE: int = 64 * 1024
+
+    # SQL instrumentation, statements slower than the threshold are logged and repeated statements flagged as N+1
+    SQL_SLOW_STATEMENT_THRESHOLD_MS: int = 200
+    SQL_SLOWEST_STATEMENTS_COUNT: int = 5
+    SQL_N_PLUS_ONE_THRESHOLD: int = 3
+
+    # Autosaves are buffered in memory and written to the database every flush interval (in seconds),
+    # or earlier if the number of pending responses crosses the limit
+    AUTOSAVE_FLUSH_INTERVAL: float = 1.0
+    AUTOSAVE_MAX_PENDING: int = 50000
+
+    # In-process cache of the attempts in progress, so that autosaves do not hit the database
+    ATTEMPT_CACHE_MAX_SIZE: int = 100000
+    ATTEMPT_CACHE_TTL: int = 60
+
+    # Attempt timers, autosaves are accepted for the grace period (in seconds) after a deadline to absorb the latency.
+    # Attempts running out of time are submitted in batches, failed submissions are retried after the delay
+    ATTEMPT_DEADLINE_GRACE: int = 5
+    ATTEMPT_SUBMIT_BATCH_SIZE: int = 500
+    ATTEMPT_SUBMIT_RETRY_DELAY: int = 10
+    # Time allowed (in seconds) to recover the timers of the attempts in progress at startup
+    ATTEMPT_TIMERS_RECOVERY_TIMEOUT: float = 30.0
+
+    # Score distributions of the papers used for ranking, reloaded from the database after the TTL (in seconds) to
+    # include the submissions of the other workers
+    RANKING_CACHE_MAX_SIZE: int = 1024
+    RANKING_CACHE_TTL: int = 30
+
+    # Item statistics, attempts are analyzed in batches and the difficulty of a question is recalibrated from its
+    # p-value once it has the minimum number of responses
+    ITEM_STATISTICS_BATCH_SIZE: int = 1000
+    ITEM_STATISTICS_MIN_RESPONSES: int = 30
+
+    # On-demand profiling, requests with the `x-profile-token` header matching the token are profiled
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: Optional[str] = None
+
+    # Startup of a worker, warned about if it takes longer than the budget (in seconds)
+    STARTUP_TIME_BUDGET: float = 5.0
+    POOL_WARMUP_TIMEOUT: float = 10.0
+
+    # Published papers of the active exams are cached at startup, the worker is ready once done or timed out
+    CACHE_WARMUP_CONCURRENCY: int = 4
+    CACHE_WARMUP_TIMEOUT: float = 30.0
+
+    # Delay before listening again for the notifications of the other workers, when the connection is lost
+    NOTIFICATION_RECONNECT_DELAY: float = 1.0
+
+    # Directory of the snapshots of the published papers, memory-mapped by the workers of the host. Disabled if not set
+    SNAPSHOT_STORE_LOCATION: Optional[str] = None
+    # Snapshots are compacted once the dead bytes are more than the ratio of the data file (of at least the min size)
+    SNAPSHOT_COMPACTION_RATIO: float = 0.5
+    SNAPSHOT_COMPACTION_MIN_SIZE: int = 64 * 1024 * 1024
+
 
 class PostgresSettings(Settings):
     POSTGRES_USER: str
@@ -26,6 +93,10 @@ class PostgresSettings(Settings):
     POSTGRES_DATABASE: str
     POSTGRES_DATABASE_SCHEMA: str
 
+    # Connection pool of the async engine, per worker
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_MAX_OVERFLOW: int = 10
+
 
 class Configuration(AppSettings, PostgresSettings):
     """
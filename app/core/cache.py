@@ -0,0 +1,140 @@
+"""
+In-process caches shared by all the requests of a worker
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Union
+
+from loguru import logger
+
+from app.config import configuration
+from app.core.metrics import cache_requests_total
+
+# TTL of the entries that never expire, e.g. the content of the published papers, which is immutable
+NO_EXPIRY = math.inf
+
+
+class CacheEntry:
+    """
+    A cached value along with its expiry and the tags (entity uuids) it was built from.
+    Serialized (and compressed) variants of the value are stored in payloads, keyed by their content encoding. For the
+    published papers these are views over the snapshot store, and the value is decoded from them when needed.
+    """
+
+    __slots__ = ("value", "expires_at", "tags", "payloads")
+
+    def __init__(self, value: Any, expires_at: Optional[float], tags: Iterable[Hashable]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tuple(tags)
+        self.payloads: Dict[str, Union[bytes, memoryview]] = {}
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() > self.expires_at
+
+
+class LocalCache:
+    """
+    LRU cache with TTL. Every entry can be tagged with the entities it depends on,
+    so all the entries of an entity (say a paper) can be evicted at once when the entity changes.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: Optional[int] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Get the entry for the key, None if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            cache_requests_total.inc(self.name, "miss")
+            return None
+
+        if entry.is_expired():
+            self.evict(key)
+            cache_requests_total.inc(self.name, "miss")
+            return None
+
+        self._entries.move_to_end(key)
+        cache_requests_total.inc(self.name, "hit")
+        return entry
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get the value for the key, None if it is missing or expired"""
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), ttl: Optional[int] = None) -> CacheEntry:
+        """
+        Add the value to the cache
+        :param key: Cache key
+        :param value: Value to be cached
+        :param tags: Entities the value depends on, used to evict the entry
+        :param ttl: Time to live in seconds, defaults to the TTL of the cache, NO_EXPIRY for an entry that never expires
+        :return: Cache entry that was added
+        """
+        self.evict(key)
+
+        ttl = ttl if ttl is not None else self.ttl
+        entry = CacheEntry(value, time.monotonic() + ttl if ttl not in (None, NO_EXPIRY) else None, tags)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        # Remove the least recently used entries
+        while len(self._entries) > self.max_size:
+            self.evict(next(iter(self._entries)))
+        return entry
+
+    def evict(self, key: Hashable):
+        """Remove the entry for the key, if present"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def evict_tag(self, tag: Hashable) -> int:
+        """
+        Remove all the entries tagged with the tag
+        :param tag: Entity uuid
+        :return: Number of entries removed
+        """
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self.evict(key)
+
+        if keys:
+            logger.debug(f"Evicted {len(keys)} entries of {tag} from {self.name} cache")
+        return len(keys)
+
+    def clear(self):
+        """Remove all the entries"""
+        self._entries.clear()
+        self._tags.clear()
+
+
+# Papers content (CBT payloads, solutions) are cached here and tagged with the paper uuid
+papers_cache = LocalCache(name="papers", max_size=configuration.PAPER_CACHE_MAX_SIZE, ttl=configuration.PAPER_CACHE_TTL)
+
+# Attempts in progress, so that autosaves are validated without hitting the database. Tagged with the attempt uuid
+attempts_cache = LocalCache(
+    name="attempts", max_size=configuration.ATTEMPT_CACHE_MAX_SIZE, ttl=configuration.ATTEMPT_CACHE_TTL
+)
+
+# Score distributions of the papers, tagged with the paper uuid
+rankings_cache = LocalCache(
+    name="rankings", max_size=configuration.RANKING_CACHE_MAX_SIZE, ttl=configuration.RANKING_CACHE_TTL
+)
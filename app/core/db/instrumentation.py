@@ -0,0 +1,113 @@
+"""
+Per-request SQL instrumentation.
+Engine event hooks record every statement in the stats of the request being served, requests are tracked by
+`track_queries` which is used by `ExaminaRouteWrapper`.
+"""
+import heapq
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import configuration
+
+
+class QueryStats:
+    """Statements executed while serving a request"""
+
+    __slots__ = ("count", "total_time", "slowest", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        # Min-heap of (duration, statement), so the fastest of the slowest statements is replaced first
+        self.slowest: List[Tuple[float, str]] = []
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        """
+        Record an executed statement
+        :param statement: SQL statement, without the parameters
+        :param duration: Time taken by the statement in seconds
+        """
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+
+        if len(self.slowest) < configuration.SQL_SLOWEST_STATEMENTS_COUNT:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def get_n_plus_one_suspects(self) -> Dict[str, int]:
+        """Statements which were executed repeatedly within the request, along with the number of executions"""
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= configuration.SQL_N_PLUS_ONE_THRESHOLD
+        }
+
+    def to_dict(self) -> Dict:
+        """Stats in the format they are logged"""
+        return {
+            "sql_count": self.count,
+            "sql_time_ms": round(self.total_time * 1000, 2),
+            "sql_slowest": [
+                {"statement": statement, "time_ms": round(duration * 1000, 2)}
+                for duration, statement in sorted(self.slowest, reverse=True)
+            ],
+            "sql_n_plus_one": self.get_n_plus_one_suspects(),
+        }
+
+    def to_headers(self) -> Dict[str, str]:
+        """Stats in the format they are added to the response headers"""
+        return {
+            "X-SQL-Count": str(self.count),
+            "X-SQL-Time-Ms": f"{self.total_time * 1000:.2f}",
+            "X-SQL-N-Plus-One": str(len(self.get_n_plus_one_suspects())),
+        }
+
+
+# Stats of the request being served, the context is copied to the greenlets that run the async engine
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Record the statements executed within the block"""
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context and not the connection, so a statement that fails leaves nothing behind
+    context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_start_time
+
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    if duration * 1000 >= configuration.SQL_SLOW_STATEMENT_THRESHOLD_MS:
+        logger.warning("Slow SQL statement", statement=statement, sql_time_ms=round(duration * 1000, 2))
+
+
+def instrument_engine(engine: Engine):
+    """
+    Register the event hooks on an engine, for async engines pass its `sync_engine`
+    :param engine: SQLAlchemy engine
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,71 @@
+"""
+Schema management. Tables are created by this explicit step, run once per deployment before the workers are started,
+instead of by every worker importing the models:
+    configmap_path=app/config/.env python -m app.core.db.migrations
+
+`create_all` only creates the missing tables, so the columns added to the existing tables are added by the upgrades,
+which run after it on every migration. Every upgrade is idempotent, a schema that already has the change is left as is.
+"""
+from typing import List
+
+from loguru import logger
+from sqlalchemy import func, select, text
+
+from app.config import configuration
+from app.core.db.session import get_engine
+from app.core.models import Base
+from app.core.models.base import SoftDeleteBase
+from app.core.models.questions import QuestionsModel
+
+
+def get_table_name(table_name: str) -> str:
+    return f'"{configuration.POSTGRES_DATABASE_SCHEMA}"."{table_name}"'
+
+
+def get_upgrades() -> List[str]:
+    """Statements adding the columns (and their constraints) that were added to the existing tables, in order"""
+    questions = get_table_name(QuestionsModel.__tablename__)
+    upgrades = []
+
+    # Time of the soft delete, records deleted together share it. Records deleted before it was added take the time of
+    # their last update, which is the time of the transaction, so the records deleted together are restored together
+    for table_name in sorted(mapper.local_table.name for mapper in SoftDeleteBase.registry.mappers):
+        table = get_table_name(table_name)
+        upgrades += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP",
+            f"UPDATE {table} SET deleted_at = updated_at WHERE is_deleted AND deleted_at IS NULL",
+        ]
+
+    # Versions of the questions, every existing question is the first and latest version of itself
+    upgrades += [
+        f"ALTER TABLE {questions} ADD COLUMN IF NOT EXISTS root_id UUID REFERENCES {questions} (uuid)",
+        f"ALTER TABLE {questions} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        f"ALTER TABLE {questions} ADD COLUMN IF NOT EXISTS is_latest BOOLEAN NOT NULL DEFAULT TRUE",
+        f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'unique_question_version') THEN
+                ALTER TABLE {questions} ADD CONSTRAINT unique_question_version UNIQUE (root_id, version);
+            END IF;
+        END $$
+        """,
+    ]
+    return upgrades
+
+
+# Key of the advisory lock held while migrating, so that deployments started together migrate one at a time
+MIGRATION_LOCK_KEY = 0x6578616D696E61
+
+
+def run_migrations():
+    """Create the missing tables, along with their indexes and constraints, and upgrade the existing ones"""
+    upgrades = get_upgrades()
+    with get_engine().begin() as connection:
+        connection.execute(select(func.pg_advisory_xact_lock(MIGRATION_LOCK_KEY)))
+        Base.metadata.create_all(bind=connection)
+        for upgrade in upgrades:
+            connection.execute(text(upgrade))
+    logger.info(f"Migrated the schema of {len(Base.metadata.tables)} tables, with {len(upgrades)} upgrades")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,166 @@
+"""
+Notifications between the workers, over PostgreSQL LISTEN/NOTIFY.
+Notifications are sent with `notify` within the transaction of the change, PostgreSQL delivers them to every listening
+worker (the sender included) only once the transaction is committed, and drops them if it is rolled back.
+Every worker listens on a dedicated connection, outside the pool, started and stopped by the lifespan of the app.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import configuration
+
+# Channels of the notifications
+PAPER_PUBLISHED_CHANNEL = "paper_published"
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+
+# PostgreSQL drops the notifications having a payload of 8000 bytes or more
+MAX_PAYLOAD_SIZE = 7999
+
+NotificationHandler = Callable[[str], Optional[Awaitable]]
+
+
+def build_notify(channel: str, payload: str) -> Select:
+    """Statement sending a notification"""
+    if len(payload.encode()) > MAX_PAYLOAD_SIZE:
+        raise ValueError(f"Payload of {channel} notification is larger than {MAX_PAYLOAD_SIZE} bytes")
+    return select(func.pg_notify(channel, payload))
+
+
+async def notify(session: AsyncSession, channel: str, payload: str):
+    """
+    Send a notification, delivered once the transaction of the session is committed
+    :param session: Session of the change
+    :param channel: Channel of the notification
+    :param payload: Payload of the notification
+    """
+    await session.execute(build_notify(channel, payload))
+
+
+class NotificationListener:
+    """
+    Listens on the channels having handlers, on a connection of its own. The connection is opened again if it is lost,
+    notifications sent in the meantime are lost, so the reconnect handlers are called to catch up (say clear a cache).
+    """
+
+    def __init__(self, reconnect_delay: float):
+        self.reconnect_delay = reconnect_delay
+        self._handlers: Dict[str, List[NotificationHandler]] = {}
+        self._reconnect_handlers: List[Callable[[], None]] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        # Tasks of the coroutine handlers, referenced until they are done
+        self._handler_tasks: Set[asyncio.Task] = set()
+        self._connected: Optional[asyncio.Event] = None
+
+    @property
+    def connected(self) -> asyncio.Event:
+        if self._connected is None:
+            self._connected = asyncio.Event()
+        return self._connected
+
+    def subscribe(self, channel: str, handler: NotificationHandler):
+        """
+        Call the handler with the payload of every notification of the channel, handlers are added before `start`
+        :param channel: Channel to listen on
+        :param handler: Function or coroutine function taking the payload
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], None]):
+        """Call the handler when the connection is opened again, as the notifications sent meanwhile are lost"""
+        self._reconnect_handlers.append(handler)
+
+    def _dispatch(self, _connection: asyncpg.Connection, _pid: int, channel: str, payload: str):
+        """Call the handlers of the channel, it is called by asyncpg for every notification"""
+        for handler in self._handlers.get(channel, ()):
+            try:
+                result = handler(payload)
+            except Exception:
+                logger.exception(f"Failed to handle {channel} notification {payload}")
+                continue
+
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(result)
+                self._handler_tasks.add(task)
+                task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Task):
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.opt(exception=task.exception()).error("Notification handler failed")
+
+    async def _listen(self, lost: asyncio.Event):
+        """Open the connection and listen on the channels"""
+        self._connection = await asyncpg.connect(
+            user=configuration.POSTGRES_USER,
+            password=configuration.POSTGRES_PASSWORD,
+            host=configuration.POSTGRES_HOST,
+            port=configuration.POSTGRES_PORT,
+            database=configuration.POSTGRES_DATABASE,
+        )
+        self._connection.add_termination_listener(lambda _connection: lost.set())
+        for channel in self._handlers:
+            await self._connection.add_listener(channel, self._dispatch)
+
+    async def _run(self):
+        """Keep listening, opening the connection again when it is lost"""
+        # Notifications are only missed once a connection was opened, there is nothing to catch up on before
+        reconnecting = False
+        while True:
+            lost = asyncio.Event()
+            try:
+                await self._listen(lost)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as exc:
+                logger.warning(f"Failed to listen for notifications, retrying in {self.reconnect_delay}s: {exc!r}")
+                await self._close()
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            logger.info(f"Listening for notifications on {', '.join(self._handlers)}")
+            self.connected.set()
+            if reconnecting:
+                for handler in self._reconnect_handlers:
+                    handler()
+
+            await lost.wait()
+            self.connected.clear()
+            logger.warning("Connection listening for notifications was lost")
+            await self._close()
+            reconnecting = True
+
+    async def _close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            try:
+                await connection.close(timeout=self.reconnect_delay)
+            except Exception:
+                connection.terminate()
+
+    def start(self):
+        """Start listening in the background, called at the startup of the app"""
+        if self._task is None and self._handlers:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop listening, called at the shutdown of the app"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self._close()
+        self.connected.clear()
+        for task in list(self._handler_tasks):
+            task.cancel()
+        logger.info("Stopped listening for notifications")
+
+
+notification_listener = NotificationListener(reconnect_delay=configuration.NOTIFICATION_RECONNECT_DELAY)
@@ -1,12 +1,16 @@
+import asyncio
+from typing import Optional
+
 from loguru import logger
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import configuration
+from app.core.db.instrumentation import instrument_engine
 
-# creating sync sqlalchemy session
+# Engines are created on first use (usually by the lifespan of the app), so importing the app does not need a database
 SQLALCHEMY_DATABASE_URL = URL.create(
     "postgresql+psycopg2",
     username=configuration.POSTGRES_USER,
@@ -15,11 +19,6 @@ SQLALCHEMY_DATABASE_URL = URL.create(
     database=configuration.POSTGRES_DATABASE,
     port=configuration.POSTGRES_PORT,
 )
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, echo=False)
-session_maker = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
-
-
-# Below code used for creating async sqlalchemy session
 ASYNC_SQLALCHEMY_DATABASE_URL = URL.create(
     "postgresql+asyncpg",
     username=configuration.POSTGRES_USER,
@@ -28,13 +27,89 @@ ASYNC_SQLALCHEMY_DATABASE_URL = URL.create(
     database=configuration.POSTGRES_DATABASE,
     port=configuration.POSTGRES_PORT,
 )
-async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, echo=False)
-async_session_maker = async_sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=async_engine,
-    expire_on_commit=False,
-)
+
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_engine() -> Engine:
+    """Sync engine of the process, used by the migrations"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, echo=False)
+        instrument_engine(_engine)
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine of the worker"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            pool_pre_ping=True,
+            echo=False,
+            pool_size=configuration.POSTGRES_POOL_SIZE,
+            max_overflow=configuration.POSTGRES_MAX_OVERFLOW,
+        )
+        instrument_engine(_async_engine.sync_engine)
+        logger.info("Created the async engine")
+    return _async_engine
+
+
+async def warm_up_pool():
+    """Open the connections of the pool together, so the first requests do not wait for the connections"""
+    async_engine = get_async_engine()
+    connections = await asyncio.gather(
+        *(async_engine.connect() for _ in range(configuration.POSTGRES_POOL_SIZE)), return_exceptions=True
+    )
+    try:
+        for connection in connections:
+            if isinstance(connection, BaseException):
+                raise connection
+            await connection.execute(text("SELECT 1"))
+    finally:
+        # Returned to the pool, where they are kept open
+        await asyncio.gather(
+            *(connection.close() for connection in connections if not isinstance(connection, BaseException))
+        )
+    logger.info(f"Warmed up {len(connections)} connections of the pool")
+
+
+async def dispose_engines():
+    """Close the connections of the engines, at the shutdown of the worker"""
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+class LazySessionMaker(sessionmaker):
+    """Session maker bound to the sync engine when the first session is created"""
+
+    def __call__(self, **local_kw) -> Session:
+        engine = get_engine()
+        if self.kw.get("bind") is not engine:
+            self.configure(bind=engine)
+        return super().__call__(**local_kw)
+
+
+class LazyAsyncSessionMaker(async_sessionmaker):
+    """Session maker bound to the async engine when the first session is created"""
+
+    def __call__(self, **local_kw) -> AsyncSession:
+        # Bound again if the engine was disposed and created again, e.g. the app was restarted in the same process
+        async_engine = get_async_engine()
+        if self.kw.get("bind") is not async_engine:
+            self.configure(bind=async_engine)
+        return super().__call__(**local_kw)
+
+
+session_maker = LazySessionMaker(autocommit=False, autoflush=False, expire_on_commit=False)
+async_session_maker = LazyAsyncSessionMaker(autocommit=False, autoflush=False, expire_on_commit=False)
 
 
 class SessionContextManager:
@@ -0,0 +1,137 @@
+"""
+Unit of work shared by everything running on a session, i.e. by a request or a background job.
+Services are created once per session and share the records they load, loads of a model requested together (say with
+asyncio.gather) are collapsed into a single `IN` query, in the way of a DataLoader.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Type, TypeVar, Union
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import Executable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ServiceType = TypeVar("ServiceType")
+
+
+class ModelLoader:
+    """
+    Loads the records of a model by uuid. Loads requested before the loader gets to run are batched in one query,
+    and the loaded records are kept for the rest of the unit of work, so a record is fetched at most once.
+    Missing records are not kept, as they might be created later in the unit of work.
+    """
+
+    def __init__(self, session: AsyncSession, query_builder: Callable[[List[UUID]], Executable]):
+        self.session = session
+        self.query_builder = query_builder
+        self._records: Dict[UUID, Any] = {}
+        self._pending: Dict[UUID, asyncio.Future] = {}
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load(self, uuid: Union[UUID, str]) -> Optional[Any]:
+        """
+        Load a record
+        :param uuid: UUID of the record
+        :return: Record, None if it does not exist
+        """
+        uuid = uuid if isinstance(uuid, UUID) else UUID(str(uuid))
+        if uuid in self._records:
+            return self._records[uuid]
+
+        future = self._pending.get(uuid)
+        if future is None:
+            future = self._pending[uuid] = asyncio.get_running_loop().create_future()
+            # Runs once the callers waiting in the current iteration of the event loop have added their uuids
+            if self._dispatch_task is None:
+                self._dispatch_task = asyncio.ensure_future(self._dispatch())
+        return await future
+
+    async def load_many(self, uuids: Iterable[Union[UUID, str]]) -> List[Optional[Any]]:
+        """Load the records with a single query, in the order of the uuids"""
+        return list(await asyncio.gather(*(self.load(uuid) for uuid in uuids)))
+
+    def prime(self, records: Iterable[Any]):
+        """Keep the records that were loaded or created elsewhere"""
+        for record in records:
+            self._records[record.uuid] = record
+
+    def forget(self, uuid: UUID):
+        """Remove a record, say a deleted one"""
+        self._records.pop(uuid, None)
+
+    def clear(self):
+        """Remove all the records, used after a bulk write, so the next loads read the records again"""
+        self._records.clear()
+
+    async def _dispatch(self):
+        """Fetch the pending records with one query and resolve their futures"""
+        # One more iteration of the event loop, for the loads of the tasks started by the callers (e.g. load_many)
+        await asyncio.sleep(0)
+        pending, self._pending, self._dispatch_task = self._pending, {}, None
+        try:
+            # Instances already in the session are refreshed, rather than returned with the values loaded before
+            query = self.query_builder(list(pending)).execution_options(populate_existing=True)
+            result = await self.session.execute(query)
+            records = {record.uuid: record for record in result.scalars()}
+        except Exception as exc:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        logger.debug(f"Loaded {len(records)} of {len(pending)} records in one query")
+        self._records.update(records)
+        for uuid, future in pending.items():
+            if not future.done():
+                future.set_result(records.get(uuid))
+
+
+class UnitOfWork:
+    """
+    Services and loaders of a session. It is kept in the info of the session, so every service created with the
+    session shares it, whether the service was created by a dependency or by another service.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._services: Dict[Tuple[type, Tuple], Any] = {}
+        self._loaders: Dict[Hashable, ModelLoader] = {}
+
+    @classmethod
+    def of(cls, session: AsyncSession) -> "UnitOfWork":
+        """Unit of work of the session, created on first use"""
+        unit_of_work = session.info.get("unit_of_work")
+        if unit_of_work is None:
+            unit_of_work = session.info["unit_of_work"] = cls(session)
+        return unit_of_work
+
+    def get_service(self, service_class: Type[ServiceType], **kwargs) -> ServiceType:
+        """
+        Get the service of the class, created once per unit of work
+        :param service_class: Class of the service
+        :param kwargs: Other arguments of the service, services with different arguments are kept separately
+        :return: Service instance
+        """
+        key = (service_class, tuple(sorted(kwargs.items())))
+        service = self._services.get(key)
+        if service is None:
+            service = self._services[key] = service_class(session=self.session, **kwargs)
+        return service
+
+    def get_loader(self, model: Hashable, query_builder: Callable[[List[UUID]], Executable]) -> ModelLoader:
+        """
+        Get the loader of the model, created once per unit of work
+        :param model: Model whose records are loaded
+        :param query_builder: Builds the statement fetching the records of the uuids
+        :return: Loader of the model
+        """
+        loader = self._loaders.get(model)
+        if loader is None:
+            loader = self._loaders[model] = ModelLoader(self.session, query_builder)
+        return loader
+
+    def expire(self, model: Hashable):
+        """Forget the loaded records of the model, they are refreshed from the database when they are loaded again"""
+        loader = self._loaders.get(model)
+        if loader is not None:
+            loader.clear()
@@ -0,0 +1,150 @@
+"""
+Invalidation of the in-process caches across the workers.
+Write paths invalidate the entities they change with `invalidation_bus.invalidate`, which evicts them from the caches
+of the worker right away and queues an invalidation message on the session. The queued messages are sent as NOTIFY
+just before the session commits, so PostgreSQL delivers them to every worker once the change is committed (and never
+if it is rolled back), where the caches watching the entity evict it. The sender gets them as well, which evicts
+whatever was cached by another request of the worker between the write and the commit.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+import orjson
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import LocalCache, attempts_cache, papers_cache, rankings_cache
+from app.core.db.notifications import CACHE_INVALIDATION_CHANNEL, build_notify, notification_listener
+from app.core.metrics import cache_invalidations_total
+from app.core.models.attempts import AttemptsModel
+from app.core.models.exams import PapersModel
+from app.core.snapshots import get_paper_keys, snapshot_store
+
+# Entity uuids per message, every uuid takes 39 bytes of the payload, which is limited to 8000 bytes
+MAX_IDS_PER_MESSAGE = 150
+
+# Key of the queued invalidations in the info of the session, entity -> uuids, None for all the records of the entity
+PENDING_KEY = "pending_invalidations"
+
+# Called with the uuids of the invalidated records, None when all the records of the entity are invalidated
+InvalidationWatcher = Callable[[Optional[List[UUID]]], None]
+
+
+class InvalidationBus:
+    """Watchers of every entity, i.e. the caches holding something built from the records of the entity"""
+
+    def __init__(self):
+        self._watchers: Dict[str, List[InvalidationWatcher]] = {}
+
+    def watch(self, entity: str, watcher: InvalidationWatcher):
+        """
+        Call the watcher whenever records of the entity are invalidated, in any worker
+        :param entity: Table name of the entity, say papers
+        :param watcher: Function taking the uuids of the invalidated records, None for all the records
+        """
+        self._watchers.setdefault(entity, []).append(watcher)
+
+    def invalidate(self, session: AsyncSession, entity: str, uuids: Optional[Iterable[UUID]] = None):
+        """
+        Evict the records of the entity from the caches of this worker, and from the other workers once the session
+        commits
+        :param session: Session of the change
+        :param entity: Table name of the entity
+        :param uuids: UUIDs of the changed records, None if every record might have changed
+        """
+        uuids = None if uuids is None else list(uuids)
+        self.apply(entity, uuids, origin="local")
+
+        pending: Dict[str, Optional[Set[UUID]]] = session.info.setdefault(PENDING_KEY, {})
+        if uuids is None:
+            pending[entity] = None
+        elif entity not in pending or pending[entity] is not None:
+            pending.setdefault(entity, set()).update(uuids)
+
+    def apply(self, entity: str, uuids: Optional[List[UUID]], origin: str):
+        """Call the watchers of the entity"""
+        for watcher in self._watchers.get(entity, ()):
+            watcher(uuids)
+        cache_invalidations_total.inc(entity, origin)
+
+    def handle(self, payload: str):
+        """Apply an invalidation message of any worker, called by the notification listener"""
+        message = orjson.loads(payload)
+        uuids = None if message["uuids"] is None else [UUID(uuid) for uuid in message["uuids"]]
+        self.apply(message["entity"], uuids, origin="notification")
+        logger.debug(f"Invalidated {len(uuids) if uuids is not None else 'all'} {message['entity']} records")
+
+    def reset(self):
+        """Invalidate every entity, as the messages sent while the worker was not listening are lost"""
+        for entity in self._watchers:
+            self.apply(entity, None, origin="reconnect")
+        logger.info("Invalidated the caches of every entity, after listening for notifications again")
+
+    @staticmethod
+    def get_messages(pending: Dict[str, Optional[Set[UUID]]]) -> List[str]:
+        """Payloads of the queued invalidations, the uuids of an entity are split across messages"""
+        messages = []
+        for entity, uuids in pending.items():
+            if uuids is None:
+                messages.append(orjson.dumps({"entity": entity, "uuids": None}).decode())
+                continue
+
+            uuids = [str(uuid) for uuid in uuids]
+            for idx in range(0, len(uuids), MAX_IDS_PER_MESSAGE):
+                message = {"entity": entity, "uuids": uuids[idx : idx + MAX_IDS_PER_MESSAGE]}
+                messages.append(orjson.dumps(message).decode())
+        return messages
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, "before_commit")
+def _send_invalidations(session: Session):
+    """Send the queued invalidations in the transaction being committed, they are delivered once it is committed"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    # Runs within the greenlet of the async session, so statements are executed the sync way
+    for message in invalidation_bus.get_messages(pending):
+        session.execute(build_notify(CACHE_INVALIDATION_CHANNEL, message))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session: Session, _previous_transaction):
+    """Nothing changed, so the queued invalidations are not sent"""
+    session.info.pop(PENDING_KEY, None)
+
+
+def watch_cache(cache: LocalCache) -> InvalidationWatcher:
+    """Watcher evicting the entries tagged with the invalidated uuids from a cache"""
+
+    def evict(uuids: Optional[List[UUID]]):
+        if uuids is None:
+            cache.clear()
+            return
+        for uuid in uuids:
+            cache.evict_tag(uuid)
+
+    return evict
+
+
+def discard_paper_snapshots(uuids: Optional[List[UUID]]):
+    """
+    Watcher discarding the snapshots of the invalidated papers from the snapshot store, in its writer thread as it runs
+    on the event loop. Snapshots are not discarded when every paper is invalidated, as the snapshots of the papers that
+    are not published anymore are never served.
+    """
+    if uuids is not None:
+        snapshot_store.discard_later(key for uuid in uuids for key in get_paper_keys(uuid))
+
+
+invalidation_bus.watch(PapersModel.__tablename__, watch_cache(papers_cache))
+invalidation_bus.watch(PapersModel.__tablename__, watch_cache(rankings_cache))
+invalidation_bus.watch(PapersModel.__tablename__, discard_paper_snapshots)
+invalidation_bus.watch(AttemptsModel.__tablename__, watch_cache(attempts_cache))
+
+notification_listener.subscribe(CACHE_INVALIDATION_CHANNEL, invalidation_bus.handle)
+notification_listener.on_reconnect(invalidation_bus.reset)
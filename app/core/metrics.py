@@ -0,0 +1,190 @@
+"""
+In-process metrics of a worker, exposed in the Prometheus text format on `/metrics`.
+Metrics are plain dicts keyed by the label values, recording a value is a dict lookup and an addition.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Buckets (in seconds) for the request latency, from 5ms to 10s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets (in bytes) for the response size, from 100B to 10MB
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    if not label_names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)) + "}"
+
+
+class Metric:
+    """Base class of the metrics, values are stored per combination of label values"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.render_samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Value that only goes up, say number of requests"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values)} {value}"
+            for label_values, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, say number of requests in progress"""
+
+    type_name = "gauge"
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float):
+        self.values[label_values] = value
+
+
+class Histogram(Metric):
+    """Distribution of the observed values over the buckets, say request latency"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        # Label values -> [count of every bucket (last one is +Inf), sum, count]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        sample = self.values.get(label_values)
+        if sample is None:
+            sample = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        # Counts are stored per bucket and made cumulative while rendering
+        sample[0][bisect_left(self.buckets, value)] += 1
+        sample[1] += value
+        sample[2] += 1
+
+    def render_samples(self) -> List[str]:
+        lines = []
+        for label_values, (bucket_counts, total, count) in self.values.items():
+            cumulative_count = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative_count += bucket_count
+                labels = _format_labels((*self.label_names, "le"), (*label_values, bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative_count}")
+
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of the metrics exposed on `/metrics`"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text format"""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+# HTTP metrics, recorded by ExaminaRouteWrapper per route template
+http_requests_total = metrics_registry.register(
+    Counter("examina_http_requests_total", "Number of requests served", ("method", "route", "status"))
+)
+http_request_errors_total = metrics_registry.register(
+    Counter(
+        "examina_http_request_errors_total", "Number of requests that raised an error", ("method", "route", "status")
+    )
+)
+http_requests_in_flight = metrics_registry.register(
+    Gauge("examina_http_requests_in_flight", "Number of requests being served", ("method", "route"))
+)
+http_request_duration_seconds = metrics_registry.register(
+    Histogram("examina_http_request_duration_seconds", "Time taken to serve the request", ("method", "route", "status"))
+)
+http_response_size_bytes = metrics_registry.register(
+    Histogram(
+        "examina_http_response_size_bytes",
+        "Size of the response body, before compression",
+        ("method", "route"),
+        buckets=SIZE_BUCKETS,
+    )
+)
+
+# Service metrics
+cache_requests_total = metrics_registry.register(
+    Counter("examina_cache_requests_total", "Number of lookups in the in-process caches", ("cache", "result"))
+)
+cache_invalidations_total = metrics_registry.register(
+    Counter(
+        "examina_cache_invalidations_total",
+        "Number of invalidations applied to the in-process caches",
+        ("entity", "origin"),
+    )
+)
+db_rows_inserted_total = metrics_registry.register(
+    Counter("examina_db_rows_inserted_total", "Number of rows inserted by the services", ("table",))
+)
+db_pool_connections = metrics_registry.register(
+    Gauge("examina_db_pool_connections", "Connections of the async database pool", ("state",))
+)
+autosave_pending_responses = metrics_registry.register(
+    Gauge("examina_autosave_pending_responses", "Responses waiting in the autosave buffer to be written")
+)
+autosave_flushes_total = metrics_registry.register(
+    Counter("examina_autosave_flushes_total", "Number of flushes of the autosave buffer", ("result",))
+)
+autosave_rows_flushed_total = metrics_registry.register(
+    Counter("examina_autosave_rows_flushed_total", "Number of responses written by the autosave buffer")
+)
+autosave_rows_dropped_total = metrics_registry.register(
+    Counter(
+        "examina_autosave_rows_dropped_total", "Number of responses of the autosave buffer rejected by the database"
+    )
+)
+attempt_timers_active = metrics_registry.register(
+    Gauge("examina_attempt_timers_active", "Attempts having a timer in the worker")
+)
+attempt_timer_events_total = metrics_registry.register(
+    Counter("examina_attempt_timer_events_total", "Number of expired attempt timers", ("event",))
+)
@@ -1,10 +1,8 @@
 # Importing all the models from the respective files
-from app.core.db.session import engine
+# Tables are created by the migrations (app.core.db.migrations), not at import
+from .attempts import *
 
 # DO NOT CHANGE THE ORDER OF IMPORT UNLESS NECESSARY
 from .base import Base
 from .exams import *
 from .questions import *
-
-# Creating tables in database
-Base.metadata.create_all(bind=engine)
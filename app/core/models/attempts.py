@@ -0,0 +1,56 @@
+from sqlalchemy import UUID, BigInteger, Boolean, Column
+from sqlalchemy import Enum as SqlAlchemyEnum
+from sqlalchemy import Float, ForeignKey, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY, TIMESTAMP
+
+from app.config import configuration
+from app.core.models.base import Base
+from app.enums import AttemptStatusEnum
+
+
+class AttemptsModel(Base):  # An attempt of a paper by a candidate
+    __tablename__ = "attempts"
+
+    paper_id = Column(UUID(as_uuid=True), ForeignKey("papers.uuid"), nullable=False)
+    candidate_id = Column(String(128), nullable=False)  # Identifier of the candidate in the CBT client
+    candidate_seed = Column(String(128), nullable=True)  # Seed used to shuffle the paper for the candidate
+    status = Column(
+        SqlAlchemyEnum(AttemptStatusEnum, schema=configuration.POSTGRES_DATABASE_SCHEMA),
+        nullable=False,
+        default=AttemptStatusEnum.IN_PROGRESS,
+    )
+    started_at = Column(TIMESTAMP, nullable=False)
+    deadline_at = Column(TIMESTAMP, nullable=False)  # Attempt is submitted automatically at the deadline
+    submitted_at = Column(TIMESTAMP, nullable=True)
+    score = Column(Float, nullable=True)  # Graded on submission
+    section_scores = Column(ARRAY(Float), nullable=True)  # Score of every section, in the order of the paper
+    response_sheet = Column(LargeBinary, nullable=True)  # Packed ResponseSheet, written on submission
+    analyzed_at = Column(TIMESTAMP, nullable=True)  # Time at which the attempt was added to the item statistics
+
+    __table_args__ = (UniqueConstraint("paper_id", "candidate_id", name="unique_paper_candidate"),)
+
+
+class ResponsesModel(Base):  # Latest response of a candidate for a question, written by the autosave buffer
+    __tablename__ = "responses"
+
+    attempt_id = Column(UUID(as_uuid=True), ForeignKey("attempts.uuid"), nullable=False)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.uuid"), nullable=False)
+    selected_mask = Column(Integer, nullable=True)  # In case of MCQ/MSQ, bitmask of the selected options
+    value = Column(Float, nullable=True)  # In case of value problems
+    is_marked_for_review = Column(Boolean, nullable=False, default=False)
+    time_spent = Column(Integer, nullable=False, default=0)  # Time in seconds
+    # Sequence of the autosave in the client, a write with a lower sequence than the stored one is ignored
+    sequence = Column(BigInteger, nullable=False)
+
+    __table_args__ = (UniqueConstraint("attempt_id", "question_id", name="unique_attempt_question"),)
+
+
+class RankBucketsModel(Base):  # Number of candidates of a paper having a score, used to rank the candidates
+    __tablename__ = "rank_buckets"
+
+    paper_id = Column(UUID(as_uuid=True), ForeignKey("papers.uuid"), nullable=False)
+    section_index = Column(Integer, nullable=False)  # Index of the section, -1 for the whole paper
+    score = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("paper_id", "section_index", "score", name="unique_paper_section_score"),)
@@ -22,6 +22,8 @@ Base = declarative_base(cls=BaseMixin, metadata=metadata)
 # Soft delete
 class SoftDeleteBaseMixin(BaseMixin):
     is_deleted = Column(Boolean, default=False)
+    # Records deleted together (e.g. an exam with its papers) share the time, so that they are restored together
+    deleted_at = Column(TIMESTAMP, nullable=True)
 
 
 SoftDeleteBase = declarative_base(cls=SoftDeleteBaseMixin, metadata=metadata)
@@ -1,6 +1,7 @@
 from sqlalchemy import UUID, Boolean, Column
 from sqlalchemy import Enum as SqlAlchemyEnum
 from sqlalchemy import Float, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.config import configuration
 from app.core.models.base import Base, SoftDeleteBase
@@ -26,6 +27,12 @@ class QuestionsModel(SoftDeleteBase):
     difficulty = Column(Integer, nullable=False, default=500)
     source = Column(String(128), nullable=True)
     language_id = Column(UUID(as_uuid=True), ForeignKey("language.uuid"), nullable=False)
+    # Edits add a new version of the question instead of changing it, papers link a specific version
+    root_id = Column(UUID(as_uuid=True), ForeignKey("questions.uuid"), nullable=True)  # First version, null for itself
+    version = Column(Integer, nullable=False, default=1)
+    is_latest = Column(Boolean, nullable=False, default=True)
+
+    __table_args__ = (UniqueConstraint("root_id", "version", name="unique_question_version"),)
 
 
 class SubjectsModel(SoftDeleteBase):
@@ -77,3 +84,21 @@ class LanguageModel(Base):
     __tablename__ = "language"
 
     name = Column(SqlAlchemyEnum(LanguageEnum, schema=configuration.POSTGRES_DATABASE_SCHEMA), nullable=False)
+
+
+class QuestionStatisticsModel(Base):  # Item statistics of a question, aggregated from the graded attempts
+    __tablename__ = "question_statistics"
+
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.uuid"), nullable=False)
+    responses = Column(Integer, nullable=False, default=0)  # Number of graded attempts having the question
+    attempted = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    # Sums of the normalized scores (score / maximum score of the paper) of the attempts, for the discrimination index
+    score_sum = Column(Float, nullable=False, default=0)
+    score_square_sum = Column(Float, nullable=False, default=0)
+    correct_score_sum = Column(Float, nullable=False, default=0)
+    option_counts = Column(ARRAY(Integer), nullable=False, default=[])  # Selections of every option, in option_order
+    p_value = Column(Float, nullable=True)  # Fraction of the attempts that answered correctly
+    discrimination = Column(Float, nullable=True)  # Point-biserial correlation of correctness and normalized score
+
+    __table_args__ = (UniqueConstraint("question_id", name="unique_question_statistics"),)
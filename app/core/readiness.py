@@ -0,0 +1,119 @@
+"""
+Readiness of the worker. The lifespan runs the startup stages (say warming up the pool) through `readiness`, and the
+worker is reported ready by `/ready` once every stage is done, so the load balancer sends requests to warm workers only.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from app.config import configuration
+
+
+class StartupStage:
+    """A stage of the startup, run with a timeout"""
+
+    __slots__ = ("name", "function", "timeout", "required", "duration", "error")
+
+    def __init__(self, name: str, function: Callable[[], Awaitable], timeout: float, required: bool):
+        self.name = name
+        self.function = function
+        self.timeout = timeout
+        # The worker is not ready while a required stage has failed, others are done even if they fail
+        self.required = required
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_done(self) -> bool:
+        return self.duration is not None and (self.error is None or not self.required)
+
+    async def run(self) -> bool:
+        """Run the stage, return whether it succeeded"""
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.function(), timeout=self.timeout)
+            self.error = None
+        except asyncio.TimeoutError:
+            self.error = f"Timed out after {self.timeout}s"
+        except Exception as exc:
+            self.error = repr(exc)
+        self.duration = time.perf_counter() - start_time
+
+        if self.error:
+            logger.warning(f"Startup stage {self.name} failed: {self.error}")
+        else:
+            logger.info(f"Startup stage {self.name} completed in {self.duration * 1000:.0f}ms")
+        return self.error is None
+
+    def to_dict(self) -> Dict:
+        return {
+            "done": self.is_done,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "error": self.error,
+        }
+
+
+class Readiness:
+    """Startup stages of the worker and the time taken by the startup"""
+
+    def __init__(self):
+        self.stages: Dict[str, StartupStage] = {}
+        self.started_at: Optional[float] = None
+        self.startup_duration: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def begin(self):
+        """Mark the start of the startup, the stages of a previous startup are discarded"""
+        self.stages = {}
+        self.started_at = time.perf_counter()
+        self.startup_duration = None
+
+    def finish(self):
+        """Mark the end of the startup, and warn if it took longer than the budget"""
+        self.startup_duration = time.perf_counter() - (self.started_at or time.perf_counter())
+        if self.startup_duration > configuration.STARTUP_TIME_BUDGET:
+            logger.warning(
+                f"Startup took {self.startup_duration:.2f}s, over the budget of {configuration.STARTUP_TIME_BUDGET}s"
+            )
+        else:
+            logger.info(f"Startup completed in {self.startup_duration * 1000:.0f}ms")
+
+    async def run_stage(
+        self, name: str, function: Callable[[], Awaitable], timeout: float, required: bool = True
+    ) -> bool:
+        """
+        Run a startup stage
+        :param name: Name of the stage, as reported by `/ready`
+        :param function: Coroutine function of the stage
+        :param timeout: Time allowed for the stage in seconds
+        :param required: Whether the worker is not ready while the stage has failed (it is retried by `retry`)
+        :return: Whether the stage succeeded
+        """
+        stage = self.stages[name] = StartupStage(name, function, timeout, required)
+        return await stage.run()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.startup_duration is not None and all(stage.is_done for stage in self.stages.values())
+
+    async def retry(self):
+        """Run the failed required stages again, e.g. the database was not reachable when the worker started"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            for stage in self.stages.values():
+                if not stage.is_done:
+                    await stage.run()
+
+    def to_dict(self) -> Dict:
+        return {
+            "ready": self.is_ready,
+            "startup_ms": round(self.startup_duration * 1000, 2) if self.startup_duration is not None else None,
+            "startup_budget_ms": configuration.STARTUP_TIME_BUDGET * 1000,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.enums import AttemptStatusEnum
+
+# DATABASE SCHEMAS
+
+
+class AttemptsCreateDatabaseSchema(BaseModel):
+    paper_id: UUID
+    candidate_id: str
+    candidate_seed: Optional[str]
+    started_at: datetime
+    deadline_at: datetime
+
+
+class AttemptsUpdateDatabaseSchema(BaseModel):
+    status: Optional[AttemptStatusEnum]
+    submitted_at: Optional[datetime]
+    score: Optional[float]
+    section_scores: Optional[List[float]]
+    response_sheet: Optional[bytes]
+
+
+class ResponsesCreateDatabaseSchema(BaseModel):
+    attempt_id: UUID
+    question_id: UUID
+    selected_mask: Optional[int]
+    value: Optional[float]
+    is_marked_for_review: bool
+    time_spent: int
+    sequence: int
+
+
+class ResponsesUpdateDatabaseSchema(BaseModel):
+    selected_mask: Optional[int]
+    value: Optional[float]
+    is_marked_for_review: Optional[bool]
+    time_spent: Optional[int]
+    sequence: Optional[int]
+
+
+class RankBucketsCreateDatabaseSchema(BaseModel):
+    paper_id: UUID
+    section_index: int
+    score: float
+    count: int
+
+
+class RankBucketsUpdateDatabaseSchema(BaseModel):
+    count: Optional[int]
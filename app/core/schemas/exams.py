@@ -39,6 +39,8 @@ class PapersUpdateDatabaseSchema(BaseModel):
 
 class ExamPatternSettingsSchema(BaseModel):
     total_time: int
+    # Sections are attempted one after the other, each section is locked once its section time is over
+    is_sectional_timing: bool = Field(default=False)
     is_calculator_allowed: bool = Field(default=False)
     calculator_type: Optional[CalculatorTypeEnum] = Field(default=CalculatorTypeEnum.NORMAL)
 
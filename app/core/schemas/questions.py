@@ -90,6 +90,19 @@ class LanguageCreateUpdateSchema(BaseModel):
     name: LanguageEnum
 
 
+class QuestionStatisticsCreateUpdateSchema(BaseModel):
+    question_id: UUID
+    responses: int
+    attempted: int
+    correct: int
+    score_sum: float
+    score_square_sum: float
+    correct_score_sum: float
+    option_counts: List[int]
+    p_value: Optional[float]
+    discrimination: Optional[float]
+
+
 # AUXILIARY SCHEMAS
 
 
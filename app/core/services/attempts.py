@@ -0,0 +1,404 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.core.cache import attempts_cache
+from app.core.db.session import async_session_maker
+from app.core.invalidation import invalidation_bus
+from app.core.models.attempts import AttemptsModel
+from app.core.models.exams import PapersModel
+from app.core.schemas.attempts import AttemptsCreateDatabaseSchema, AttemptsUpdateDatabaseSchema
+from app.core.services.autosave import responses_buffer
+from app.core.services.base import BaseService
+from app.core.services.exams import PapersService
+from app.core.services.packing import PaperLayout, ResponseSheet
+from app.core.services.ranking import RankingService
+from app.core.services.responses import ResponsesService
+from app.core.services.timers import AttemptTimer, attempt_timers, get_section_times, to_datetime
+from app.enums import AttemptStatusEnum, PapersStatusEnum, QuestionTypeEnum
+from app.schemas import (
+    AttemptCreateSchema,
+    AttemptRankSchema,
+    AttemptTimerSchema,
+    CandidateResponseSchema,
+    CBTSkeletonSchema,
+    SectionRankSchema,
+)
+from app.utils.exceptions.common_exceptions import DataLogicException, UUIDNotFoundException
+
+
+class AttemptsService(BaseService[AttemptsModel, AttemptsCreateDatabaseSchema, AttemptsUpdateDatabaseSchema]):
+    def __init__(self, **kwargs):
+        super().__init__(model=AttemptsModel, **kwargs)
+
+    # Create Functions
+
+    async def create_attempt(self, attempt_data: AttemptCreateSchema) -> AttemptsModel:
+        """
+        Start the attempt of a paper by a candidate. A candidate has a single attempt of a paper, so the existing attempt
+        is returned if the candidate starts again (say after a reload of the CBT client). Only published papers can be
+        attempted.
+        :param attempt_data: Paper and candidate details
+        :return: Attempt instance
+        """
+        paper_instance = await self.get_service(PapersService, raised_http_exception_on_not_found=False).get(
+            attempt_data.paper_id
+        )
+        if not paper_instance or paper_instance.is_deleted:
+            raise UUIDNotFoundException(model=PapersModel, uuid=attempt_data.paper_id)
+
+        attempt_instances = await self.filter(
+            [self.model.paper_id == attempt_data.paper_id, self.model.candidate_id == attempt_data.candidate_id]
+        )
+        if attempt_instances:
+            logger.info(
+                f"Candidate {attempt_data.candidate_id} already has an attempt of paper {attempt_data.paper_id}"
+            )
+            return attempt_instances[0]
+
+        # Content of a draft can still change, so the responses would not match the layout of the paper
+        if paper_instance.status != PapersStatusEnum.PUBLISHED:
+            raise DataLogicException(
+                f"Paper with ID {attempt_data.paper_id} has {paper_instance.status.value} status and cannot be attempted"
+            )
+
+        # Deadline is fixed at the start, so that changes in the timing of the paper do not affect running attempts
+        skeleton = (await self.get_service(PapersService).get_skeleton_entry(attempt_data.paper_id)).value
+        started_at = datetime.utcnow()
+        attempt_instance = await self.create(
+            AttemptsCreateDatabaseSchema(
+                **attempt_data.dict(),
+                started_at=started_at,
+                deadline_at=started_at + timedelta(minutes=skeleton.settings.total_time),
+            )
+        )
+
+        attempt_timers.schedule(self.build_timer(attempt_instance, skeleton))
+        return attempt_instance
+
+    # Get Functions
+
+    async def get_active_attempt(self, attempt_id: UUID) -> AttemptTimer:
+        """
+        Validate that the attempt is in progress and within its time, served from the cache so that autosaves do not
+        hit the database. The timer of the attempt is scheduled in the worker, if not already.
+        :param attempt_id: UUID for the attempt
+        :return: Timer of the attempt
+        """
+        timer = attempts_cache.get(attempt_id)
+        if timer is None:
+            attempt_instance = await self.get(attempt_id)
+            if attempt_instance.status != AttemptStatusEnum.IN_PROGRESS:
+                raise DataLogicException(f"Attempt with ID {attempt_id} is already {attempt_instance.status.value}")
+
+            skeleton = (await self.get_service(PapersService).get_skeleton_entry(attempt_instance.paper_id)).value
+            timer = attempt_timers.schedule(self.build_timer(attempt_instance, skeleton))
+            attempts_cache.set(attempt_id, timer, tags=[attempt_id])
+
+        if timer.is_expired(time.time()):
+            raise DataLogicException(f"Time of the attempt with ID {attempt_id} is over")
+        return timer
+
+    @staticmethod
+    def build_timer(attempt_instance: AttemptsModel, skeleton: Optional[CBTSkeletonSchema]) -> AttemptTimer:
+        """Timer of the attempt, sections are timed as per the skeleton of the paper"""
+        return AttemptTimer(
+            attempt_instance.uuid,
+            attempt_instance.paper_id,
+            attempt_instance.started_at,
+            attempt_instance.deadline_at,
+            section_times=get_section_times(skeleton) if skeleton else None,
+        )
+
+    async def get_timer(self, attempt_id: UUID) -> AttemptTimerSchema:
+        """
+        Get the deadlines of an attempt along with the time of the server, so that the client shows the remaining time
+        as per the server
+        :param attempt_id: UUID for the attempt
+        :return: Deadlines of the attempt
+        """
+        timer = await self.get_active_attempt(attempt_id)
+        now = time.time()
+        return AttemptTimerSchema(
+            server_time=to_datetime(now),
+            started_at=to_datetime(timer.started_at),
+            deadline_at=to_datetime(timer.deadline),
+            section_ends=[to_datetime(section_end) for section_end in timer.section_ends],
+            open_section=timer.get_open_section(now),
+        )
+
+    async def get_responses(self, attempt_id: UUID) -> List[CandidateResponseSchema]:
+        """
+        Get the latest responses of an attempt, the responses in the autosave buffer are newer than the saved ones
+        :param attempt_id: UUID for the attempt
+        :return: List of responses
+        """
+        attempt_instance = await self.get(attempt_id)
+        layout = await self.get_service(PapersService).get_layout(attempt_instance.paper_id)
+
+        return [
+            CandidateResponseSchema(
+                question_id=response["question_id"],
+                selected_options=layout.decode_options(response["question_id"], response["selected_mask"])
+                if response["selected_mask"]
+                else None,
+                value=response["value"],
+                is_marked_for_review=response["is_marked_for_review"],
+                time_spent=response["time_spent"],
+                sequence=response["sequence"],
+            )
+            for response in await self.get_latest_responses(attempt_id)
+        ]
+
+    async def get_latest_responses(self, attempt_id: UUID) -> List[Dict]:
+        """
+        Merge the saved responses of an attempt with the ones in the autosave buffer, the higher sequence wins
+        :param attempt_id: UUID for the attempt
+        :return: Responses in the format of ResponsesCreateDatabaseSchema
+        """
+        responses: Dict[UUID, Dict] = {
+            response_instance.question_id: self.get_model_instance_as_dict(response_instance)
+            for response_instance in await self.get_service(ResponsesService).get_responses(attempt_id)
+        }
+        for pending_response in responses_buffer.get_pending(attempt_id):
+            saved_response = responses.get(pending_response["question_id"])
+            if saved_response is None or saved_response["sequence"] < pending_response["sequence"]:
+                responses[pending_response["question_id"]] = pending_response
+        return list(responses.values())
+
+    async def get_response_sheet(self, attempt_id: UUID) -> bytes:
+        """
+        Get the responses of an attempt packed as per the layout of the paper, used to export the responses
+        :param attempt_id: UUID for the attempt
+        :return: Packed ResponseSheet, the one stored on submission for a submitted attempt
+        """
+        attempt_instance = await self.get(attempt_id)
+        if attempt_instance.response_sheet is not None:
+            return attempt_instance.response_sheet
+
+        layout = await self.get_service(PapersService).get_layout(attempt_instance.paper_id)
+        return self.pack_responses(layout, await self.get_latest_responses(attempt_id)).to_bytes()
+
+    @staticmethod
+    def matches_question_type(question_type: QuestionTypeEnum, response: CandidateResponseSchema) -> bool:
+        """Check if a response has the answer of its question type, an empty response clears the answer"""
+        if question_type == QuestionTypeEnum.NAT:
+            return not response.selected_options
+        if response.value is not None:
+            return False
+        return question_type == QuestionTypeEnum.MSQ or len(response.selected_options or []) <= 1
+
+    @staticmethod
+    def pack_responses(layout: PaperLayout, responses: List[Dict]) -> ResponseSheet:
+        return ResponseSheet.from_responses(
+            layout,
+            ((response["question_id"], response["selected_mask"], response["value"]) for response in responses),
+        )
+
+    # Update Functions
+
+    async def save_responses(self, attempt_id: UUID, responses: List[CandidateResponseSchema]) -> int:
+        """
+        Autosave the responses of an attempt. Responses are added to the write-behind buffer and written to the
+        database with the next flush, so an autosave does not hit the database once the attempt is cached.
+        :param attempt_id: UUID for the attempt
+        :param responses: Responses of the candidate
+        :return: Number of responses accepted
+        """
+        timer = await self.get_active_attempt(attempt_id)
+
+        layout = await self.get_service(PapersService).get_layout(timer.paper_id)
+        invalid_question_ids = [response.question_id for response in responses if response.question_id not in layout]
+        if invalid_question_ids:
+            raise DataLogicException(
+                f"Questions do not belong to the paper {timer.paper_id}",
+                question_ids=[str(uuid) for uuid in invalid_question_ids],
+            )
+
+        # Responses are graded as per the type of their question, so a value for MCQ/MSQ, options for NAT or more than one
+        # option for MCQ are rejected
+        mismatched_question_ids = [
+            response.question_id
+            for response in responses
+            if not self.matches_question_type(layout.get_question_type(response.question_id), response)
+        ]
+        if mismatched_question_ids:
+            raise DataLogicException(
+                "Responses do not match the type of their questions",
+                question_ids=[str(uuid) for uuid in mismatched_question_ids],
+            )
+
+        # With sectional timing, only the responses of the open section are accepted
+        now = time.time()
+        locked_question_ids = [
+            response.question_id
+            for response in responses
+            if not timer.is_section_open(layout.get_section(response.question_id), now)
+        ]
+        if locked_question_ids:
+            raise DataLogicException(
+                "Sections of the questions are not open", question_ids=[str(uuid) for uuid in locked_question_ids]
+            )
+
+        # Selected options are buffered and saved as the bitmask over the options of the question
+        return responses_buffer.add(
+            attempt_id,
+            (
+                {
+                    **response.dict(exclude={"selected_options"}),
+                    "selected_mask": layout.encode_options(response.question_id, response.selected_options)
+                    if response.selected_options
+                    else None,
+                }
+                for response in responses
+            ),
+        )
+
+    async def submit(self, attempt_id: UUID) -> AttemptsModel:
+        """
+        Submit the attempt, the pending responses of the attempt are written along with the submission
+        :param attempt_id: UUID for the attempt
+        :return: Attempt instance that was submitted
+        """
+        # Locked, so that a double submit or the timer of the attempt waits and then finds it submitted, an attempt is
+        # graded (and counted in the ranking) once. Autosaves of the attempt being flushed by the other workers are
+        # committed before the lock is granted and graded, the ones flushed later are rejected by the upsert
+        attempt_instance = await self.session.scalar(
+            select(self.model)
+            .where(self.model.uuid == attempt_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        if attempt_instance is None:
+            raise UUIDNotFoundException(model=self.model, uuid=attempt_id)
+        if attempt_instance.status != AttemptStatusEnum.IN_PROGRESS:
+            raise DataLogicException(f"Attempt with ID {attempt_id} is already {attempt_instance.status.value}")
+
+        return await self.submit_attempt(attempt_instance)
+
+    async def submit_expired(self, attempt_ids: List[UUID]) -> int:
+        """
+        Submit the attempts that ran out of time. Attempts locked by an autosave flush are waited for, the ones being
+        submitted by another worker (or the candidate) are skipped once their lock is released, as they are no longer in
+        progress. Locked in the order of the uuids, like the flushes, so that the workers do not deadlock.
+        :param attempt_ids: UUIDs of the attempts
+        :return: Number of attempts submitted
+        """
+        result = await self.session.scalars(
+            select(self.model)
+            .where(self.model.uuid.in_(attempt_ids), self.model.status == AttemptStatusEnum.IN_PROGRESS)
+            .order_by(self.model.uuid)
+            .with_for_update()
+        )
+        attempt_instances = result.all()
+        for attempt_instance in attempt_instances:
+            await self.submit_attempt(attempt_instance)
+        return len(attempt_instances)
+
+    async def submit_attempt(self, attempt_instance: AttemptsModel) -> AttemptsModel:
+        """
+        Write the pending responses of the attempt, grade it and mark it submitted
+        :param attempt_instance: Attempt in progress
+        :return: Attempt instance that was submitted
+        """
+        attempt_id = attempt_instance.uuid
+
+        # Later autosaves read the status of the attempt from the database instead of the cache
+        invalidation_bus.invalidate(self.session, AttemptsModel.__tablename__, [attempt_id])
+        attempt_timers.cancel(attempt_id)
+        pending_responses = await responses_buffer.pop(attempt_id)
+        if pending_responses:
+            await self.get_service(ResponsesService).upsert_bulk(pending_responses)
+
+        # Responses are graded and stored as a packed sheet, so that results and exports do not read the responses
+        papers_service = self.get_service(PapersService)
+        layout = await papers_service.get_layout(attempt_instance.paper_id)
+        response_sheet = self.pack_responses(layout, await self.get_latest_responses(attempt_id))
+        answer_key = await papers_service.get_answer_key(attempt_instance.paper_id)
+        attempt_score = answer_key.grade(response_sheet, layout)
+        await self.get_service(RankingService).add_score(attempt_instance.paper_id, attempt_score)
+
+        return await self.update(
+            attempt_instance,
+            AttemptsUpdateDatabaseSchema(
+                status=AttemptStatusEnum.SUBMITTED,
+                submitted_at=datetime.utcnow(),
+                score=attempt_score.score,
+                section_scores=attempt_score.section_scores,
+                response_sheet=response_sheet.to_bytes(),
+            ),
+        )
+
+    async def get_rank(self, attempt_id: UUID) -> AttemptRankSchema:
+        """
+        Get the rank and percentile of a submitted attempt among the submitted attempts of the paper
+        :param attempt_id: UUID for the attempt
+        :return: Rank of the attempt in the paper and in every section
+        """
+        attempt_instance = await self.get(attempt_id)
+        if attempt_instance.status != AttemptStatusEnum.SUBMITTED:
+            raise DataLogicException(f"Attempt with ID {attempt_id} is not submitted yet")
+
+        paper_id = attempt_instance.paper_id
+        ranking = await self.get_service(RankingService).get_ranking(paper_id)
+        section_scores = attempt_instance.section_scores or []
+        (rank, percentile), *section_ranks = ranking.get_ranks(attempt_instance.score, section_scores)
+        skeleton = await self.get_service(PapersService).get_skeleton(paper_id)
+
+        return AttemptRankSchema(
+            attempt_id=attempt_id,
+            score=attempt_instance.score,
+            rank=rank,
+            percentile=percentile,
+            candidates=ranking.candidates,
+            sections=[
+                SectionRankSchema(
+                    section_id=section.uuid, score=section_score, rank=section_rank, percentile=section_percentile
+                )
+                for section, section_score, (section_rank, section_percentile) in zip(
+                    skeleton.sections, section_scores, section_ranks
+                )
+            ],
+        )
+
+
+async def submit_expired_attempts(attempt_ids: List[UUID]) -> int:
+    """Submit the attempts that ran out of time, called by the attempt timers"""
+    async with async_session_maker() as session:
+        async with session.begin():
+            return await AttemptsService(session=session).submit_expired(attempt_ids)
+
+
+async def recover_attempt_timers() -> int:
+    """
+    Schedule the timers of the attempts in progress, called at the startup of the app.
+    Attempts that ran out of time while the app was down are submitted by the scheduler right away.
+    :return: Number of attempts scheduled
+    """
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(AttemptsModel).where(AttemptsModel.status == AttemptStatusEnum.IN_PROGRESS)
+        )
+        attempt_instances = result.scalars().all()
+
+        # Section times are taken from the skeleton of the paper, fetched once per paper
+        papers_service = PapersService(session=session)
+        skeletons: Dict[UUID, Optional[CBTSkeletonSchema]] = {}
+        for attempt_instance in attempt_instances:
+            if attempt_instance.paper_id not in skeletons:
+                try:
+                    skeletons[attempt_instance.paper_id] = (
+                        await papers_service.get_skeleton_entry(attempt_instance.paper_id)
+                    ).value
+                except UUIDNotFoundException:
+                    # Attempts of a paper without content are only timed by their deadline
+                    logger.warning(f"Paper {attempt_instance.paper_id} of attempts in progress not found")
+                    skeletons[attempt_instance.paper_id] = None
+            attempt_timers.schedule(AttemptsService.build_timer(attempt_instance, skeletons[attempt_instance.paper_id]))
+
+    logger.info(f"Recovered the timers of {len(attempt_instances)} attempts in progress")
+    return len(attempt_instances)
@@ -0,0 +1,199 @@
+"""
+Write-behind buffer of the autosaves.
+Autosaves are absorbed in memory and written to the database in periodic multi-row upserts, so the number of statements
+depends on the flush interval and not on the number of candidates. A crash loses at most one flush interval of
+autosaves, which the clients send again with their next autosave. Responses that the database rejects are dropped
+(counted by `examina_autosave_rows_dropped_total`), only for their attempt, so they never hold back the other attempts,
+as are the responses of the attempts submitted before they are written.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.exc import DBAPIError
+
+from app.config import configuration
+from app.core.db.session import async_session_maker
+from app.core.metrics import (
+    autosave_flushes_total,
+    autosave_pending_responses,
+    autosave_rows_dropped_total,
+    autosave_rows_flushed_total,
+)
+from app.core.services.responses import ResponsesService
+
+
+class ResponsesWriteBehindBuffer:
+    """
+    Buffer of the responses keyed by attempt and question. Writes are coalesced, so a question answered many times
+    within a flush interval is written once, with the response having the highest sequence.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # Attempt uuid -> question uuid -> response in the format of ResponsesCreateDatabaseSchema
+        self._pending: Dict[UUID, Dict[UUID, Dict]] = {}
+        self._pending_count = 0
+        # Responses being written by the flush in progress, still served to the readers until they are committed
+        self._flushing: Dict[UUID, Dict[UUID, Dict]] = {}
+
+        # Held while the responses are written, so that a submission waits for the responses being flushed.
+        # Created on first use, so that they belong to the event loop of the app (python 3.9 binds them at creation)
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def flush_lock(self) -> asyncio.Lock:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    @property
+    def flush_requested(self) -> asyncio.Event:
+        if self._flush_requested is None:
+            self._flush_requested = asyncio.Event()
+        return self._flush_requested
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    def add(self, attempt_id: UUID, responses: Iterable[Dict]) -> int:
+        """
+        Add the responses of an attempt to the buffer
+        :param attempt_id: Attempt uuid
+        :param responses: Responses having question_id and sequence
+        :return: Number of responses accepted, a response older than the buffered one is ignored
+        """
+        attempt_responses = self._pending.setdefault(attempt_id, {})
+        accepted = 0
+        for response in responses:
+            current_response = attempt_responses.get(response["question_id"])
+            if current_response is not None and current_response["sequence"] > response["sequence"]:
+                continue
+
+            if current_response is None:
+                self._pending_count += 1
+            attempt_responses[response["question_id"]] = {**response, "attempt_id": attempt_id}
+            accepted += 1
+
+        autosave_pending_responses.set(value=self._pending_count)
+        if self._pending_count >= self.max_pending:
+            self.flush_requested.set()
+        return accepted
+
+    def get_pending(self, attempt_id: UUID) -> List[Dict]:
+        """Responses of an attempt that are not written yet"""
+        return list({**self._flushing.get(attempt_id, {}), **self._pending.get(attempt_id, {})}.values())
+
+    async def pop(self, attempt_id: UUID) -> List[Dict]:
+        """
+        Remove the responses of an attempt from the buffer, so that the caller writes them.
+        Waits for the flush in progress, so that the responses of the attempt are either returned or written.
+        """
+        async with self.flush_lock:
+            responses = list(self._pending.pop(attempt_id, {}).values())
+            self._pending_count -= len(responses)
+            autosave_pending_responses.set(value=self._pending_count)
+            return responses
+
+    async def flush(self) -> int:
+        """
+        Write all the buffered responses to the database
+        :return: Number of responses written
+        """
+        async with self.flush_lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            self._flushing = pending
+            autosave_pending_responses.set(value=0)
+            if not pending:
+                return 0
+
+            try:
+                written = await self._write(pending)
+            finally:
+                self._flushing = {}
+
+        autosave_flushes_total.inc("success" if written else "error")
+        autosave_rows_flushed_total.inc(amount=written)
+        return written
+
+    async def _write(self, pending: Dict[UUID, Dict[UUID, Dict]]) -> int:
+        """
+        Write the responses of the attempts in a transaction. When the database rejects them (say a value out of the
+        range of its column), the attempts are split in halves which are written separately, so the responses of the
+        attempt it rejects are dropped without holding back the other attempts.
+        :param pending: Attempt uuid -> question uuid -> response
+        :return: Number of responses written
+        """
+        responses = [response for attempt_responses in pending.values() for response in attempt_responses.values()]
+        try:
+            async with async_session_maker() as session:
+                async with session.begin():
+                    written = await ResponsesService(session=session).upsert_bulk(responses)
+            autosave_rows_dropped_total.inc(amount=len(responses) - written)
+            return written
+        except DBAPIError as exc:
+            # Connection was lost, so the responses were not rejected, they are written by the next flush
+            if exc.connection_invalidated:
+                self._requeue(pending, exc)
+                return 0
+            if len(pending) == 1:
+                attempt_id = next(iter(pending))
+                logger.opt(exception=exc).error(f"Dropped {len(responses)} responses of attempt {attempt_id}")
+                autosave_rows_dropped_total.inc(amount=len(responses))
+                return 0
+        except Exception as exc:
+            self._requeue(pending, exc)
+            return 0
+
+        attempt_ids = list(pending)
+        halves = attempt_ids[: len(attempt_ids) // 2], attempt_ids[len(attempt_ids) // 2 :]
+        written = 0
+        for half in halves:
+            written += await self._write({attempt_id: pending[attempt_id] for attempt_id in half})
+        return written
+
+    def _requeue(self, pending: Dict[UUID, Dict[UUID, Dict]], exc: Exception):
+        """Put the responses back, autosaves received during the flush are newer and win"""
+        count = sum(len(attempt_responses) for attempt_responses in pending.values())
+        logger.opt(exception=exc).error(f"Failed to flush {count} responses, will retry in the next flush")
+        for attempt_id, attempt_responses in pending.items():
+            self.add(attempt_id, attempt_responses.values())
+
+    async def _run(self):
+        """Flush every flush interval, or earlier when too many responses are pending"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+    def start(self):
+        """Start flushing in the background, called at the startup of the app"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Autosave buffer started with flush interval of {self.flush_interval}s")
+
+    async def stop(self):
+        """Stop flushing in the background and write the pending responses, called at the shutdown of the app"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        written = await self.flush()
+        logger.info(f"Autosave buffer stopped, flushed {written} pending responses")
+
+
+responses_buffer = ResponsesWriteBehindBuffer(
+    flush_interval=configuration.AUTOSAVE_FLUSH_INTERVAL, max_pending=configuration.AUTOSAVE_MAX_PENDING
+)
@@ -1,18 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, List, Optional, Type, Union
+from datetime import datetime
+from typing import Any, Dict, Generic, Iterable, List, Optional, Tuple, Type, Union
 from uuid import UUID
 
 from fastapi_pagination import Page, Params
 from fastapi_pagination.ext.sqlalchemy import paginate
 from loguru import logger
-from sqlalchemy import Executable, ScalarResult, desc, func, not_, select, update
+from sqlalchemy import Executable, ScalarResult, cast
+from sqlalchemy import column as sql_column
+from sqlalchemy import desc, func, insert, not_, select, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 
+from app.core.db.unit_of_work import ModelLoader, ServiceType, UnitOfWork
+from app.core.metrics import db_rows_inserted_total
 from app.core.services.constants import CreateSchemaType, ModelType, SoftDeleteModelType, UpdateSchemaType
 from app.enums import IOrderEnum
 from app.logger import logger as audit_logger
 from app.utils.exceptions.common_exceptions import NoFilterFoundException, UUIDNotFoundException
 
+# Maximum number of bind parameters in a statement (asyncpg)
+MAX_STATEMENT_PARAMETERS = 32767
+
+# Records updated by a statement of update_bulk, the locks and the returned rows are bounded by the chunk
+UPDATE_BULK_CHUNK_SIZE = 5000
+
 
 class ServiceInterface(ABC, Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
@@ -30,6 +43,12 @@ class ServiceInterface(ABC, Generic[ModelType, CreateSchemaType, UpdateSchemaTyp
         self.model = model
         self.session = session
         self.raised_http_exception_on_not_found = raised_http_exception_on_not_found
+        # Shared by the services of the session, e.g. of the request
+        self.unit_of_work = UnitOfWork.of(session)
+
+    def get_service(self, service_class: Type[ServiceType], **kwargs) -> ServiceType:
+        """Service of the class sharing the session, created once per unit of work"""
+        return self.unit_of_work.get_service(service_class, **kwargs)
 
     @abstractmethod
     async def get(self, uuid: Union[UUID, str]) -> Optional[ModelType]:
@@ -64,14 +83,35 @@ class ServiceInterface(ABC, Generic[ModelType, CreateSchemaType, UpdateSchemaTyp
         """Update an instance of the model"""
 
     @abstractmethod
-    async def update_bulk(self, filters: List, updated_values: Union[UpdateSchemaType, Dict[str, Any]]):
+    async def update_bulk(self, filters: List, updated_values: Union[UpdateSchemaType, Dict[str, Any]]) -> int:
         """
         Update multiple records using filter
 
         :param filters: List of filter/condition
         :param updated_values: Updated fields values
-        :return:
+        :return: Number of records updated
+
+        """
+
+    @abstractmethod
+    async def update_from_values(self, rows: List[Dict[str, Any]], key: str = "uuid") -> int:
+        """
+        Update multiple records, each with its own values
+
+        :param rows: Values of every record, having the key column and the columns to be updated
+        :param key: Column used to match the records
+        :return: Number of records updated
+        """
+
+    @abstractmethod
+    async def copy_from_values(self, rows: List[Dict[str, Any]], key: str = "uuid", filters: List = ()) -> int:
+        """
+        Copy the records matched by the key column, replacing some of the columns of the copies
 
+        :param rows: Key value of the source records under "source" and the values of the copies
+        :param key: Column used to match the source records
+        :param filters: Additional filters on the source records
+        :return: Number of records copied
         """
 
     @abstractmethod
@@ -134,10 +174,34 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
         """Build statement to get the records"""
         return select(self.model).where(self.model.uuid.in_(uuids))
 
+    def _is_visible(self, instance: ModelType) -> bool:
+        """Check if a loaded instance is still matched by _get_records_query"""
+        return True
+
+    def _synchronize_instances(self, rows: Iterable[Dict[str, Any]]):
+        """
+        Set the values written by a bulk statement on the instances of the session, in the way of `synchronize_session`
+        of the ORM, as the bulk statements are run on the table. Records that are not loaded by the session are skipped.
+        :param rows: UUID of every record written along with its new values
+        """
+        identity_map = self.session.identity_map
+        for row in rows:
+            instance = identity_map.get(identity_key(self.model, row["uuid"]))
+            if instance is not None:
+                for name, value in row.items():
+                    if name != "uuid":
+                        set_committed_value(instance, name, value)
+
+    @property
+    def loader(self) -> ModelLoader:
+        """Loader of the model, batching the gets of the unit of work"""
+        return self.unit_of_work.get_loader(self.model, self._get_records_query)
+
     async def get(self, uuid: UUID) -> Optional[ModelType]:
-        """Get an instance of the model by uuid"""
-        result = await self.session.execute(self._get_records_query(uuids=[uuid]))
-        instance = result.scalar_one_or_none()
+        """Get an instance of the model by uuid, loaded at most once per unit of work"""
+        instance = await self.loader.load(uuid)
+        if instance is not None and not self._is_visible(instance):
+            instance = None
 
         # Raised error if instance is none and raised_exception_on_not_found is True
         if not instance and self.raised_http_exception_on_not_found:
@@ -147,8 +211,8 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
 
     async def get_by_uuids(self, uuids: List[Union[UUID, str]]) -> Optional[List[ModelType]]:
         """Get an instances of the model by list of uuid"""
-        result = await self.session.execute(self._get_records_query(uuids=uuids))
-        return result.scalars().all() or []
+        instances = await self.loader.load_many(uuids)
+        return [instance for instance in instances if instance is not None and self._is_visible(instance)]
 
     async def get_count(self) -> int:
         """Get table record count"""
@@ -165,6 +229,8 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
         db_instance = self.model(**instance.dict())
         self.session.add(db_instance)
         await self.session.flush()
+        db_rows_inserted_total.inc(self.model.__tablename__)
+        self.loader.prime([db_instance])
 
         # Log the audit and info logs
         message = f"Created new {self.model.__tablename__} record with uuid: {db_instance.uuid}"
@@ -192,6 +258,8 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
 
         # Flush the instances to the database
         await self.session.flush()  # type: ignore
+        db_rows_inserted_total.inc(self.model.__tablename__, amount=len(db_instances))
+        self.loader.prime(db_instances)
         db_instances_uuids = [str(db_instance.uuid) for db_instance in db_instances]
         logger.info(f"{self.model.__tablename__}s created with uuids: {''.join(db_instances_uuids)}")
 
@@ -243,8 +311,12 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
         )
         return current_instance
 
-    async def update_bulk(self, filters: List, updated_values: Union[UpdateSchemaType, Dict[str, Any]]) -> None:
-        """Update multiple records using filter"""
+    async def update_bulk(self, filters: List, updated_values: Union[UpdateSchemaType, Dict[str, Any]]) -> int:
+        """
+        Update multiple records using filter. The previous values are captured and the new ones applied in one
+        statement per chunk, `WITH old_rows AS (SELECT ... FOR UPDATE) UPDATE ... RETURNING old_rows.*`, so the records
+        are not loaded before the update. Chunks are walked in the order of the uuids.
+        """
         if not isinstance(updated_values, dict):
             updated_values = updated_values.dict(exclude_unset=True)
 
@@ -252,30 +324,144 @@ class BaseService(ServiceInterface, Generic[ModelType, CreateSchemaType, UpdateS
         if not filters:
             raise NoFilterFoundException(model=self.model)
 
-        # Get current instances for audit log
-        current_instances = await self.filter(filters=filters)
-
-        # Update records in bulk
-        query = update(self.model).where(*filters).values(updated_values)
-
-        # Add audit log
-        for current_instance in current_instances:
-            audit_logger.info(
-                f"Updated {self.model.__tablename__} record with uuid: {current_instance.uuid}",
-                previous_state=self.get_model_instance_as_dict(current_instance, columns=list(updated_values.keys())),
-                current_state=updated_values,
-                reference_uuid=current_instance.uuid,
-                table_name=self.model.__tablename__,
-                action="update",
+        # Pending changes of the session have to be written before the statement reads the records
+        await self.session.flush()
+        self.unit_of_work.expire(self.model)
+
+        table = self.model.__table__
+        columns = list(updated_values.keys())
+        updated_count, last_uuid = 0, None
+        while True:
+            old_rows = select(table.c.uuid, *(table.c[column] for column in columns)).where(*filters)
+            if last_uuid is not None:
+                old_rows = old_rows.where(table.c.uuid > last_uuid)
+            old_rows = old_rows.order_by(table.c.uuid).limit(UPDATE_BULK_CHUNK_SIZE).with_for_update().cte("old_rows")
+
+            query = (
+                update(table)
+                .where(table.c.uuid == old_rows.c.uuid)
+                .values(updated_values)
+                .returning(*old_rows.c, table.c.updated_at.label("new_updated_at"))
             )
-        await self.session.execute(query)
+            result = await self.session.execute(query)
+            rows = result.mappings().all()
+            self._synchronize_instances(
+                {"uuid": row["uuid"], **updated_values, "updated_at": row["new_updated_at"]} for row in rows
+            )
+
+            # Add audit log, from the previous values returned by the update
+            for row in rows:
+                audit_logger.info(
+                    f"Updated {self.model.__tablename__} record with uuid: {row['uuid']}",
+                    previous_state={column: row[column] for column in columns},
+                    current_state=updated_values,
+                    reference_uuid=row["uuid"],
+                    table_name=self.model.__tablename__,
+                    action="update",
+                )
+
+            updated_count += len(rows)
+            if len(rows) < UPDATE_BULK_CHUNK_SIZE:
+                break
+            last_uuid = max(row["uuid"] for row in rows)
+
+        logger.info(f"Updated {updated_count} {self.model.__tablename__} records")
+        return updated_count
+
+    async def update_from_values(self, rows: List[Dict[str, Any]], key: str = "uuid") -> int:
+        """
+        Update multiple records, each with its own values, with a single `UPDATE ... FROM (VALUES ...)` statement
+        for every set of updated columns. Audit logs are written by the caller, as one event for the whole update.
+        """
+        table = self.model.__table__
+        # Pending changes of the session would be overwritten by the values written
         await self.session.flush()
+        self.unit_of_work.expire(self.model)
+
+        # Rows updating the same columns share a statement
+        column_groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            column_groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        updated_count = 0
+        for columns, group_rows in column_groups.items():
+            # asyncpg allows 32767 parameters in a statement
+            batch_size = MAX_STATEMENT_PARAMETERS // len(columns)
+            for idx in range(0, len(group_rows), batch_size):
+                new_values = values(
+                    *(sql_column(name, table.c[name].type) for name in columns), name="new_values"
+                ).data([tuple(row[name] for name in columns) for row in group_rows[idx : idx + batch_size]])
+                # Casted, as a column having only NULLs in the VALUES list would be typed as text
+                query = (
+                    update(table)
+                    .where(table.c[key] == new_values.c[key])
+                    .values({name: cast(new_values.c[name], table.c[name].type) for name in columns if name != key})
+                    .returning(table.c.uuid, table.c[key].label("matched_key"), table.c.updated_at)
+                )
+                result = await self.session.execute(query)
+                updated_rows = result.all()
+                row_values = {row[key]: row for row in group_rows[idx : idx + batch_size]}
+                self._synchronize_instances(
+                    {**row_values[row.matched_key], "uuid": row.uuid, "updated_at": row.updated_at}
+                    for row in updated_rows
+                )
+                updated_count += len(updated_rows)
+
+        logger.debug(f"Updated {updated_count} {self.model.__tablename__} records from values")
+        return updated_count
+
+    async def copy_from_values(self, rows: List[Dict[str, Any]], key: str = "uuid", filters: List = ()) -> int:
+        """
+        Copy the records matched by the key column with a single `INSERT ... SELECT` statement joined with the VALUES
+        list of the rows, so the copied data never leaves the database. Every row has the key value of the source
+        records under "source" and the same set of replaced columns, the copies not getting a uuid from the rows get a
+        random one (gen_random_uuid, PostgreSQL 13+). Audit logs are written by the caller.
+        """
+        if not rows:
+            return 0
+
+        table = self.model.__table__
+        columns = sorted(set(rows[0]) - {"source"})
+
+        copied_count = 0
+        batch_size = MAX_STATEMENT_PARAMETERS // (len(columns) + 1)
+        for idx in range(0, len(rows), batch_size):
+            copies = values(
+                sql_column("source", table.c[key].type),
+                *(sql_column(name, table.c[name].type) for name in columns),
+                name="copies",
+            ).data([(row["source"], *(row[name] for name in columns)) for row in rows[idx : idx + batch_size]])
+
+            # created_at and updated_at are left to their server defaults
+            select_columns = {}
+            for table_column in table.columns:
+                if table_column.name in columns:
+                    select_columns[table_column.name] = cast(copies.c[table_column.name], table_column.type)
+                elif table_column.name == "uuid":
+                    select_columns["uuid"] = func.gen_random_uuid()
+                elif table_column.server_default is None:
+                    select_columns[table_column.name] = table_column
+
+            query = insert(table).from_select(
+                list(select_columns),
+                select(*select_columns.values())
+                .join_from(table, copies, table.c[key] == copies.c.source)
+                .where(*filters),
+                include_defaults=False,
+            )
+            result = await self.session.execute(query)
+            copied_count += result.rowcount
+
+        db_rows_inserted_total.inc(self.model.__tablename__, amount=copied_count)
+        logger.debug(f"Copied {copied_count} {self.model.__tablename__} records from values")
+        return copied_count
 
     async def delete(self, uuid: Union[UUID, str]) -> ModelType:
         """Delete an instance of the model"""
         instance = await self.get(uuid=uuid)
         await self.session.delete(instance)
         await self.session.flush()
+        self.loader.forget(instance.uuid)
 
         # Log audit and info log
         message = f"Deleted {self.model.__tablename__} record with uuid: {uuid}"
@@ -379,6 +565,10 @@ class SoftDeleteBaseService(BaseService, Generic[SoftDeleteModelType, CreateSche
         """Build statement to get the records"""
         return select(self.model).where(self.model.uuid.in_(uuids), not_(self.model.is_deleted))
 
+    def _is_visible(self, instance: ModelType) -> bool:
+        """Instances soft deleted after they were loaded are not returned"""
+        return not instance.is_deleted
+
     async def get_count(self) -> int:
         """Get table record count"""
         result = await self.session.execute(
@@ -391,12 +581,12 @@ class SoftDeleteBaseService(BaseService, Generic[SoftDeleteModelType, CreateSche
         result = await self.session.execute(select(self.model).where(not_(self.model.is_deleted)))
         return result.scalars().all() or []
 
-    async def update_bulk(self, filters: List, **kwargs) -> None:
+    async def update_bulk(self, filters: List, **kwargs) -> int:
         """Add soft delete filter"""
         if filters:
             filters.append(not_(self.model.is_deleted))
 
-        await super(SoftDeleteBaseService, self).update_bulk(filters=filters, **kwargs)
+        return await super(SoftDeleteBaseService, self).update_bulk(filters=filters, **kwargs)
 
     async def filter(self, filters: List, **kwargs) -> Optional[Union[List[ModelType], ScalarResult]]:
         """Add soft delete filter"""
@@ -424,7 +614,7 @@ class SoftDeleteBaseService(BaseService, Generic[SoftDeleteModelType, CreateSche
         instance = await self.get(uuid=uuid)
 
         # Update is_deleted to True
-        updated_instance_dict = dict(is_deleted=True)
+        updated_instance_dict = dict(is_deleted=True, deleted_at=datetime.utcnow())
         _ = await self.update(current_instance=instance, updated_instance=updated_instance_dict)
 
         # Log audit and info log
@@ -439,3 +629,52 @@ class SoftDeleteBaseService(BaseService, Generic[SoftDeleteModelType, CreateSche
             action="delete",
         )
         return instance
+
+    async def soft_delete_bulk(self, filters: List, deleted_at: datetime) -> List[UUID]:
+        """
+        Soft delete the records matching the filters with a single UPDATE. Audit logs are written by the caller, as one
+        event for all the records deleted together.
+
+        :param filters: List of filter/condition
+        :param deleted_at: Time of the deletion, shared by the records deleted together
+        :return: UUIDs of the records deleted
+        """
+        # Pending changes of the session have to be written before the statement reads the records
+        await self.session.flush()
+        self.unit_of_work.expire(self.model)
+        table = self.model.__table__
+        result = await self.session.execute(
+            update(table)
+            .where(*filters, not_(self.model.is_deleted))
+            .values(is_deleted=True, deleted_at=deleted_at)
+            .returning(table.c.uuid, table.c.updated_at)
+        )
+        rows = result.all()
+        self._synchronize_instances(
+            {"uuid": row.uuid, "is_deleted": True, "deleted_at": deleted_at, "updated_at": row.updated_at}
+            for row in rows
+        )
+        return [row.uuid for row in rows]
+
+    async def restore_bulk(self, filters: List, deleted_at: datetime) -> List[UUID]:
+        """
+        Restore the records matching the filters, that were deleted together at deleted_at, with a single UPDATE
+
+        :param filters: List of filter/condition
+        :param deleted_at: Time of the deletion
+        :return: UUIDs of the records restored
+        """
+        await self.session.flush()
+        self.unit_of_work.expire(self.model)
+        table = self.model.__table__
+        result = await self.session.execute(
+            update(table)
+            .where(*filters, self.model.is_deleted, self.model.deleted_at == deleted_at)
+            .values(is_deleted=False, deleted_at=None)
+            .returning(table.c.uuid, table.c.updated_at)
+        )
+        rows = result.all()
+        self._synchronize_instances(
+            {"uuid": row.uuid, "is_deleted": False, "deleted_at": None, "updated_at": row.updated_at} for row in rows
+        )
+        return [row.uuid for row in rows]
@@ -1,11 +1,19 @@
 import json
-from typing import Dict, List
-from uuid import UUID
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
+import orjson
 from loguru import logger
-from sqlalchemy import String, cast, select
+from sqlalchemy import Select, String, and_, cast, not_, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
 
+from app.core.cache import NO_EXPIRY, CacheEntry, papers_cache
+from app.core.db.notifications import PAPER_PUBLISHED_CHANNEL, notify
+from app.core.invalidation import invalidation_bus
 from app.core.models import LanguageModel
 from app.core.models.exams import (
     ExamsModel,
@@ -15,6 +23,7 @@ from app.core.models.exams import (
     SubSectionsModel,
     TemplatesModel,
 )
+from app.core.models.questions import QuestionsModel
 from app.core.schemas.exams import (
     ExamsCreateDatabaseSchema,
     ExamsUpdateDatabaseSchema,
@@ -30,19 +39,39 @@ from app.core.schemas.exams import (
     TemplatesUpdateDatabaseSchema,
 )
 from app.core.services.base import BaseService, SoftDeleteBaseService
-from app.core.services.questions import LanguageService, QuestionsService
+from app.core.services.packing import AnswerKey, PaperLayout, iter_questions
+from app.core.services.questions import (
+    LanguageService,
+    OptionsService,
+    QuestionsService,
+    RangeAnswersService,
+    SubjectsService,
+)
+from app.core.services.shuffling import CandidateShuffler
 from app.core.services.utils import helper_functions
+from app.core.snapshots import get_snapshot_key, snapshot_store
 from app.enums import PapersStatusEnum
+from app.logger import logger as audit_logger
 from app.schemas import (
     CBTPaperBaseSchema,
+    CBTPaperCloneSchema,
+    CBTPermutationSchema,
+    CBTQuestionBatchUpdateSchema,
+    CBTQuestionsBatchUpdateResponseSchema,
     CBTQuestionsResponseSchema,
     CBTQuestionUpdateSchema,
     CBTRequestSchema,
     CBTResponseSchema,
     CBTSectionsResponseSchema,
+    CBTSkeletonSchema,
+    CBTSkeletonSectionSchema,
+    CBTSkeletonSubSectionSchema,
     CBTSubSectionsResponseSchema,
+    SoftDeleteCascadeSchema,
 )
+from app.utils.compression import IDENTITY
 from app.utils.exceptions.common_exceptions import DataLogicException, UUIDNotFoundException
+from app.utils.responses import build_payloads
 
 
 class ExamsService(SoftDeleteBaseService[ExamsModel, ExamsCreateDatabaseSchema, ExamsUpdateDatabaseSchema]):
@@ -97,7 +126,7 @@ class ExamsService(SoftDeleteBaseService[ExamsModel, ExamsCreateDatabaseSchema,
             raise UUIDNotFoundException(model=ExamsModel, uuid=exam_id)
 
         # Get the papers where exam_id = exam_id
-        papers_service = PapersService(session=self.session)
+        papers_service = self.get_service(PapersService)
         paper_instances = await papers_service.filter(
             [PapersModel.exam_id == exam_id, PapersModel.status == paper_status]
         )
@@ -127,6 +156,45 @@ class ExamsService(SoftDeleteBaseService[ExamsModel, ExamsCreateDatabaseSchema,
 
         return await self.update(exam_instance, ExamsUpdateDatabaseSchema(is_active=is_active))
 
+    # DELETE Functions
+
+    async def delete(self, exam_id: UUID, include_questions: bool = True) -> SoftDeleteCascadeSchema:
+        """
+        Soft delete the exam along with its papers and their questions, with a few set-based updates
+        :param exam_id: UUID for the exam.
+        :param include_questions: Delete the questions which are not used by the papers of other exams
+        :return: Number of records deleted in every table
+        """
+        await self.get(exam_id)
+        deleted_at = datetime.utcnow()
+        await self.soft_delete_bulk([ExamsModel.uuid == exam_id], deleted_at)
+        cascade = await self.get_service(PapersService).delete_cascade(
+            [PapersModel.exam_id == exam_id], deleted_at, include_questions
+        )
+        cascade.exams = 1
+        PapersService.log_cascade(ExamsModel, exam_id, cascade, action="cascade_delete")
+        return cascade
+
+    async def restore(self, exam_id: UUID) -> SoftDeleteCascadeSchema:
+        """
+        Restore a deleted exam along with the papers and questions that were deleted with it. Papers deleted before the
+        exam stay deleted.
+        :param exam_id: UUID for the exam.
+        :return: Number of records restored in every table
+        """
+        exam_instance = await self.session.get(ExamsModel, exam_id)
+        if exam_instance is None:
+            raise UUIDNotFoundException(model=ExamsModel, uuid=exam_id)
+        if not exam_instance.is_deleted:
+            raise DataLogicException(f"Exam with ID {exam_id} is not deleted")
+
+        deleted_at = exam_instance.deleted_at
+        cascade = await self.get_service(PapersService).restore_cascade([PapersModel.exam_id == exam_id], deleted_at)
+        await self.restore_bulk([ExamsModel.uuid == exam_id], deleted_at)
+        cascade.exams = 1
+        PapersService.log_cascade(ExamsModel, exam_id, cascade, action="cascade_restore")
+        return cascade
+
 
 class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchema, PapersUpdateDatabaseSchema]):
     def __init__(self, **kwargs):
@@ -141,15 +209,57 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         :param paper_data: Paper data that needs to be added to the table
         :return: Paper instance that was created
         """
+        paper_instance = await self.create_paper_instance(exam_id, paper_data)
+
+        # Create sections and sub-sections for the paper
+        sub_sections = await self.create_paper_sections(paper_instance, paper_data.sections)
+
+        # Create questions for the paper
+        sub_section_questions_service = self.get_service(SubSectionQuestionsService)
+        for sub_section_instance, sub_section in sub_sections:
+            # Upload Questions to Questions table
+            questions_service = self.get_service(QuestionsService)
+
+            # Updating the language of questions
+            for question in sub_section.questions:
+                if not question.language:
+                    question.language = paper_data.language
+
+            question_instances = await questions_service.create_bulk(
+                [question.dict() for question in sub_section.questions]
+            )
+
+            await sub_section_questions_service.create_bulk(
+                [
+                    SubSectionQuestionsCreateDatabaseSchema(
+                        sub_section_id=sub_section_instance.uuid,
+                        question_id=question_instance.uuid,
+                        positive_marks=question.positive_marks,
+                        negative_marks=question.negative_marks,
+                        order=idx,
+                    )
+                    for idx, (question_instance, question) in enumerate(zip(question_instances, sub_section.questions))
+                ]
+            )
+
+        return paper_instance
+
+    async def create_paper_instance(self, exam_id: UUID, paper_data: CBTPaperBaseSchema) -> PapersModel:
+        """
+        Create the paper row along with its template and language, without any sections.
+        :param exam_id: Exam ID for which paper needs to be created
+        :param paper_data: Paper details that need to be added to the table
+        :return: Paper instance that was created
+        """
         # Check the existence of the exam
-        exam_instance = await ExamsService(session=self.session).get(exam_id)
+        exam_instance = await self.get_service(ExamsService).get(exam_id)
         if not exam_instance:
             error_message = f"Exam with ID {exam_id} not found"
             logger.error(error_message)
             raise UUIDNotFoundException(model=ExamsModel, uuid=exam_id)
 
         # Add template for the paper
-        templates_service = TemplatesService(session=self.session)
+        templates_service = self.get_service(TemplatesService)
         template_instance = await templates_service.create(
             TemplatesCreateDatabaseSchema(
                 name=paper_data.name,
@@ -159,16 +269,17 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         )
 
         # Fetch the language from the database
-        language = paper_data.language
-        language_service = LanguageService(session=self.session)
-        language_instance = await language_service.create(language)
-        language_uuid = language_instance.uuid
+        language_service = self.get_service(LanguageService)
+        language_instance = await language_service.create(paper_data.language)
 
         # Create the paper
         try:
             paper_instance = await self.create(
                 PapersCreateDatabaseSchema(
-                    **paper_data.dict(), exam_id=exam_id, template_id=template_instance.uuid, language_id=language_uuid
+                    **paper_data.dict(),
+                    exam_id=exam_id,
+                    template_id=template_instance.uuid,
+                    language_id=language_instance.uuid,
                 )
             )
         except IntegrityError:
@@ -181,67 +292,172 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
                 exam_id=exam_id,
             )
 
-        # Create sections for the paper
-        sections_service = SectionsService(session=self.session)
+        return paper_instance
+
+    async def create_paper_sections(self, paper_instance: PapersModel, sections: List) -> List[Tuple[Any, Any]]:
+        """
+        Create the sections and sub-sections of a paper, in the order they are provided.
+        :param paper_instance: Paper for which sections need to be created
+        :param sections: Sections (with their sub_sections) that need to be added to the table
+        :return: List of (sub-section instance, sub-section data) in the order of sections and sub-sections
+        """
+        sections_service = self.get_service(SectionsService)
         sections_instances = await sections_service.create_bulk(
             [
                 SectionsCreateDatabaseSchema(**section.dict(), paper_id=paper_instance.uuid, order=idx)
-                for idx, section in enumerate(paper_data.sections)
+                for idx, section in enumerate(sections)
             ]
         )
 
-        # Create sub-sections for the paper
-        sub_sections_service = SubSectionsService(session=self.session)
-        for section_instance, paper_section in zip(sections_instances, paper_data.sections):
-            # Zip is possible because the order of sections and paper_data.sections is same
-            sub_sections = paper_section.sub_sections
+        sub_sections_service = self.get_service(SubSectionsService)
+        sub_sections = []
+        for section_instance, paper_section in zip(sections_instances, sections):
+            # Zip is possible because the order of sections_instances and sections is same
             sub_sections_instances = await sub_sections_service.create_bulk(
                 [
                     SubSectionsCreateDatabaseSchema(**sub_section.dict(), section_id=section_instance.uuid, order=idx)
-                    for idx, sub_section in enumerate(sub_sections)
+                    for idx, sub_section in enumerate(paper_section.sub_sections)
                 ]
             )
+            sub_sections.extend(zip(sub_sections_instances, paper_section.sub_sections))
 
-            # Create questions for the paper
-            sub_section_questions_service = SubSectionQuestionsService(session=self.session)
-            for sub_section_instance, sub_section in zip(sub_sections_instances, sub_sections):
-                # Upload Questions to Questions table
-                questions_service = QuestionsService(session=self.session)
+        return sub_sections
 
-                # Updating the language of questions
-                for question in sub_section.questions:
-                    if not question.language:
-                        question.language = language
+    # CLONE Functions
 
-                question_instances = await questions_service.create_bulk(
-                    [question.dict() for question in sub_section.questions]
+    async def clone_paper(self, paper_id: UUID, clone_data: CBTPaperCloneSchema) -> PapersModel:
+        """
+        Clone a paper as a new draft paper, e.g. the paper of the next year or set B of set A. Only the structure of
+        the paper (sections, sub-sections and the links of the questions) is copied with `INSERT ... SELECT`, the clone
+        uses the same question rows (moved to their latest versions), which are forked once they are edited through
+        one of the draft papers.
+        :param paper_id: UUID of the paper to be cloned
+        :param clone_data: Name, year and set of the clone, the ones not passed are taken from the paper
+        :return: Paper instance that was created
+        """
+        paper_instance = await self.get(paper_id)
+        clone_values = {
+            "name": paper_instance.name,
+            "year": paper_instance.year,
+            "paper_set": paper_instance.paper_set,
+            **clone_data.dict(exclude_none=True),
+        }
+        try:
+            clone_instance = await self.create(
+                PapersCreateDatabaseSchema(
+                    **clone_values,
+                    exam_id=paper_instance.exam_id,
+                    template_id=paper_instance.template_id,
+                    language_id=paper_instance.language_id,
                 )
-
-                await sub_section_questions_service.create_bulk(
-                    [
-                        SubSectionQuestionsCreateDatabaseSchema(
-                            sub_section_id=sub_section_instance.uuid,
-                            question_id=question_instance.uuid,
-                            positive_marks=question.positive_marks,
-                            negative_marks=question.negative_marks,
-                            order=idx,
-                        )
-                        for idx, (question_instance, question) in enumerate(
-                            zip(question_instances, sub_section.questions)
-                        )
-                    ]
+            )
+        except IntegrityError:
+            error_message = f"Paper already exists for the exam id {paper_instance.exam_id}"
+            raise DataLogicException(error_message, **clone_values, exam_id=paper_instance.exam_id)
+
+        # Sections and sub-sections of the paper, the copies get their uuids here to link them with each other
+        result = await self.session.execute(
+            select(SectionsModel.uuid.label("section_id"), SubSectionsModel.uuid.label("sub_section_id"))
+            .select_from(SectionsModel)
+            .outerjoin(SubSectionsModel, SubSectionsModel.section_id == SectionsModel.uuid)
+            .where(SectionsModel.paper_id == paper_id)
+        )
+        section_forks, sub_section_rows = {}, []
+        for row in result.all():
+            section_forks.setdefault(row.section_id, uuid4())
+            if row.sub_section_id:
+                sub_section_rows.append(
+                    {"source": row.sub_section_id, "uuid": uuid4(), "section_id": section_forks[row.section_id]}
                 )
 
-        return paper_instance
+        sections_count = await self.get_service(SectionsService).copy_from_values(
+            [
+                {"source": section_id, "uuid": fork_id, "paper_id": clone_instance.uuid}
+                for section_id, fork_id in section_forks.items()
+            ]
+        )
+        sub_sections_count = await self.get_service(SubSectionsService).copy_from_values(sub_section_rows)
+        questions_count = await self.get_service(SubSectionQuestionsService).copy_from_values(
+            [{"source": row["source"], "sub_section_id": row["uuid"]} for row in sub_section_rows],
+            key="sub_section_id",
+        )
+        # The clone is a draft paper, which follows the latest versions of the questions
+        await self.get_service(SubSectionQuestionsService).follow_latest_versions(
+            PapersModel.uuid == clone_instance.uuid
+        )
+
+        message = f"Cloned paper with uuid: {paper_id} as paper with uuid: {clone_instance.uuid}"
+        logger.info(message)
+        audit_logger.info(
+            message,
+            previous_state={},
+            current_state=dict(
+                source_paper_id=str(paper_id),
+                sections=sections_count,
+                sub_sections=sub_sections_count,
+                questions=questions_count,
+            ),
+            reference_uuid=clone_instance.uuid,
+            table_name=PapersModel.__tablename__,
+            action="clone",
+        )
+        return clone_instance
+
+    async def fork_questions(self, paper_instance: PapersModel, question_ids: List[UUID]) -> Dict[UUID, UUID]:
+        """
+        Give a draft paper its own copy of the questions it shares with other draft papers (e.g. with the paper it was
+        cloned from), so that editing them does not change the other papers. Draft papers follow the latest versions of
+        the questions, while published / archived papers keep the versions they link, so only drafts are considered.
+        :param paper_instance: Paper whose questions are going to be edited
+        :param question_ids: UUIDs of the questions going to be edited
+        :return: UUID of every forked question -> UUID of its copy
+        """
+        result = await self.session.execute(
+            self._get_question_ids(
+                and_(PapersModel.uuid != paper_instance.uuid, PapersModel.status == PapersStatusEnum.DRAFT)
+            )
+            .where(SubSectionQuestionsModel.question_id.in_(question_ids))
+            .distinct()
+        )
+        forks = {question_id: uuid4() for question_id in result.scalars()}
+        if not forks:
+            return forks
+
+        await self.get_service(QuestionsService).fork(forks)
+
+        # The links of the paper are moved to the copies, keeping the marks and order
+        result = await self.session.execute(
+            select(SubSectionQuestionsModel.uuid, SubSectionQuestionsModel.question_id)
+            .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+            .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+            .where(SectionsModel.paper_id == paper_instance.uuid, SubSectionQuestionsModel.question_id.in_(forks))
+        )
+        await self.get_service(SubSectionQuestionsService).update_from_values(
+            [{"uuid": row.uuid, "question_id": forks[row.question_id]} for row in result.all()]
+        )
+
+        message = f"Forked {len(forks)} shared questions of paper with uuid: {paper_instance.uuid}"
+        logger.info(message)
+        audit_logger.info(
+            message,
+            previous_state={},
+            current_state={str(question_id): str(fork_id) for question_id, fork_id in forks.items()},
+            reference_uuid=paper_instance.uuid,
+            table_name=QuestionsModel.__tablename__,
+            action="fork",
+        )
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [paper_instance.uuid])
+        return forks
 
     # GET Functions
 
-    async def fetch_paper_data(self, paper_id: UUID):
+    async def fetch_paper_data(self, paper_id: UUID, section_id: Optional[UUID] = None):
         """
         This function provides all the data related to a paper, using joins
         Result is List of tuples with the following order:
         PapersModel, TemplatesModel, SectionsModel, SubSectionsModel, SubSectionQuestionsModel, QuestionsModel
         :param paper_id: UUID for the paper
+        :param section_id: If passed, only the data of this section is fetched
         :return: List of tuples with the data
         """
         stmt = (
@@ -255,13 +471,68 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
             .join(SubSectionQuestionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
             .where(PapersModel.uuid == paper_id)
         )
+        if section_id:
+            stmt = stmt.where(SectionsModel.uuid == section_id)
 
         result = await self.session.execute(stmt)
         return result.all()
 
-    async def get_for_cbt(self, paper_id: UUID) -> CBTResponseSchema:
+    async def get_for_cbt(self, paper_id: UUID, candidate_seed: Optional[str] = None) -> CBTResponseSchema:
         """
         Get the paper with settings, sections, subsections, and questions.
+        The paper is built once and cached, in case of a candidate seed the questions of every sub-section and the
+        options of every question are shuffled on top of the cached paper.
+        :param paper_id: UUID for the paper
+        :param candidate_seed: Seed of the candidate, used to shuffle the questions and options
+        :return Paper related data in CBTResponseSchema
+        """
+        cbt_response = (await self.get_cbt_entry(paper_id)).value
+        if candidate_seed:
+            return CandidateShuffler(candidate_seed).shuffle_paper(cbt_response)
+        return cbt_response
+
+    async def get_cbt_entry(self, paper_id: UUID, decode: bool = True) -> CacheEntry:
+        """
+        Get the cache entry of the paper in CBTResponseSchema, building it if it is not cached.
+        Responses are served from the entry, so that serialized and compressed payloads are stored along with it.
+        Payloads of the published papers are kept in the snapshot store shared by the workers of the host, an entry
+        loaded from the store has only the payloads, and the value is decoded from them when it is needed.
+        :param paper_id: UUID for the paper
+        :param decode: Whether the value is needed, the payloads are enough to serve the paper as it is
+        :return: Cache entry having CBTResponseSchema as value
+        """
+        cache_entry = papers_cache.get_entry(("cbt", paper_id))
+        if cache_entry is None:
+            payloads = await self.get_snapshot("cbt", paper_id)
+            if payloads is not None:
+                cache_entry = papers_cache.set(("cbt", paper_id), None, tags=[paper_id], ttl=NO_EXPIRY)
+                cache_entry.payloads.update(payloads)
+            else:
+                cbt_response = await self.build_cbt_response(paper_id)
+                ttl = await self.get_cache_ttl(paper_id)
+                cache_entry = papers_cache.set(("cbt", paper_id), cbt_response, tags=[paper_id], ttl=ttl)
+                if ttl == NO_EXPIRY:
+                    cache_entry.payloads.update(
+                        await self.put_snapshot("cbt", paper_id, lambda: build_payloads(cbt_response))
+                    )
+
+        if decode and cache_entry.value is None:
+            cache_entry.value = CBTResponseSchema.parse_obj(orjson.loads(cache_entry.payloads[IDENTITY]))
+        return cache_entry
+
+    async def get_permutation(self, paper_id: UUID, candidate_seed: str) -> CBTPermutationSchema:
+        """
+        Get the permutations applied to the paper for a candidate, used to un-shuffle the responses while grading.
+        :param paper_id: UUID for the paper
+        :param candidate_seed: Seed of the candidate
+        :return: Permutations of questions and options along with their inverse
+        """
+        cbt_response = await self.get_for_cbt(paper_id)
+        return CandidateShuffler(candidate_seed).get_paper_permutation(cbt_response)
+
+    async def build_cbt_response(self, paper_id: UUID) -> CBTResponseSchema:
+        """
+        Build the paper with settings, sections, subsections, and questions from the database.
         :param paper_id: UUID for the paper
         :return Paper related data in CBTResponseSchema
         """
@@ -270,17 +541,33 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         if not paper_data:
             raise UUIDNotFoundException(model=PapersModel, uuid=paper_id)
 
-        # Unpack the list of tuples to get the data
         # paper_instance and template_instance are single instances and hence not assigning as list
-        sections_instances = set()
-        sub_sections_instances = set()
-        sub_section_questions_instances = set()
-
-        # Assigning the data to the respective instances
         paper_instance = paper_data[0][0]
         language_instance = paper_data[0][1]
         template_instance = paper_data[0][2]
 
+        return CBTResponseSchema(
+            uuid=paper_instance.uuid,
+            name=paper_instance.name,
+            year=paper_instance.year,
+            language=language_instance.name,
+            paper_set=paper_instance.paper_set,
+            settings=template_instance.settings,
+            instructions=template_instance.instructions,
+            sections=await self.build_cbt_sections(paper_data),
+        )
+
+    async def build_cbt_sections(self, paper_data: List[tuple]) -> List[CBTSectionsResponseSchema]:
+        """
+        Build the sections with subsections and questions from the data of the paper.
+        :param paper_data: Result of fetch_paper_data
+        :return: Ordered list of sections in CBTSectionsResponseSchema
+        """
+        # Unpack the list of tuples to get the data
+        sections_instances = set()
+        sub_sections_instances = set()
+        sub_section_questions_instances = set()
+
         for data in paper_data:
             # Adding it to set as we need unique instances
             sections_instances.add(data[3])
@@ -288,7 +575,7 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
             sub_section_questions_instances.add(data[5])
 
         # Get the questions in QuestionsResponseSchema format
-        questions_service = QuestionsService(session=self.session)
+        questions_service = self.get_service(QuestionsService)
         question_instances = await questions_service.get_for_cbt(
             [sub_section_questions.question_id for sub_section_questions in sub_section_questions_instances]
         )
@@ -342,9 +629,77 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         ]
 
         # Order the sections based on the order
-        section_cbt_response = helper_functions.order_response(section_cbt_response)
+        return helper_functions.order_response(section_cbt_response)
 
-        return CBTResponseSchema(
+    async def get_skeleton(self, paper_id: UUID, candidate_seed: Optional[str] = None) -> CBTSkeletonSchema:
+        """
+        Get the paper details with sections and subsections, having only the uuids of the questions.
+        Used by the CBT client to render the paper before fetching the content of the sections.
+        :param paper_id: UUID for the paper
+        :param candidate_seed: Seed of the candidate, used to shuffle the questions
+        :return: Paper skeleton in CBTSkeletonSchema
+        """
+        skeleton = (await self.get_skeleton_entry(paper_id)).value
+        if candidate_seed:
+            return CandidateShuffler(candidate_seed).shuffle_skeleton(skeleton)
+        return skeleton
+
+    async def get_skeleton_entry(self, paper_id: UUID) -> CacheEntry:
+        """
+        Get the cache entry of the paper skeleton, building it if it is not cached.
+        :param paper_id: UUID for the paper
+        :return: Cache entry having CBTSkeletonSchema as value
+        """
+        cache_entry = papers_cache.get_entry(("skeleton", paper_id))
+        if cache_entry is not None:
+            return cache_entry
+
+        paper_data = await self.fetch_paper_data(paper_id)
+        if not paper_data:
+            raise UUIDNotFoundException(model=PapersModel, uuid=paper_id)
+
+        paper_instance = paper_data[0][0]
+        language_instance = paper_data[0][1]
+        template_instance = paper_data[0][2]
+
+        # Unpack the list of tuples, only the ids of the questions are required
+        sections_instances = {data[3] for data in paper_data}
+        sub_sections_instances = {data[4] for data in paper_data}
+        sub_section_questions_instances = {data[5] for data in paper_data}
+
+        question_uuids = {}
+        for sub_section_question_instance in sub_section_questions_instances:
+            question_uuids.setdefault(sub_section_question_instance.sub_section_id, []).append(
+                (sub_section_question_instance.question_id, sub_section_question_instance.order)
+            )
+
+        sub_sections = {}
+        for sub_section_instance in sub_sections_instances:
+            sub_sections.setdefault(sub_section_instance.section_id, []).append(
+                (
+                    CBTSkeletonSubSectionSchema(
+                        uuid=sub_section_instance.uuid,
+                        name=sub_section_instance.name,
+                        questions=helper_functions.order_response(question_uuids.get(sub_section_instance.uuid, [])),
+                    ),
+                    sub_section_instance.order,
+                )
+            )
+
+        sections = [
+            (
+                CBTSkeletonSectionSchema(
+                    uuid=section_instance.uuid,
+                    name=section_instance.name,
+                    section_time=section_instance.section_time,
+                    sub_sections=helper_functions.order_response(sub_sections.get(section_instance.uuid, [])),
+                ),
+                section_instance.order,
+            )
+            for section_instance in sections_instances
+        ]
+
+        skeleton = CBTSkeletonSchema(
             uuid=paper_instance.uuid,
             name=paper_instance.name,
             year=paper_instance.year,
@@ -352,8 +707,49 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
             paper_set=paper_instance.paper_set,
             settings=template_instance.settings,
             instructions=template_instance.instructions,
-            sections=section_cbt_response,
+            sections=helper_functions.order_response(sections),
         )
+        return papers_cache.set(
+            ("skeleton", paper_id), skeleton, tags=[paper_id], ttl=await self.get_cache_ttl(paper_id)
+        )
+
+    async def get_section_for_cbt(
+        self, paper_id: UUID, section_id: UUID, candidate_seed: Optional[str] = None
+    ) -> CBTSectionsResponseSchema:
+        """
+        Get a section of the paper with its subsections and questions.
+        :param paper_id: UUID for the paper
+        :param section_id: UUID for the section
+        :param candidate_seed: Seed of the candidate, used to shuffle the questions and options
+        :return: Section in CBTSectionsResponseSchema
+        """
+        section = (await self.get_section_entry(paper_id, section_id)).value
+        if candidate_seed:
+            return CandidateShuffler(candidate_seed).shuffle_section(section)
+        return section
+
+    async def get_section_entry(self, paper_id: UUID, section_id: UUID) -> CacheEntry:
+        """
+        Get the cache entry of a section of the paper, building it if it is not cached.
+        If the whole paper is already cached, the section is taken from it, otherwise only the section is fetched.
+        :param paper_id: UUID for the paper
+        :param section_id: UUID for the section
+        :return: Cache entry having CBTSectionsResponseSchema as value
+        """
+        cache_key = ("section", paper_id, section_id)
+        cache_entry = papers_cache.get_entry(cache_key)
+        if cache_entry is not None:
+            return cache_entry
+
+        cbt_response = papers_cache.get(("cbt", paper_id))
+        if cbt_response is not None:
+            sections = [section for section in cbt_response.sections if section.uuid == section_id]
+        else:
+            sections = await self.build_cbt_sections(await self.fetch_paper_data(paper_id, section_id=section_id))
+
+        if not sections:
+            raise UUIDNotFoundException(model=SectionsModel, uuid=section_id)
+        return papers_cache.set(cache_key, sections[0], tags=[paper_id], ttl=await self.get_cache_ttl(paper_id))
 
     async def get_solution(self, paper_id: UUID) -> Dict[UUID, List]:
         """
@@ -361,17 +757,167 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         :param paper_id: UUID for the paper
         :return: Dictionary of question_id and list of answer/correct options
         """
+        return (await self.get_solution_entry(paper_id)).value
+
+    async def get_solution_entry(self, paper_id: UUID) -> CacheEntry:
+        """
+        Get the cache entry of the solution of a paper, building it if it is not cached.
+        :param paper_id: UUID for the paper
+        :return: Cache entry having dictionary of question_id and list of answer/correct options as value
+        """
+        cache_entry = papers_cache.get_entry(("solution", paper_id))
+        if cache_entry is not None:
+            return cache_entry
+
         paper_data = await self.fetch_paper_data(paper_id)
 
         # Unpack the list of tuples to get the questions
         sub_section_questions_instances = {data[5] for data in paper_data}
 
         # Get the solution of the questions
-        questions_service = QuestionsService(session=self.session)
-        return await questions_service.get_solution(
+        questions_service = self.get_service(QuestionsService)
+        solution = await questions_service.get_solution(
             [sub_section_questions.question_id for sub_section_questions in sub_section_questions_instances]
         )
 
+        # Solution of a paper that does not exist is not cached
+        if not paper_data:
+            return CacheEntry(solution, expires_at=None, tags=[])
+        return papers_cache.set(
+            ("solution", paper_id), solution, tags=[paper_id], ttl=await self.get_cache_ttl(paper_id)
+        )
+
+    async def get_layout(self, paper_id: UUID) -> PaperLayout:
+        """
+        Get the layout of the paper, used to pack the responses and answer key of the paper
+        :param paper_id: UUID for the paper
+        :return: Position of every question and option of the paper
+        """
+        layout = papers_cache.get(("layout", paper_id))
+        if layout is None:
+            cbt_response = (await self.get_cbt_entry(paper_id)).value
+            layout = PaperLayout.from_cbt_response(cbt_response)
+            papers_cache.set(("layout", paper_id), layout, tags=[paper_id], ttl=await self.get_cache_ttl(paper_id))
+        return layout
+
+    async def get_answer_key(self, paper_id: UUID) -> AnswerKey:
+        """
+        Get the packed answer key of the paper along with the marks of every question
+        :param paper_id: UUID for the paper
+        :return: Answer key as per the layout of the paper
+        """
+        answer_key = papers_cache.get(("answer_key", paper_id))
+        if answer_key is not None:
+            return answer_key
+
+        payloads = await self.get_snapshot("answer_key", paper_id)
+        if payloads is not None:
+            answer_key, ttl = AnswerKey.from_buffer(payloads[IDENTITY]), NO_EXPIRY
+        else:
+            cbt_response = (await self.get_cbt_entry(paper_id)).value
+            answer_key = AnswerKey.build(
+                await self.get_layout(paper_id), iter_questions(cbt_response), await self.get_solution(paper_id)
+            )
+            ttl = await self.get_cache_ttl(paper_id)
+            if ttl == NO_EXPIRY:
+                payloads = await self.put_snapshot("answer_key", paper_id, lambda: {IDENTITY: answer_key.to_bytes()})
+                if payloads:
+                    answer_key = AnswerKey.from_buffer(payloads[IDENTITY])
+
+        papers_cache.set(("answer_key", paper_id), answer_key, tags=[paper_id], ttl=ttl)
+        return answer_key
+
+    async def get_snapshot(self, name: str, paper_id: UUID) -> Optional[Dict[str, memoryview]]:
+        """
+        Get the payloads of a snapshot of a published paper from the snapshot store.
+        A snapshot is used only if the paper is still published (or archived), as the snapshots of a paper deleted
+        while the worker was not listening for the invalidations are not discarded.
+        :param name: Name of the snapshot, one of PAPER_SNAPSHOTS
+        :param paper_id: UUID for the paper
+        :return: Variant -> payload, None if the paper has no snapshot
+        """
+        if not snapshot_store.enabled:
+            return None
+
+        payloads = snapshot_store.get(get_snapshot_key(name, paper_id))
+        if payloads is None:
+            return None
+        paper_instance = await self.session.get(PapersModel, paper_id)
+        if paper_instance is None or paper_instance.is_deleted or paper_instance.status == PapersStatusEnum.DRAFT:
+            return None
+        return payloads
+
+    @staticmethod
+    async def put_snapshot(name: str, paper_id: UUID, build: Callable[[], Dict[str, bytes]]) -> Dict[str, memoryview]:
+        """
+        Write a snapshot of a published paper to the snapshot store, if the store is enabled and the paper has none.
+        Payloads are built and written off the event loop, a failure to write them is logged and the paper is served
+        from the memory of the worker.
+        :param name: Name of the snapshot, one of PAPER_SNAPSHOTS
+        :param paper_id: UUID for the paper
+        :param build: Builds the payloads of the snapshot, variant -> payload
+        :return: Variant -> view over the store, to be kept instead of the payloads, empty if not written
+        """
+        if not snapshot_store.enabled:
+            return {}
+
+        key = get_snapshot_key(name, paper_id)
+
+        def write() -> Dict[str, memoryview]:
+            # Workers build the same papers at the same time (say at startup), the first one to write it wins
+            payloads = snapshot_store.get(key)
+            return payloads if payloads is not None else snapshot_store.put(key, build(), replace=False)
+
+        try:
+            return await run_in_threadpool(write)
+        except OSError:
+            logger.exception(f"Failed to write the snapshot {key}")
+            return {}
+
+    async def get_published_ids(self, limit: int) -> List[UUID]:
+        """
+        Get the published papers of the active exams, i.e. the papers candidates can attempt
+        :param limit: Maximum number of papers, the most recently updated ones are returned first
+        :return: UUIDs of the papers
+        """
+        stmt = (
+            select(self.model.uuid)
+            .join(ExamsModel, ExamsModel.uuid == self.model.exam_id)
+            .where(
+                self.model.status == PapersStatusEnum.PUBLISHED,
+                not_(self.model.is_deleted),
+                ExamsModel.is_active.is_(True),
+                not_(ExamsModel.is_deleted),
+            )
+            .order_by(self.model.updated_at.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars())
+
+    async def get_cache_ttl(self, paper_id: UUID) -> Optional[float]:
+        """
+        TTL of the cached content of a paper. Published and archived papers are immutable as they link specific
+        versions of the questions, so their content never expires. The content of a draft paper expires as per the
+        TTL of the cache. The paper is usually loaded while building the content, so it is taken from the session.
+        :param paper_id: UUID for the paper
+        :return: TTL to be used for the cache entries of the paper
+        """
+        paper_instance = await self.session.get(PapersModel, paper_id)
+        if paper_instance is not None and paper_instance.status != PapersStatusEnum.DRAFT:
+            return NO_EXPIRY
+        return None
+
+    @staticmethod
+    def check_draft(paper_instance: PapersModel):
+        """Only draft papers can be edited, published and archived papers are immutable"""
+        if paper_instance.status != PapersStatusEnum.DRAFT:
+            error_message = (
+                f"Paper with ID {paper_instance.uuid} has {paper_instance.status.value} status and cannot be edited, "
+                f"clone the paper instead"
+            )
+            raise DataLogicException(error_message)
+
     # UPDATE Functions
 
     async def update_status(self, paper_id: UUID, status: PapersStatusEnum) -> PapersModel:
@@ -407,6 +953,12 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
         else:
             updated_instance = await self.update(paper_instance, dict(status=status))
 
+        if status == PapersStatusEnum.PUBLISHED:
+            # Every worker drops the draft content and warms the published paper, once the transaction is committed
+            papers_cache.evict_tag(paper_id)
+            await notify(self.session, PAPER_PUBLISHED_CHANNEL, str(paper_id))
+        else:
+            invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [paper_id])
         return updated_instance
 
     async def update_paper(self, paper_id: UUID, paper_data: CBTPaperBaseSchema) -> PapersModel:
@@ -421,10 +973,11 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
             error_message = f"Paper with ID {paper_id} not found"
             logger.error(error_message)
             UUIDNotFoundException(model=PapersModel, uuid=paper_id)
+        self.check_draft(paper_instance)
 
         # Update the Templates data
         # Since Templates data is unique, we won't update the existing entry, rather create new one
-        templates_service = TemplatesService(session=self.session)
+        templates_service = self.get_service(TemplatesService)
         template_instance = await templates_service.create(
             TemplatesCreateDatabaseSchema(
                 name=paper_data.name,
@@ -435,7 +988,7 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
 
         # Update the language data
         # Since Language data is unique, we won't update the existing entry, rather create new one
-        language_service = LanguageService(session=self.session)
+        language_service = self.get_service(LanguageService)
         language_instance = await language_service.create(paper_data.language)
 
         # Update the paper data
@@ -448,8 +1001,319 @@ class PapersService(SoftDeleteBaseService[PapersModel, PapersCreateDatabaseSchem
             ),
         )
 
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [paper_id])
         return updated_instance
 
+    async def update_questions(
+        self, paper_id: UUID, questions_data: List[CBTQuestionBatchUpdateSchema]
+    ) -> CBTQuestionsBatchUpdateResponseSchema:
+        """
+        Update many questions of a paper at once. The edits are validated in memory and written with one
+        `UPDATE ... FROM (VALUES ...)` statement per set of edited columns, along with a single audit event.
+        Questions shared with other draft papers are forked, the other edited questions get a new version, which is
+        followed by all the draft papers using the question.
+        :param paper_id: UUID for the paper.
+        :param questions_data: Edits of the questions, at most one per question
+        :return: Number of questions updated
+        """
+        paper_instance = await self.get(paper_id)
+        self.check_draft(paper_instance)
+        question_ids = [question_data.question_id for question_data in questions_data]
+        duplicate_ids = [question_id for question_id, count in Counter(question_ids).items() if count > 1]
+        if duplicate_ids:
+            raise DataLogicException("Questions are edited more than once", question_uuids=duplicate_ids)
+
+        # Links of the questions with the sub-sections of the paper, holding the marks of the questions
+        result = await self.session.execute(
+            select(
+                SubSectionQuestionsModel.uuid,
+                SubSectionQuestionsModel.question_id,
+                SubSectionQuestionsModel.positive_marks,
+                SubSectionQuestionsModel.negative_marks,
+            )
+            .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+            .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+            .where(SectionsModel.paper_id == paper_id, SubSectionQuestionsModel.question_id.in_(question_ids))
+        )
+        paper_questions: Dict[UUID, List] = {}
+        for row in result.all():
+            paper_questions.setdefault(row.question_id, []).append(row)
+        missing_ids = set(question_ids) - set(paper_questions)
+        if missing_ids:
+            raise DataLogicException(
+                f"Questions are not part of the paper {paper_id}", question_uuids=list(missing_ids)
+            )
+
+        # Subjects and languages are resolved in bulk, creating the missing ones
+        subject_names = list({question_data.subject for question_data in questions_data if question_data.subject})
+        subject_uuids = {}
+        if subject_names:
+            subject_instances = await self.get_service(SubjectsService).create_bulk(subject_names)
+            subject_uuids = {subject_instance.name: subject_instance.uuid for subject_instance in subject_instances}
+        languages = list({question_data.language for question_data in questions_data if question_data.language})
+        language_uuids = {}
+        if languages:
+            language_instances = await self.get_service(LanguageService).create_bulk(languages)
+            language_uuids = {
+                language_instance.name: language_instance.uuid for language_instance in language_instances
+            }
+
+        questions_table = QuestionsModel.__table__
+        question_rows, marks_rows, marks_count = [], [], 0
+        for question_data in questions_data:
+            question_values = question_data.dict(
+                exclude_unset=True, exclude={"question_id", "subject", "language", "positive_marks", "negative_marks"}
+            )
+            if question_data.subject:
+                question_values["subject_id"] = subject_uuids[question_data.subject]
+            if question_data.language:
+                question_values["language_id"] = language_uuids[question_data.language]
+            for name, value in question_values.items():
+                if value is None and not questions_table.c[name].nullable:
+                    raise DataLogicException(f"{name} cannot be null", question_uuid=question_data.question_id)
+            if question_values:
+                question_rows.append({"uuid": question_data.question_id, **question_values})
+
+            marks_values = question_data.dict(exclude_unset=True, include={"positive_marks", "negative_marks"})
+            if None in marks_values.values():
+                raise DataLogicException("Marks cannot be null", question_uuid=question_data.question_id)
+            if marks_values:
+                marks_count += 1
+                marks_rows.extend(
+                    {"uuid": sub_section_question.uuid, **marks_values}
+                    for sub_section_question in paper_questions[question_data.question_id]
+                )
+
+        # Previous values of the edited columns, for the audit event
+        edited_columns = {name for row in question_rows for name in row} - {"uuid"}
+        previous_state = {str(question_id): {} for question_id in question_ids}
+        if edited_columns:
+            result = await self.session.execute(
+                select(QuestionsModel.uuid, *(questions_table.c[name] for name in edited_columns)).where(
+                    QuestionsModel.uuid.in_([row["uuid"] for row in question_rows])
+                )
+            )
+            for row in result.mappings():
+                previous_state[str(row["uuid"])] = {name: row[name] for name in edited_columns}
+        for question_id, links in paper_questions.items():
+            previous_state[str(question_id)]["marks"] = [
+                {"positive_marks": link.positive_marks, "negative_marks": link.negative_marks} for link in links
+            ]
+
+        # Edits are written to new versions of the questions, or to the copies of the questions shared with other drafts
+        questions_service = self.get_service(QuestionsService)
+        sub_section_questions_service = self.get_service(SubSectionQuestionsService)
+        forks = await self.fork_questions(paper_instance, [row["uuid"] for row in question_rows])
+        versions = await questions_service.create_versions(
+            [row["uuid"] for row in question_rows if row["uuid"] not in forks]
+        )
+        for row in question_rows:
+            row["uuid"] = forks.get(row["uuid"]) or versions[row["uuid"]]
+
+        await questions_service.update_from_values(question_rows)
+        await sub_section_questions_service.update_from_values(marks_rows)
+        updated_paper_ids = await sub_section_questions_service.follow_latest_versions(
+            PapersModel.status == PapersStatusEnum.DRAFT, list(versions)
+        )
+
+        message = f"Updated {len(questions_data)} questions of paper with uuid: {paper_id}"
+        logger.info(message)
+        audit_logger.info(
+            message,
+            previous_state=previous_state,
+            current_state={
+                str(question_data.question_id): question_data.dict(exclude_unset=True, exclude={"question_id"})
+                for question_data in questions_data
+            },
+            reference_uuid=paper_id,
+            table_name=QuestionsModel.__tablename__,
+            action="bulk_update",
+        )
+
+        # Other draft papers follow the new versions, published papers keep their versions and stay cached
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [*updated_paper_ids, paper_id])
+        if edited_columns & {"subject_id", "language_id", "difficulty"}:
+            invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+
+        return CBTQuestionsBatchUpdateResponseSchema(
+            paper_id=paper_id,
+            questions=len(questions_data),
+            marks=marks_count,
+            forked=len(forks),
+        )
+
+    # DELETE Functions
+
+    async def delete(self, paper_id: UUID, include_questions: bool = True) -> SoftDeleteCascadeSchema:
+        """
+        Soft delete the paper along with its questions and remove its content from the cache
+        :param paper_id: UUID for the paper.
+        :param include_questions: Delete the questions which are not used by any other paper
+        :return: Number of records deleted in every table
+        """
+        await self.get(paper_id)
+        deleted_at = datetime.utcnow()
+        cascade = await self.delete_cascade([PapersModel.uuid == paper_id], deleted_at, include_questions)
+        self.log_cascade(PapersModel, paper_id, cascade, action="cascade_delete")
+        return cascade
+
+    async def restore(self, paper_id: UUID) -> SoftDeleteCascadeSchema:
+        """
+        Restore a deleted paper along with the questions that were deleted with it
+        :param paper_id: UUID for the paper.
+        :return: Number of records restored in every table
+        """
+        paper_instance = await self.session.get(PapersModel, paper_id)
+        if paper_instance is None:
+            raise UUIDNotFoundException(model=PapersModel, uuid=paper_id)
+        if not paper_instance.is_deleted:
+            raise DataLogicException(f"Paper with ID {paper_id} is not deleted")
+        if (await self.session.get(ExamsModel, paper_instance.exam_id)).is_deleted:
+            raise DataLogicException(f"Exam of the paper {paper_id} is deleted, restore the exam instead")
+
+        cascade = await self.restore_cascade([PapersModel.uuid == paper_id], paper_instance.deleted_at)
+        self.log_cascade(PapersModel, paper_id, cascade, action="cascade_restore")
+        return cascade
+
+    async def delete_cascade(
+        self, filters: List, deleted_at: datetime, include_questions: bool = True
+    ) -> SoftDeleteCascadeSchema:
+        """
+        Soft delete the papers matching the filters, the questions used only by these papers and their options /
+        answers, with one UPDATE per table. Every record gets the same deleted_at, which is used to restore them.
+        :param filters: Filters on the papers
+        :param deleted_at: Time of the deletion
+        :param include_questions: Delete the questions which are not used by any other paper
+        :return: Number of records deleted in every table
+        """
+        # A deleted paper is unique by (exam, language, year, name, set) as per the unique_exam_paper_set constraint
+        deleted_papers = aliased(PapersModel)
+        result = await self.session.execute(
+            select(PapersModel.uuid).where(
+                *filters,
+                not_(PapersModel.is_deleted),
+                select(deleted_papers.uuid)
+                .where(deleted_papers.is_deleted, *self._same_paper_set(PapersModel, deleted_papers))
+                .exists(),
+            )
+        )
+        conflicting_ids = list(result.scalars())
+        if conflicting_ids:
+            raise DataLogicException("Papers already have a deleted copy of the same set", paper_uuids=conflicting_ids)
+
+        paper_ids = await self.soft_delete_bulk(filters, deleted_at)
+        cascade = SoftDeleteCascadeSchema(papers=len(paper_ids))
+        if paper_ids and include_questions:
+            # Questions of the deleted papers, excluding those used by papers which are not deleted
+            question_ids = await self.get_service(QuestionsService).soft_delete_bulk(
+                [
+                    QuestionsModel.uuid.in_(self._get_question_ids(PapersModel.uuid.in_(paper_ids))),
+                    QuestionsModel.uuid.not_in(self._get_question_ids(not_(PapersModel.is_deleted))),
+                ],
+                deleted_at,
+            )
+            cascade.questions = len(question_ids)
+            cascade.options, cascade.range_answers = await self._cascade_answers(deleted_at, restore=False)
+
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, paper_ids)
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+        return cascade
+
+    async def restore_cascade(self, filters: List, deleted_at: datetime) -> SoftDeleteCascadeSchema:
+        """
+        Restore the papers matching the filters that were deleted at deleted_at, along with the questions and options /
+        answers deleted with them
+        :param filters: Filters on the papers
+        :param deleted_at: Time of the deletion
+        :return: Number of records restored in every table
+        """
+        # A restored paper must not clash with a paper of the same set that is not deleted
+        live_papers = aliased(PapersModel)
+        result = await self.session.execute(
+            select(PapersModel.uuid).where(
+                *filters,
+                PapersModel.is_deleted,
+                PapersModel.deleted_at == deleted_at,
+                select(live_papers.uuid)
+                .where(not_(live_papers.is_deleted), *self._same_paper_set(PapersModel, live_papers))
+                .exists(),
+            )
+        )
+        conflicting_ids = list(result.scalars())
+        if conflicting_ids:
+            raise DataLogicException("Papers of the same set already exist", paper_uuids=conflicting_ids)
+
+        paper_ids = await self.restore_bulk(filters, deleted_at)
+        cascade = SoftDeleteCascadeSchema(papers=len(paper_ids))
+        if paper_ids:
+            # Options are restored first, as they are found through the questions which are still deleted
+            question_filters = [QuestionsModel.uuid.in_(self._get_question_ids(PapersModel.uuid.in_(paper_ids)))]
+            cascade.options, cascade.range_answers = await self._cascade_answers(
+                deleted_at, restore=True, question_filters=question_filters
+            )
+            question_ids = await self.get_service(QuestionsService).restore_bulk(question_filters, deleted_at)
+            cascade.questions = len(question_ids)
+
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, paper_ids)
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+        return cascade
+
+    async def _cascade_answers(
+        self, deleted_at: datetime, restore: bool, question_filters: List = ()
+    ) -> Tuple[int, int]:
+        """
+        Delete (or restore) the options and range answers of the deleted questions, having the deleted_at
+        :param deleted_at: Time of the deletion
+        :param restore: Restore the options and range answers instead of deleting them
+        :param question_filters: Additional filters on the questions
+        :return: Number of options and range answers
+        """
+        question_ids = select(QuestionsModel.uuid).where(
+            QuestionsModel.is_deleted, QuestionsModel.deleted_at == deleted_at, *question_filters
+        )
+        counts = []
+        for service in (self.get_service(OptionsService), self.get_service(RangeAnswersService)):
+            cascade_bulk = service.restore_bulk if restore else service.soft_delete_bulk
+            counts.append(len(await cascade_bulk([service.model.question_id.in_(question_ids)], deleted_at)))
+        return counts[0], counts[1]
+
+    @staticmethod
+    def _get_question_ids(paper_filter) -> Select:
+        """Statement selecting the questions used by the papers matching the filter"""
+        return (
+            select(SubSectionQuestionsModel.question_id)
+            .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+            .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+            .join(PapersModel, PapersModel.uuid == SectionsModel.paper_id)
+            .where(paper_filter)
+        )
+
+    @staticmethod
+    def _same_paper_set(paper, other_paper) -> List:
+        """Conditions for two papers having the same columns in the unique_exam_paper_set constraint"""
+        return [
+            other_paper.uuid != paper.uuid,
+            other_paper.exam_id == paper.exam_id,
+            other_paper.language_id == paper.language_id,
+            other_paper.year == paper.year,
+            other_paper.name == paper.name,
+            other_paper.paper_set == paper.paper_set,
+        ]
+
+    @staticmethod
+    def log_cascade(model, uuid: UUID, cascade: SoftDeleteCascadeSchema, action: str):
+        """Log one audit event for the records deleted / restored together"""
+        message = f"{action} of {model.__tablename__} record with uuid: {uuid}, {cascade.dict()}"
+        logger.info(message)
+        audit_logger.info(
+            message,
+            previous_state=dict(is_deleted=action != "cascade_delete"),
+            current_state=dict(is_deleted=action == "cascade_delete", **cascade.dict()),
+            reference_uuid=uuid,
+            table_name=model.__tablename__,
+            action=action,
+        )
+
 
 class TemplatesService(BaseService[TemplatesModel, TemplatesCreateDatabaseSchema, TemplatesUpdateDatabaseSchema]):
     def __init__(self, **kwargs):
@@ -491,8 +1355,12 @@ class SectionsService(BaseService[SectionsModel, SectionsCreateDatabaseSchema, S
             error_message = f"Section with ID {section_id} not found"
             logger.error(error_message)
             UUIDNotFoundException(model=SectionsModel, uuid=section_id)
+        PapersService.check_draft(await self.get_service(PapersService).get(section_instance.paper_id))
 
-        return await super().update(section_instance, section_data.dict(exclude_unset=True))
+        section_instance = await super().update(section_instance, section_data.dict(exclude_unset=True))
+
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [section_instance.paper_id])
+        return section_instance
 
 
 class SubSectionsService(
@@ -513,16 +1381,21 @@ class SubSectionsService(
             error_message = f"Sub-section with ID {sub_section_id} not found"
             logger.error(error_message)
             UUIDNotFoundException(model=SubSectionsModel, uuid=sub_section_id)
+        section_instance = await self.get_service(SectionsService).get(sub_section_instance.section_id)
+        PapersService.check_draft(await self.get_service(PapersService).get(section_instance.paper_id))
+
+        sub_section_instance = await super().update(sub_section_instance, sub_section_data.dict(exclude_unset=True))
 
-        return await super().update(sub_section_instance, sub_section_data.dict(exclude_unset=True))
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, [section_instance.paper_id])
+        return sub_section_instance
 
     async def update_question(self, sub_section_id: UUID, question_id: UUID, question_data: CBTQuestionUpdateSchema):
         """
-        This function will allow users to update question data in a sub-section.
+        This function will allow users to update question data in a sub-section of a draft paper.
         :param sub_section_id: Sub-section ID that needs to be updated
         :param question_id: Question ID that needs to be updated
         :param question_data: Question data that needs to be updated
-        :return: Sub-section instance that was updated
+        :return: New version (or copy) of the question having the edit
         """
         sub_section_instance = await self.get(sub_section_id)
         if not sub_section_instance:
@@ -530,11 +1403,22 @@ class SubSectionsService(
             logger.error(error_message)
             UUIDNotFoundException(model=SubSectionsModel, uuid=sub_section_id)
 
+        section_instance = await self.get_service(SectionsService).get(sub_section_instance.section_id)
+        paper_instance = await self.get_service(PapersService).get(section_instance.paper_id)
+        PapersService.check_draft(paper_instance)
+
+        # A question shared with other draft papers is edited on its copy
+        question_fields = question_data.dict(exclude_unset=True, exclude={"positive_marks", "negative_marks"})
+        forks = {}
+        if question_fields:
+            forks = await self.get_service(PapersService).fork_questions(paper_instance, [question_id])
+        question_id = forks.get(question_id, question_id)
+
         # Update positive and negative marks for the question
         positive_marks = question_data.positive_marks
         negative_marks = question_data.negative_marks
         if positive_marks or negative_marks:
-            sub_section_questions_service = SubSectionQuestionsService(session=self.session)
+            sub_section_questions_service = self.get_service(SubSectionQuestionsService)
             sub_section_question_instance = await sub_section_questions_service.filter(
                 [
                     SubSectionQuestionsModel.sub_section_id == sub_section_id,
@@ -552,9 +1436,23 @@ class SubSectionsService(
                 SubSectionQuestionsUpdateDatabaseSchema(positive_marks=positive_marks, negative_marks=negative_marks),
             )
 
-        # Update the question data
-        question_service = QuestionsService(session=self.session)
-        return await question_service.update(question_id, question_data)
+        # Update the question data, on a new version of the question unless it is a copy added above
+        question_service = self.get_service(QuestionsService)
+        paper_ids = {paper_instance.uuid}
+        if question_fields:
+            question_instance = await question_service.update(question_id, question_data, new_version=not forks)
+        else:
+            question_instance = await question_service.get(question_id)
+
+        # Draft papers using the question follow the new version, published papers keep their version
+        if question_fields and not forks:
+            paper_ids.update(
+                await self.get_service(SubSectionQuestionsService).follow_latest_versions(
+                    PapersModel.status == PapersStatusEnum.DRAFT, [question_id]
+                )
+            )
+        invalidation_bus.invalidate(self.session, PapersModel.__tablename__, paper_ids)
+        return question_instance
 
 
 class SubSectionQuestionsService(
@@ -564,3 +1462,51 @@ class SubSectionQuestionsService(
 ):
     def __init__(self, **kwargs):
         super().__init__(model=SubSectionQuestionsModel, **kwargs)
+
+    async def get_paper_ids(self, question_ids: List[UUID]) -> List[UUID]:
+        """
+        Get the papers in which the questions are used
+        :param question_ids: UUIDs of the questions
+        :return: List of paper uuids
+        """
+        result = await self.session.execute(
+            select(SectionsModel.paper_id)
+            .join(SubSectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+            .join(SubSectionQuestionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+            .where(SubSectionQuestionsModel.question_id.in_(question_ids))
+            .distinct()
+        )
+        return result.scalars().all()
+
+    async def follow_latest_versions(self, paper_filter, question_ids: Optional[List[UUID]] = None) -> List[UUID]:
+        """
+        Point the links of the papers at the latest versions of their questions, with a single UPDATE
+        :param paper_filter: Filter on the papers, e.g. the draft papers
+        :param question_ids: If passed, only the links of these (outdated) versions are updated
+        :return: UUIDs of the papers whose links were updated
+        """
+        linked_question = aliased(QuestionsModel)
+        latest_question = aliased(QuestionsModel)
+        filters = [
+            SubSectionQuestionsModel.sub_section_id == SubSectionsModel.uuid,
+            SubSectionsModel.section_id == SectionsModel.uuid,
+            SectionsModel.paper_id == PapersModel.uuid,
+            paper_filter,
+            SubSectionQuestionsModel.question_id == linked_question.uuid,
+            not_(linked_question.is_latest),
+            QuestionsService.get_root_id(latest_question) == QuestionsService.get_root_id(linked_question),
+            latest_question.is_latest,
+            not_(latest_question.is_deleted),
+        ]
+        if question_ids is not None:
+            filters.append(linked_question.uuid.in_(question_ids))
+
+        result = await self.session.execute(
+            update(self.model.__table__)
+            .where(*filters)
+            .values(question_id=latest_question.uuid)
+            .returning(SectionsModel.paper_id)
+        )
+        paper_ids = list(set(result.scalars()))
+        logger.debug(f"Links of {len(paper_ids)} papers moved to the latest versions of their questions")
+        return paper_ids
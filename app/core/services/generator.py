@@ -0,0 +1,231 @@
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.core.models.exams import PapersModel
+from app.core.models.questions import QuestionTagsModel, SubjectsModel, TagsModel
+from app.core.schemas.exams import SubSectionQuestionsCreateDatabaseSchema
+from app.core.services.exams import PapersService, SubSectionQuestionsService
+from app.core.services.question_bank import DIFFICULTY_BUCKET_SIZE, DifficultyBucket, question_bank_index
+from app.core.services.questions import LanguageService, SubjectsService
+from app.enums import QuestionTypeEnum
+from app.schemas import BlueprintSubSectionSchema, DifficultyBandSchema, PaperBlueprintSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+
+# Questions of a bucket within a range of difficulties, (bucket uuids, start index, end index)
+Span = Tuple[List[UUID], int, int]
+
+
+class PaperGeneratorService(PapersService):
+    """
+    Generates a paper from a blueprint by sampling questions from the question bank.
+    Questions are sampled from the buckets of `question_bank_index`, so the cost of sampling depends on the number of
+    questions requested and not on the size of the question bank.
+    """
+
+    async def generate_paper(self, exam_id: UUID, blueprint: PaperBlueprintSchema) -> PapersModel:
+        """
+        Generate a new paper for an exam using the blueprint.
+        :param exam_id: Exam ID for which paper needs to be generated
+        :param blueprint: Paper details, along with the quotas of each sub-section
+        :return: Paper instance that was created
+        """
+        rng = random.Random(blueprint.seed)
+
+        # Resolve the language and subjects used in the blueprint
+        language_service = self.get_service(LanguageService)
+        language_instance = await language_service.create(blueprint.language)
+
+        subject_names = list(
+            {sub_section.subject for section in blueprint.sections for sub_section in section.sub_sections}
+        )
+        subject_instances = await self.get_service(SubjectsService).filter([SubjectsModel.name.in_(subject_names)])
+        subject_uuids = {subject_instance.name: subject_instance.uuid for subject_instance in subject_instances}
+        missing_subjects = set(subject_names) - set(subject_uuids)
+        if missing_subjects:
+            raise DataLogicException("Subjects are not present in the question bank.", subjects=missing_subjects)
+
+        # Sample the questions of every sub-section before writing anything to the database
+        buckets = await question_bank_index.get_buckets(self.session)
+        selected_questions: Set[UUID] = set()
+        sampled_questions = []
+        for section in blueprint.sections:
+            for sub_section in section.sub_sections:
+                tagged_questions = await self._get_tagged_questions(
+                    subject_uuids[sub_section.subject], sub_section.tags
+                )
+                question_uuids = []
+                for question_type, count in sub_section.question_types.items():
+                    pools = self._get_pools(
+                        buckets.get((subject_uuids[sub_section.subject], language_instance.uuid, question_type), {}),
+                        sub_section.difficulty,
+                        count,
+                    )
+                    for pool, pool_count in pools:
+                        band_questions = self._sample(
+                            pool, pool_count, selected_questions, tagged_questions, rng, sub_section, question_type
+                        )
+                        # Bands might overlap, so the next bands exclude these right away
+                        selected_questions.update(band_questions)
+                        question_uuids.extend(band_questions)
+
+                # Questions of different types and difficulties are mixed within a sub-section
+                rng.shuffle(question_uuids)
+                sampled_questions.append(question_uuids)
+
+        # Materialize the paper through the sections, sub_sections and sub_section_questions tables
+        paper_instance = await self.create_paper_instance(exam_id, blueprint)
+        sub_sections = await self.create_paper_sections(paper_instance, blueprint.sections)
+
+        sub_section_questions_service = self.get_service(SubSectionQuestionsService)
+        await sub_section_questions_service.create_bulk(
+            [
+                SubSectionQuestionsCreateDatabaseSchema(
+                    sub_section_id=sub_section_instance.uuid,
+                    question_id=question_uuid,
+                    positive_marks=sub_section.positive_marks,
+                    negative_marks=sub_section.negative_marks,
+                    order=idx,
+                )
+                for (sub_section_instance, sub_section), question_uuids in zip(sub_sections, sampled_questions)
+                for idx, question_uuid in enumerate(question_uuids)
+            ]
+        )
+
+        logger.info(f"Generated paper {paper_instance.uuid} with {len(selected_questions)} questions")
+        return paper_instance
+
+    async def _get_tagged_questions(self, subject_uuid: UUID, tags: List[str]) -> Optional[Set[UUID]]:
+        """
+        Get the questions that have at least one of the tags
+        :param subject_uuid: Subject of the tags
+        :param tags: Tag names
+        :return: Set of question uuids, None if no tags are provided
+        """
+        if not tags:
+            return None
+
+        result = await self.session.execute(
+            select(QuestionTagsModel.question_id)
+            .join(TagsModel, QuestionTagsModel.tag_id == TagsModel.uuid)
+            .where(TagsModel.subject_id == subject_uuid, TagsModel.tag_name.in_(tags))
+        )
+        return set(result.scalars().all())
+
+    @staticmethod
+    def _allocate(count: int, bands: List[DifficultyBandSchema]) -> List[int]:
+        """
+        Split the count across the difficulty bands in the ratio of their weights (largest remainder method)
+        :param count: Number of questions to be split
+        :param bands: Difficulty bands
+        :return: Number of questions for each band
+        """
+        total_weight = sum(band.weight for band in bands)
+        quotas = [count * band.weight / total_weight for band in bands]
+        allocation = [int(quota) for quota in quotas]
+
+        # Distribute the remaining questions to the bands with the largest fractional part
+        remainders = sorted(range(len(bands)), key=lambda idx: quotas[idx] - allocation[idx], reverse=True)
+        for idx in remainders[: count - sum(allocation)]:
+            allocation[idx] += 1
+        return allocation
+
+    @staticmethod
+    def _get_pools(
+        difficulty_buckets: Dict[int, DifficultyBucket],
+        bands: List[DifficultyBandSchema],
+        count: int,
+    ) -> List[Tuple[List[Span], int]]:
+        """
+        Get the candidate questions for each difficulty band along with the number of questions to be sampled from them.
+        The candidates are spans of the buckets the band overlaps with, clamped to the exact difficulty range of the band.
+        :param difficulty_buckets: Questions of a (subject, language, question_type) grouped by difficulty bucket
+        :param bands: Difficulty bands, empty means any difficulty
+        :param count: Number of questions required
+        :return: List of (list of (bucket uuids, start, end) spans, number of questions to be sampled)
+        """
+        if not bands:
+            return [([(bucket.uuids, 0, len(bucket)) for bucket in difficulty_buckets.values()], count)]
+
+        pools = []
+        for band, band_count in zip(bands, PaperGeneratorService._allocate(count, bands)):
+            first_bucket = band.start // DIFFICULTY_BUCKET_SIZE
+            last_bucket = (band.end - 1) // DIFFICULTY_BUCKET_SIZE
+            spans = []
+            for bucket_idx, bucket in difficulty_buckets.items():
+                if first_bucket <= bucket_idx <= last_bucket:
+                    # Only the buckets at the edges of the band are partly covered by it
+                    start, end = bucket.get_span(band.start, band.end)
+                    if start < end:
+                        spans.append((bucket.uuids, start, end))
+            pools.append((spans, band_count))
+        return pools
+
+    @staticmethod
+    def _permute(total: int, rng: random.Random) -> Iterator[int]:
+        """
+        Yield the indices 0 to total - 1 in random order, as a Fisher-Yates shuffle that only keeps the swapped indices,
+        so taking the first few indices does not cost as much as the total
+        :param total: Number of indices
+        :param rng: Random number generator
+        :return: Iterator of the shuffled indices
+        """
+        swapped: Dict[int, int] = {}
+        for idx in range(total):
+            pick = rng.randrange(idx, total)
+            yield swapped.get(pick, pick)
+            swapped[pick] = swapped.get(idx, idx)
+
+    @staticmethod
+    def _sample(
+        pool: List[Span],
+        count: int,
+        exclude: Set[UUID],
+        tagged_questions: Optional[Set[UUID]],
+        rng: random.Random,
+        sub_section: BlueprintSubSectionSchema,
+        question_type: QuestionTypeEnum,
+    ) -> List[UUID]:
+        """
+        Sample distinct questions from spans of the buckets without copying the buckets
+        :param pool: Spans of the buckets, (bucket uuids, start, end)
+        :param count: Number of questions to be sampled
+        :param exclude: Questions already selected in the paper
+        :param tagged_questions: If provided, only these questions are sampled
+        :param rng: Random number generator
+        :param sub_section: Sub-section for which questions are sampled, used in the error message
+        :param question_type: Type of the questions, used in the error message
+        :return: List of question uuids
+        """
+        if count == 0:
+            return []
+
+        # The spans are treated as one virtual list, an index is mapped to its span using the cumulative sizes
+        offsets = list(accumulate(end - start for _, start, end in pool))
+        total = offsets[-1] if offsets else 0
+
+        # Questions are drawn until enough of them are neither excluded nor untagged, or the spans run out
+        sampled = []
+        for idx in PaperGeneratorService._permute(total, rng):
+            span_idx = bisect_right(offsets, idx)
+            uuids, start, _ = pool[span_idx]
+            question_uuid = uuids[start + idx - (offsets[span_idx - 1] if span_idx else 0)]
+            if question_uuid in exclude or (tagged_questions is not None and question_uuid not in tagged_questions):
+                continue
+            sampled.append(question_uuid)
+            if len(sampled) == count:
+                return sampled
+
+        raise DataLogicException(
+            "Not enough questions in the question bank for the blueprint.",
+            sub_section=sub_section.name,
+            subject=sub_section.subject,
+            question_type=question_type.value,
+            required=count,
+            available=len(sampled),
+        )
@@ -0,0 +1,264 @@
+"""
+Compact encoding of the responses and answer keys of a paper.
+
+Questions are indexed by their position in the paper (unshuffled) and the options of a question by their option_order,
+so the selection of a MCQ/MSQ question is a bitmask of the selected options and a NAT response is a float. Whole
+response sheets and answer keys are packed in arrays of float64, i.e. 8 bytes per question instead of a list of uuids.
+Candidates send the uuids of the selected options, so the shuffling of a candidate does not change the encoding.
+"""
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from app.enums import QuestionTypeEnum
+from app.schemas import AttemptScoreSchema, CBTQuestionsResponseSchema, CBTResponseSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+
+# Masks are stored in an integer column, so a question can have at most 31 options
+MAX_OPTIONS = 31
+
+NOT_ANSWERED = math.nan
+
+
+def iter_questions(cbt_response: CBTResponseSchema) -> Iterator[CBTQuestionsResponseSchema]:
+    """Questions of the paper in the order of the paper"""
+    for section in cbt_response.sections:
+        for sub_section in section.sub_sections:
+            yield from sub_section.questions
+
+
+def to_bytes(values: array) -> bytes:
+    """Little endian bytes of the array, so that the payloads do not depend on the machine"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_bytes(payload: bytes, typecode: str = "d") -> array:
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class PaperLayout:
+    """
+    Position of every question in the paper, the section it belongs to, its type and the bit of every option in its
+    question
+    """
+
+    def __init__(self, paper_id: UUID, sections: Iterable[Iterable[CBTQuestionsResponseSchema]]):
+        self.paper_id = paper_id
+        self.question_ids: List[UUID] = []
+        self.question_index: Dict[UUID, int] = {}
+        self.question_sections: List[int] = []  # Index of the section of every question
+        self.question_types: List[QuestionTypeEnum] = []
+        self.option_bits: Dict[UUID, Dict[UUID, int]] = {}
+
+        for section_idx, questions in enumerate(sections):
+            for question in questions:
+                if len(question.options) > MAX_OPTIONS:
+                    raise DataLogicException(
+                        f"Question has more than {MAX_OPTIONS} options", question_uuid=question.uuid
+                    )
+
+                self.question_index[question.uuid] = len(self.question_ids)
+                self.question_ids.append(question.uuid)
+                self.question_sections.append(section_idx)
+                self.question_types.append(question.question_type)
+                # Options of the CBT response are ordered by option_order
+                self.option_bits[question.uuid] = {option.uuid: 1 << idx for idx, option in enumerate(question.options)}
+
+    @classmethod
+    def from_cbt_response(cls, cbt_response: CBTResponseSchema) -> "PaperLayout":
+        return cls(
+            cbt_response.uuid,
+            (
+                [question for sub_section in section.sub_sections for question in sub_section.questions]
+                for section in cbt_response.sections
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def __contains__(self, question_id: UUID) -> bool:
+        return question_id in self.question_index
+
+    def get_section(self, question_id: UUID) -> int:
+        """Index of the section of the question"""
+        return self.question_sections[self.question_index[question_id]]
+
+    def get_question_type(self, question_id: UUID) -> QuestionTypeEnum:
+        return self.question_types[self.question_index[question_id]]
+
+    def encode_options(self, question_id: UUID, option_ids: Iterable[UUID]) -> int:
+        """
+        Bitmask of the options of a question
+        :param question_id: UUID of the question
+        :param option_ids: UUIDs of the selected options
+        :return: Bitmask where the bit `i` is set if the option at option_order `i` is selected
+        """
+        option_bits = self.option_bits[question_id]
+        mask = 0
+        for option_id in option_ids:
+            bit = option_bits.get(option_id)
+            if bit is None:
+                raise DataLogicException("Option does not belong to the question", question_uuid=question_id)
+            mask |= bit
+        return mask
+
+    def decode_options(self, question_id: UUID, mask: int) -> List[UUID]:
+        """UUIDs of the options selected in the bitmask, in option_order"""
+        return [option_id for option_id, bit in self.option_bits[question_id].items() if mask & bit]
+
+
+class ResponseSheet:
+    """
+    Responses of an attempt, one float64 per question of the paper layout. Holds the bitmask of the selected options
+    for MCQ/MSQ and the value for NAT, NaN if the question is not answered.
+    """
+
+    __slots__ = ("answers",)
+
+    def __init__(self, answers: array):
+        self.answers = answers
+
+    @classmethod
+    def from_responses(
+        cls, layout: PaperLayout, responses: Iterable[Tuple[UUID, Optional[int], Optional[float]]]
+    ) -> "ResponseSheet":
+        """
+        Pack the responses as per the layout, the mask of MCQ/MSQ and the value of NAT
+        :param layout: Layout of the paper
+        :param responses: Tuples of question uuid, selected mask and value
+        :return: Response sheet
+        """
+        answers = array("d", [NOT_ANSWERED]) * len(layout)
+        for question_id, selected_mask, value in responses:
+            idx = layout.question_index.get(question_id)
+            if idx is None:
+                continue
+            if layout.question_types[idx] == QuestionTypeEnum.NAT:
+                if value is not None:
+                    answers[idx] = value
+            elif selected_mask:
+                answers[idx] = selected_mask
+        return cls(answers)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "ResponseSheet":
+        return cls(from_bytes(payload))
+
+    def to_bytes(self) -> bytes:
+        return to_bytes(self.answers)
+
+
+class AnswerKey:
+    """
+    Answer key of a paper, packed as per the paper layout. For MCQ/MSQ `lower` holds the bitmask of the correct options
+    and `upper` is NaN, for NAT the answer is the range [lower, upper].
+    """
+
+    __slots__ = ("lower", "upper", "positive_marks", "negative_marks")
+
+    def __init__(self, lower: array, upper: array, positive_marks: array, negative_marks: array):
+        self.lower = lower
+        self.upper = upper
+        self.positive_marks = positive_marks
+        self.negative_marks = negative_marks
+
+    @classmethod
+    def build(
+        cls, layout: PaperLayout, questions: Iterable[CBTQuestionsResponseSchema], solution: Dict[UUID, List]
+    ) -> "AnswerKey":
+        """
+        Pack the answer key of the paper
+        :param layout: Layout of the paper
+        :param questions: Questions of the paper, having the marks
+        :param solution: Solution of the paper, question uuid -> correct option uuids / answer range
+        :return: Answer key
+        """
+        size = len(layout)
+        answer_key = cls(*(array("d", [NOT_ANSWERED]) * size for _ in range(4)))
+        for question in questions:
+            idx = layout.question_index[question.uuid]
+            answer = solution.get(question.uuid, [])
+            if question.question_type == QuestionTypeEnum.NAT:
+                if not answer:
+                    raise DataLogicException("Question has no answer", question_uuid=question.uuid)
+                answer_key.lower[idx], answer_key.upper[idx] = answer
+            else:
+                answer_key.lower[idx] = layout.encode_options(question.uuid, answer)
+            answer_key.positive_marks[idx] = question.positive_marks
+            answer_key.negative_marks[idx] = question.negative_marks
+        return answer_key
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "AnswerKey":
+        values = from_bytes(payload)
+        size = len(values) // 4
+        return cls(*(values[idx * size : (idx + 1) * size] for idx in range(4)))
+
+    @classmethod
+    def from_buffer(cls, payload: memoryview) -> "AnswerKey":
+        """
+        Answer key viewing the payload in place (say a snapshot), without copying it. Copied on big endian machines.
+        """
+        if sys.byteorder == "big":
+            return cls.from_bytes(bytes(payload))
+        values = payload.cast("d")
+        size = len(values) // 4
+        return cls(*(values[idx * size : (idx + 1) * size] for idx in range(4)))
+
+    def to_bytes(self) -> bytes:
+        # Views over a payload (see from_buffer) are copied to arrays, they cannot be concatenated
+        lower, upper, positive_marks, negative_marks = (
+            values if isinstance(values, array) else array("d", values)
+            for values in (self.lower, self.upper, self.positive_marks, self.negative_marks)
+        )
+        return to_bytes(lower + upper + positive_marks + negative_marks)
+
+    def grade(self, sheet: ResponseSheet, layout: Optional[PaperLayout] = None) -> AttemptScoreSchema:
+        """
+        Grade a response sheet. MCQ/MSQ are correct only if the selected options are exactly the correct ones,
+        NAT if the value is within the range. Incorrect answers get the negative marks.
+        :param sheet: Response sheet packed with the same layout
+        :param layout: Layout of the paper, if passed the score of every section is computed as well
+        :return: Score along with the number of correct, incorrect and unattempted questions
+        """
+        score, correct, incorrect, unattempted = 0.0, 0, 0, 0
+        section_scores = [0.0] * (max(layout.question_sections, default=-1) + 1) if layout else []
+        for idx, answer in enumerate(sheet.answers):
+            if math.isnan(answer):
+                unattempted += 1
+                continue
+
+            upper = self.upper[idx]
+            if math.isnan(upper):
+                is_correct = int(answer) == int(self.lower[idx])
+            else:
+                is_correct = self.lower[idx] <= answer <= upper
+
+            if is_correct:
+                marks = self.positive_marks[idx]
+                correct += 1
+            else:
+                marks = -self.negative_marks[idx]
+                incorrect += 1
+
+            score += marks
+            if layout:
+                section_scores[layout.question_sections[idx]] += marks
+
+        return AttemptScoreSchema(
+            score=score,
+            correct=correct,
+            incorrect=incorrect,
+            unattempted=unattempted,
+            section_scores=section_scores,
+        )
@@ -0,0 +1,149 @@
+"""
+In-process index over the question bank which is used to sample questions without `ORDER BY random()`
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import not_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import configuration
+from app.core.invalidation import invalidation_bus
+from app.core.models.questions import QuestionsModel
+from app.enums import QuestionTypeEnum
+
+# Width of a difficulty bucket, difficulty 0-99 goes to bucket 0, 100-199 to bucket 1, and so on
+DIFFICULTY_BUCKET_SIZE = 100
+
+# Number of rows fetched from the database in one go while building the index
+INDEX_BUILD_BATCH_SIZE = 10000
+
+
+class DifficultyBucket:
+    """
+    Questions of a difficulty bucket sorted by difficulty. The difficulties and uuids are kept in parallel lists, so
+    the questions within a range of difficulties are a slice of the bucket.
+    """
+
+    __slots__ = ("difficulties", "uuids")
+
+    def __init__(self):
+        self.difficulties: List[int] = []
+        self.uuids: List[UUID] = []
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def add(self, uuid: UUID, difficulty: int):
+        """Add a question, the bucket is sorted once every question is added"""
+        self.difficulties.append(difficulty)
+        self.uuids.append(uuid)
+
+    def sort(self):
+        """Sort the questions by difficulty"""
+        order = sorted(range(len(self.uuids)), key=self.difficulties.__getitem__)
+        self.difficulties = [self.difficulties[idx] for idx in order]
+        self.uuids = [self.uuids[idx] for idx in order]
+
+    def get_span(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Get the slice of the questions having difficulty in the range
+        :param start: Difficulty to start from (inclusive)
+        :param end: Difficulty to end at (exclusive)
+        :return: Start and end indices of the slice
+        """
+        return bisect_left(self.difficulties, start), bisect_left(self.difficulties, end)
+
+
+# (subject_id, language_id, question_type) -> {difficulty bucket -> questions of the bucket}
+BucketKey = Tuple[UUID, UUID, QuestionTypeEnum]
+Buckets = Dict[BucketKey, Dict[int, DifficultyBucket]]
+
+
+class QuestionBankIndex:
+    """
+    Keeps the uuids of all the questions grouped in (subject, language, question type, difficulty bucket) buckets.
+    The index is built lazily with a single streamed query and rebuilt once it is older than the TTL or has been
+    invalidated by a write to the questions table.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._buckets: Buckets = {}
+        self._built_at: Optional[float] = None
+        # Created on first use, so that it belongs to the event loop of the app (python 3.9 binds it at creation)
+        self._lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def get_bucket(difficulty: int) -> int:
+        """Difficulty bucket for a difficulty value"""
+        return difficulty // DIFFICULTY_BUCKET_SIZE
+
+    def is_stale(self) -> bool:
+        """Check if the index needs to be (re)built"""
+        return self._built_at is None or time.monotonic() - self._built_at > self.ttl
+
+    def invalidate(self):
+        """Mark the index as stale, so it is rebuilt on the next read"""
+        self._built_at = None
+
+    async def get_buckets(self, session: AsyncSession) -> Buckets:
+        """
+        Get the buckets, building the index if it is stale
+        :param session: Session used to build the index
+        :return: Buckets of question uuids
+        """
+        if self.is_stale():
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                # Another coroutine might have built the index while we were waiting for the lock
+                if self.is_stale():
+                    await self._build(session)
+        return self._buckets
+
+    async def _build(self, session: AsyncSession):
+        """Build the index by streaming the (uuid, subject, language, type, difficulty) of the latest versions"""
+        start_time = time.monotonic()
+        stmt = (
+            select(
+                QuestionsModel.uuid,
+                QuestionsModel.subject_id,
+                QuestionsModel.language_id,
+                QuestionsModel.question_type,
+                QuestionsModel.difficulty,
+            )
+            .where(not_(QuestionsModel.is_deleted), QuestionsModel.is_latest)
+            .execution_options(yield_per=INDEX_BUILD_BATCH_SIZE)
+        )
+
+        buckets: Buckets = {}
+        row_count = 0
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            for uuid, subject_id, language_id, question_type, difficulty in partition:
+                buckets.setdefault((subject_id, language_id, question_type), {}).setdefault(
+                    self.get_bucket(difficulty), DifficultyBucket()
+                ).add(uuid, difficulty)
+            row_count += len(partition)
+
+        for difficulty_buckets in buckets.values():
+            for bucket in difficulty_buckets.values():
+                bucket.sort()
+
+        self._buckets = buckets
+        self._built_at = time.monotonic()
+        logger.info(
+            f"Question bank index built with {row_count} questions in {len(buckets)} groups, "
+            f"took {self._built_at - start_time:.3f} seconds"
+        )
+
+
+# Shared by all the requests of a worker
+question_bank_index = QuestionBankIndex(ttl=configuration.QUESTION_BANK_INDEX_TTL)
+# Rebuilt as a whole, whichever questions were written by any worker
+invalidation_bus.watch(QuestionsModel.__tablename__, lambda _uuids: question_bank_index.invalidate())
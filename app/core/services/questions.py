@@ -1,6 +1,9 @@
 from typing import Dict, List
-from uuid import UUID
+from uuid import UUID, uuid4
 
+from sqlalchemy import func, not_, select
+
+from app.core.invalidation import invalidation_bus
 from app.core.models.questions import (
     LanguageModel,
     OptionsModel,
@@ -27,14 +30,14 @@ from app.core.schemas.questions import (
     SubjectsUpdateSchema,
     TagsCreateUpdateSchema,
 )
-from app.core.services.base import BaseService
+from app.core.services.base import BaseService, SoftDeleteBaseService
 from app.core.services.utils import helper_functions
 from app.enums import ContentTypeEnum, LanguageEnum, QuestionTypeEnum
 from app.schemas import CBTOptionsResponseSchema, CBTQuestionUpdateSchema, QuestionsResponseSchema
 from app.utils.exceptions.common_exceptions import DataLogicException
 
 
-class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, QuestionsUpdateSchema]):
+class QuestionsService(SoftDeleteBaseService[QuestionsModel, QuestionsCreateSchema, QuestionsUpdateSchema]):
     def __init__(self, **kwargs):
         super().__init__(model=QuestionsModel, **kwargs)
 
@@ -58,13 +61,13 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
 
         # Fetch the subject_uuid from the database
         subject = question_upload_obj.subject
-        subject_service = SubjectsService(session=self.session)
+        subject_service = self.get_service(SubjectsService)
         subject_instance = await subject_service.create(subject)
         subject_uuid = subject_instance.uuid
 
         # Fetch the language from the database
         language = question_upload_obj.language
-        language_service = LanguageService(session=self.session)
+        language_service = self.get_service(LanguageService)
         language_instance = await language_service.create(language)
         language_uuid = language_instance.uuid
 
@@ -74,7 +77,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
 
         # Add passage to the database
         if question_upload_obj.passage:
-            passage_service = PassagesService(session=self.session)
+            passage_service = self.get_service(PassagesService)
             passage_instance = await passage_service.create(
                 PassagesCreateUpdateSchema(passage_text=question_upload_obj.passage)
             )
@@ -83,7 +86,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         # Now we'll check if the tags are present in the database
         tags = question_upload_obj.tags
         if tags:
-            tag_service = TagsService(session=self.session)
+            tag_service = self.get_service(TagsService)
             tags_instances = await tag_service.create_bulk(
                 [TagsCreateUpdateSchema(tag_name=tag, subject_id=subject_uuid) for tag in tags]
             )
@@ -92,7 +95,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
             question_instance = await super().create(question)
 
             # Add these tags to the question
-            question_tags_service = QuestionTagsService(session=self.session)
+            question_tags_service = self.get_service(QuestionTagsService)
             await question_tags_service.create_bulk(
                 [
                     QuestionTagsCreateUpdateSchema(question_id=question_instance.uuid, tag_id=tag_instance.uuid)
@@ -117,7 +120,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
                 )
 
             # Add options to the database
-            options_service = OptionsService(session=self.session)
+            options_service = self.get_service(OptionsService)
             await options_service.create_bulk(
                 [OptionsCreateSchema(**option.dict(), question_id=question_instance.uuid) for option in options]
             )
@@ -131,12 +134,15 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
                     question_uuid=question_instance.uuid,
                     answer=answer,
                 )
-            range_answer_service = RangeAnswersService(session=self.session)
+            range_answer_service = self.get_service(RangeAnswersService)
             await range_answer_service.create(
                 RangeAnswerCreateSchema(question_id=question_instance.uuid, **answer.dict())
             )
         # Else is not required as currently we only have 3 types of questions - MCQ, MSQ, NAT
 
+        # New question should be available to the paper generator
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+
         return question_instance
 
     async def create_bulk(self, questions_dict: List[dict]) -> List[QuestionsModel]:
@@ -157,13 +163,13 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         questions_upload_obj = [QuestionsUploadSchema.parse_obj(question) for question in questions_dict]
 
         # Fetch the subject_uuid from the database
-        subject_service = SubjectsService(session=self.session)
+        subject_service = self.get_service(SubjectsService)
         subjects = [question.subject for question in questions_upload_obj]
         subject_instances = await subject_service.create_bulk(subjects)
         subject_uuids = {subject.name: subject.uuid for subject in subject_instances}
 
         # Fetch the subject_uuid from the database
-        language_service = LanguageService(session=self.session)
+        language_service = self.get_service(LanguageService)
         languages = [question.language for question in questions_upload_obj]
         language_instances = await language_service.create_bulk(languages)
         language_uuids = {language.name: language.uuid for language in language_instances}
@@ -181,7 +187,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         passages = {question.passage for question in questions_upload_obj if question.passage}
         if passages != {None}:
             # Add the unique passages to the table and retrieve the uuid of the existing ones.
-            passage_service = PassagesService(session=self.session)
+            passage_service = self.get_service(PassagesService)
             passage_instances = await passage_service.create_bulk(
                 [PassagesCreateUpdateSchema(passage_text=passage) for passage in passages]
             )
@@ -199,14 +205,14 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
             for tag in question.tags
         ]
         if tags:
-            tag_service = TagsService(session=self.session)
+            tag_service = self.get_service(TagsService)
             tags_instances = await tag_service.create_bulk(tags)
             tags_uuids = {tag.tag_name: tag.uuid for tag in tags_instances}
 
             question_instances = await super().create_bulk(questions)
 
             # Add these tags to the question
-            question_tags_service = QuestionTagsService(session=self.session)
+            question_tags_service = self.get_service(QuestionTagsService)
             question_tags = [
                 QuestionTagsCreateUpdateSchema(question_id=question.uuid, tag_id=tags_uuids[tag])
                 for question, tag in zip(question_instances, questions_upload_obj)
@@ -230,7 +236,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
                     for option in question[1].options
                 ]
 
-                options_service = OptionsService(session=self.session)
+                options_service = self.get_service(OptionsService)
                 await options_service.create_bulk(options)
 
             elif question_type == QuestionTypeEnum.NAT:
@@ -239,10 +245,13 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
                     for question in question_data
                 ]
 
-                range_answer_service = RangeAnswersService(session=self.session)
+                range_answer_service = self.get_service(RangeAnswersService)
                 await range_answer_service.create_bulk(answers)
         # Else is not required as currently we only have 3 types of questions - MCQ, MSQ, NAT
 
+        # New questions should be available to the paper generator
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+
         return question_instances
 
     # Get Functions
@@ -266,8 +275,11 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         }
 
         # Fetch the options for the questions
-        options_service = OptionsService(session=self.session)
-        options_instances = await options_service.filter([OptionsModel.question_id.in_(question_uuids)])
+        options_service = self.get_service(OptionsService)
+        # Options are ordered, so that every response (and the permutations applied on it) is deterministic
+        options_instances = await options_service.filter(
+            [OptionsModel.question_id.in_(question_uuids)], order_by="option_order"
+        )
 
         # Populate the options in the response_dict
         for options_instance in options_instances:
@@ -282,7 +294,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
             if question_instance.passage_id
         }
 
-        passage_service = PassagesService(session=self.session)
+        passage_service = self.get_service(PassagesService)
         passage_instances = await passage_service.filter([PassagesModel.uuid.in_(list(passage_uuid_dict.keys()))])
 
         # Populate the passage in the response_dict
@@ -308,10 +320,10 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
 
         response_dict = {}
 
-        options_service = OptionsService(session=self.session)
+        options_service = self.get_service(OptionsService)
         options_instances = await options_service.filter([OptionsModel.question_id.in_(question_uuids)])
 
-        range_answer_service = RangeAnswersService(session=self.session)
+        range_answer_service = self.get_service(RangeAnswersService)
         range_answer_instances = await range_answer_service.filter([RangeAnswersModel.question_id.in_(question_uuids)])
 
         for option_instance in options_instances:
@@ -331,16 +343,24 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
 
     # Update Functions
 
-    async def update(self, question_uuid: UUID, question_data: CBTQuestionUpdateSchema) -> QuestionsModel:
+    async def update(
+        self, question_uuid: UUID, question_data: CBTQuestionUpdateSchema, new_version: bool = True
+    ) -> QuestionsModel:
         """
         This function allows us to update the question in the database.
+        - The edit is written to a new version of the question, the edited version stays as it is.
         - If the subject is not present in the database, it will create a new subject.
         - If the tags are not present in the database, it will create new tags.
 
         :param question_uuid: UUID of the question to be updated
         :param question_data: Data to be updated in the database
-        :return: Question Model
+        :param new_version: Add a new version, False for a question added in the same transaction (e.g. a fork)
+        :return: Question Model of the new version
         """
+        if new_version:
+            versions = await self.create_versions([question_uuid])
+            question_uuid = versions[question_uuid]
+
         # Fetch the question instance from the database
         question_instance = await self.get(question_uuid)
         updated_instance = question_instance
@@ -353,7 +373,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         # Fetch the subject_uuid from the database
         subject = question_data.subject
         if subject:
-            subject_service = SubjectsService(session=self.session)
+            subject_service = self.get_service(SubjectsService)
             subject_instance = await subject_service.create(subject)
             subject_uuid = subject_instance.uuid
             updated_instance.subject_id = subject_uuid
@@ -361,14 +381,14 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         # Fetch the language from the database
         language = question_data.language
         if language:
-            language_service = LanguageService(session=self.session)
+            language_service = self.get_service(LanguageService)
             language_instance = await language_service.create(language)
             language_uuid = language_instance.uuid
             updated_instance.language_id = language_uuid
 
         # Add passage to the database
         if question_data.passage:
-            passage_service = PassagesService(session=self.session)
+            passage_service = self.get_service(PassagesService)
             passage_instance = await passage_service.create(
                 PassagesCreateUpdateSchema(passage_text=question_data.passage)
             )
@@ -381,7 +401,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
         # Now we'll check if the tags are present in the database
         tags = question_data.tags
         if tags:
-            tag_service = TagsService(session=self.session)
+            tag_service = self.get_service(TagsService)
             tags_instances = await tag_service.create_bulk(
                 [TagsCreateUpdateSchema(tag_name=tag, subject_id=updated_instance.subject_id) for tag in tags]
             )
@@ -392,7 +412,7 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
             )
 
             # Add these tags to the question
-            question_tags_service = QuestionTagsService(session=self.session)
+            question_tags_service = self.get_service(QuestionTagsService)
             await question_tags_service.create_bulk(
                 [
                     QuestionTagsCreateUpdateSchema(question_id=question_instance.uuid, tag_id=tag_instance.uuid)
@@ -405,8 +425,91 @@ class QuestionsService(BaseService[QuestionsModel, QuestionsCreateSchema, Questi
                 question_instance, QuestionsUpdateSchema.from_orm(updated_instance)
             )
 
+        # Subject, language or difficulty might have changed, which changes the bucket of the question
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+
         return updated_question_instance
 
+    # Version Functions
+
+    @staticmethod
+    def get_root_id(model=QuestionsModel):
+        """Expression of the UUID of the first version of the questions, shared by all the versions"""
+        return func.coalesce(model.root_id, model.uuid)
+
+    async def create_versions(self, question_ids: List[UUID]) -> Dict[UUID, UUID]:
+        """
+        Add a new version of the questions, copied along with their options, range answers and tags. The new versions
+        become the latest versions, the previous versions are kept as they are for the papers linking them.
+
+        :param question_ids: UUIDs of the latest versions of the questions
+        :return: UUID of every question -> UUID of its new version
+        """
+        if not question_ids:
+            return {}
+
+        # Locked, so that concurrent edits of a question do not branch its versions
+        result = await self.session.execute(
+            select(self.model.uuid, self.model.root_id, self.model.version, self.model.is_latest)
+            .where(self.model.uuid.in_(question_ids), not_(self.model.is_deleted))
+            .with_for_update()
+        )
+        rows = result.all()
+        missing_ids = set(question_ids) - {row.uuid for row in rows}
+        if missing_ids:
+            raise DataLogicException("Questions not found", question_uuids=list(missing_ids))
+        outdated_ids = [row.uuid for row in rows if not row.is_latest]
+        if outdated_ids:
+            raise DataLogicException(
+                "Questions have newer versions, edit the latest version", question_uuids=outdated_ids
+            )
+
+        versions = {row.uuid: uuid4() for row in rows}
+        await self.copy(
+            [
+                {
+                    "source": row.uuid,
+                    "uuid": versions[row.uuid],
+                    "root_id": row.root_id or row.uuid,
+                    "version": row.version + 1,
+                }
+                for row in rows
+            ]
+        )
+        await self.update_bulk(filters=[self.model.uuid.in_(list(versions))], updated_values={"is_latest": False})
+        return versions
+
+    async def fork(self, forks: Dict[UUID, UUID]) -> int:
+        """
+        Copy the questions as new questions, having their own versions
+        :param forks: UUID of every question -> UUID of its copy
+        :return: Number of questions copied
+        """
+        return await self.copy(
+            [
+                {"source": question_id, "uuid": fork_id, "root_id": None, "version": 1}
+                for question_id, fork_id in forks.items()
+            ]
+        )
+
+    async def copy(self, rows: List[Dict]) -> int:
+        """
+        Copy the questions along with their options, range answers and tags, with one `INSERT ... SELECT` per table.
+        Passages are shared by the copies, as an edited passage is added as a new passage.
+
+        :param rows: UUID of every question under "source" along with the uuid, root_id and version of its copy
+        :return: Number of questions copied
+        """
+        copied_count = await self.copy_from_values(rows, filters=[not_(self.model.is_deleted)])
+
+        answer_rows = [{"source": row["source"], "question_id": row["uuid"]} for row in rows]
+        for service in (self.get_service(OptionsService), self.get_service(RangeAnswersService)):
+            await service.copy_from_values(answer_rows, key="question_id", filters=[not_(service.model.is_deleted)])
+        await self.get_service(QuestionTagsService).copy_from_values(answer_rows, key="question_id")
+
+        invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+        return copied_count
+
 
 class SubjectsService(BaseService[SubjectsModel, SubjectsCreateSchema, SubjectsUpdateSchema]):
     def __init__(self, **kwargs):
@@ -568,7 +671,7 @@ class QuestionTagsService(
         return result
 
 
-class OptionsService(BaseService[OptionsModel, OptionsCreateSchema, OptionsUpdateSchema]):
+class OptionsService(SoftDeleteBaseService[OptionsModel, OptionsCreateSchema, OptionsUpdateSchema]):
     def __init__(self, **kwargs):
         super().__init__(OptionsModel, **kwargs)
 
@@ -616,7 +719,7 @@ class OptionsService(BaseService[OptionsModel, OptionsCreateSchema, OptionsUpdat
         return options_instances
 
 
-class RangeAnswersService(BaseService[RangeAnswersModel, RangeAnswerCreateSchema, RangeAnswerUpdateSchema]):
+class RangeAnswersService(SoftDeleteBaseService[RangeAnswersModel, RangeAnswerCreateSchema, RangeAnswerUpdateSchema]):
     def __init__(self, **kwargs):
         super().__init__(RangeAnswersModel, **kwargs)
 
@@ -0,0 +1,192 @@
+"""
+Ranking of the candidates of a paper.
+
+Scores of a paper are multiples of the granularity of its marks, so the score distribution of the paper (and of every
+section) is kept as a Fenwick tree over the possible scores. A rank or percentile is a prefix sum, and a submission is a
+point update, both O(log n) in the number of possible scores. The distribution is persisted as the number of candidates
+having a score, updated in the transaction of the submission.
+"""
+from fractions import Fraction
+from functools import reduce
+from math import gcd
+from typing import Dict, Iterable, List, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.cache import rankings_cache
+from app.core.models.attempts import RankBucketsModel
+from app.core.schemas.attempts import RankBucketsCreateDatabaseSchema, RankBucketsUpdateDatabaseSchema
+from app.core.services.base import BaseService
+from app.core.services.exams import PapersService
+from app.core.services.packing import AnswerKey, PaperLayout
+from app.schemas import AttemptScoreSchema
+
+# Section index of the distribution of the whole paper
+PAPER_SCOPE = -1
+
+
+class FenwickTree:
+    """Binary indexed tree of counts, supporting point updates and prefix sums in O(log n)"""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, size: int):
+        self.tree = [0] * (size + 1)
+
+    def add(self, idx: int, delta: int = 1):
+        """Add delta to the count at idx (0 based)"""
+        idx += 1
+        while idx < len(self.tree):
+            self.tree[idx] += delta
+            idx += idx & -idx
+
+    def prefix_sum(self, idx: int) -> int:
+        """Sum of the counts from 0 to idx (inclusive)"""
+        idx += 1
+        total = 0
+        while idx > 0:
+            total += self.tree[idx]
+            idx -= idx & -idx
+        return total
+
+
+class ScoreScale:
+    """Possible scores of a paper (or a section), from the lowest to the highest score in steps of the granularity"""
+
+    __slots__ = ("minimum", "granularity", "size")
+
+    def __init__(self, positive_marks: Iterable[float], negative_marks: Iterable[float]):
+        positive_marks, negative_marks = list(positive_marks), list(negative_marks)
+        marks = [Fraction(mark).limit_denominator(1000) for mark in positive_marks + negative_marks if mark]
+        # Greatest common divisor of the fractions, i.e. gcd of the numerators over lcm of the denominators
+        denominator = reduce(lambda a, b: a * b // gcd(a, b), (mark.denominator for mark in marks), 1)
+        numerator = reduce(gcd, (int(mark * denominator) for mark in marks), 0)
+
+        self.granularity = numerator / denominator if numerator else 1.0
+        self.minimum = -sum(negative_marks)
+        self.size = round((sum(positive_marks) - self.minimum) / self.granularity) + 1
+
+    def get_bucket(self, score: float) -> int:
+        return min(max(round((score - self.minimum) / self.granularity), 0), self.size - 1)
+
+    def get_score(self, bucket: int) -> float:
+        """Score of the bucket, rounded so that the same score is persisted the same way"""
+        return round(self.minimum + bucket * self.granularity, 6)
+
+
+class ScoreDistribution:
+    __slots__ = ("scale", "tree", "total")
+
+    def __init__(self, scale: ScoreScale):
+        self.scale = scale
+        self.tree = FenwickTree(scale.size)
+        self.total = 0
+
+    def add(self, score: float, count: int = 1):
+        self.tree.add(self.scale.get_bucket(score), count)
+        self.total += count
+
+    def get_rank(self, score: float) -> Tuple[int, float]:
+        """
+        Rank and percentile of the score
+        :param score: Score of the candidate
+        :return: 1 + number of higher scores, percentage of the scores that are the same or lower
+        """
+        at_most = self.tree.prefix_sum(self.scale.get_bucket(score))
+        if not self.total:
+            return 1, 100.0
+        return self.total - at_most + 1, round(100 * at_most / self.total, 4)
+
+
+class PaperRanking:
+    """Score distributions of a paper, for the whole paper and every section"""
+
+    def __init__(self, layout: PaperLayout, answer_key: AnswerKey):
+        self.distributions: Dict[int, ScoreDistribution] = {
+            PAPER_SCOPE: ScoreDistribution(ScoreScale(answer_key.positive_marks, answer_key.negative_marks))
+        }
+        for section_idx in sorted(set(layout.question_sections)):
+            question_idxs = [idx for idx, section in enumerate(layout.question_sections) if section == section_idx]
+            self.distributions[section_idx] = ScoreDistribution(
+                ScoreScale(
+                    (answer_key.positive_marks[idx] for idx in question_idxs),
+                    (answer_key.negative_marks[idx] for idx in question_idxs),
+                )
+            )
+
+    @property
+    def candidates(self) -> int:
+        return self.distributions[PAPER_SCOPE].total
+
+    def add(self, score: float, section_scores: List[float], count: int = 1):
+        for section_idx, section_score in self.get_scores(score, section_scores):
+            self.distributions[section_idx].add(section_score, count)
+
+    def get_ranks(self, score: float, section_scores: List[float]) -> List[Tuple[int, float]]:
+        """(rank, percentile) of the score of the paper followed by the score of every section"""
+        return [
+            self.distributions[section_idx].get_rank(section_score)
+            for section_idx, section_score in self.get_scores(score, section_scores)
+        ]
+
+    @staticmethod
+    def get_scores(score: float, section_scores: List[float]) -> List[Tuple[int, float]]:
+        """Score of every distribution, as (section index, score)"""
+        return [(PAPER_SCOPE, score), *enumerate(section_scores)]
+
+
+class RankingService(BaseService[RankBucketsModel, RankBucketsCreateDatabaseSchema, RankBucketsUpdateDatabaseSchema]):
+    def __init__(self, **kwargs):
+        super().__init__(model=RankBucketsModel, **kwargs)
+
+    async def get_ranking(self, paper_id: UUID) -> PaperRanking:
+        """
+        Get the score distributions of a paper, loaded from the database and cached for RANKING_CACHE_TTL seconds
+        :param paper_id: UUID for the paper
+        :return: Ranking of the paper
+        """
+        ranking = rankings_cache.get(paper_id)
+        if ranking is not None:
+            return ranking
+
+        papers_service = self.get_service(PapersService)
+        ranking = PaperRanking(await papers_service.get_layout(paper_id), await papers_service.get_answer_key(paper_id))
+        result = await self.session.execute(
+            select(self.model.section_index, self.model.score, self.model.count).where(self.model.paper_id == paper_id)
+        )
+        for section_index, score, count in result.all():
+            distribution = ranking.distributions.get(section_index)
+            if distribution is not None:
+                distribution.add(score, count)
+
+        rankings_cache.set(paper_id, ranking, tags=[paper_id])
+        return ranking
+
+    async def add_score(self, paper_id: UUID, attempt_score: AttemptScoreSchema):
+        """
+        Add the score of a submitted attempt to the distributions of the paper, in the database and the cache
+        :param paper_id: UUID for the paper
+        :param attempt_score: Score of the attempt
+        """
+        ranking = await self.get_ranking(paper_id)
+        rows = [
+            {
+                "uuid": uuid4(),
+                "paper_id": paper_id,
+                "section_index": section_idx,
+                "score": ranking.distributions[section_idx].scale.get_score(
+                    ranking.distributions[section_idx].scale.get_bucket(score)
+                ),
+                "count": 1,
+            }
+            for section_idx, score in ranking.get_scores(attempt_score.score, attempt_score.section_scores)
+        ]
+        stmt = insert(self.model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_paper_section_score",
+            set_={"count": self.model.count + stmt.excluded.count, "updated_at": func.now()},
+        )
+        await self.session.execute(stmt)
+        ranking.add(attempt_score.score, attempt_score.section_scores)
@@ -0,0 +1,70 @@
+from typing import Dict, List
+from uuid import UUID, uuid4
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.models.attempts import AttemptsModel, ResponsesModel
+from app.core.schemas.attempts import ResponsesCreateDatabaseSchema, ResponsesUpdateDatabaseSchema
+from app.core.services.base import BaseService
+
+# Rows per upsert statement, every row has 9 parameters and asyncpg allows 32767 parameters in a statement
+UPSERT_BATCH_SIZE = 2000
+
+# Columns updated when the response of a question is saved again
+UPSERT_COLUMNS = ("selected_mask", "value", "is_marked_for_review", "time_spent", "sequence")
+
+
+class ResponsesService(BaseService[ResponsesModel, ResponsesCreateDatabaseSchema, ResponsesUpdateDatabaseSchema]):
+    def __init__(self, **kwargs):
+        super().__init__(model=ResponsesModel, **kwargs)
+
+    async def upsert_bulk(self, responses: List[Dict]) -> int:
+        """
+        Insert the responses, or update the existing response of the question in the attempt, with multi-row upserts.
+        A response is not updated if the stored one has a higher sequence, i.e. it was saved later by the client.
+        Responses of the submitted attempts are rejected, as the attempts are graded already. Audit logs are not written
+        for the responses, they are written at every autosave.
+
+        :param responses: Responses in the format of ResponsesCreateDatabaseSchema, unique by (attempt, question)
+        :return: Number of responses written, i.e. of the attempts not submitted
+        """
+        # Attempts are locked until the responses are committed, so a submission (locking the attempt for update)
+        # either waits for them and grades them, or is committed first and they are rejected
+        result = await self.session.scalars(
+            select(AttemptsModel.uuid)
+            .where(
+                AttemptsModel.uuid.in_(list({response["attempt_id"] for response in responses})),
+                AttemptsModel.submitted_at.is_(None),
+            )
+            .order_by(AttemptsModel.uuid)
+            .with_for_update(read=True)
+        )
+        open_attempt_ids = set(result.all())
+        rejected_count = len(responses)
+        responses = [response for response in responses if response["attempt_id"] in open_attempt_ids]
+        rejected_count -= len(responses)
+        if rejected_count:
+            logger.warning(f"Rejected {rejected_count} responses of submitted attempts")
+
+        for idx in range(0, len(responses), UPSERT_BATCH_SIZE):
+            stmt = insert(self.model).values(
+                [{"uuid": uuid4(), **response} for response in responses[idx : idx + UPSERT_BATCH_SIZE]]
+            )
+            stmt = stmt.on_conflict_do_update(
+                constraint="unique_attempt_question",
+                set_={
+                    **{column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+                    "updated_at": func.now(),
+                },
+                where=self.model.sequence < stmt.excluded.sequence,
+            )
+            await self.session.execute(stmt)
+
+        logger.debug(f"Upserted {len(responses)} responses")
+        return len(responses)
+
+    async def get_responses(self, attempt_id: UUID) -> List[ResponsesModel]:
+        """Get the saved responses of an attempt"""
+        return await self.filter([self.model.attempt_id == attempt_id])
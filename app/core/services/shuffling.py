@@ -0,0 +1,127 @@
+"""
+Per-candidate shuffling of questions and options. Nothing is stored per candidate, the order is derived from the
+candidate seed every time, so the same candidate always sees the same order.
+"""
+import hashlib
+import random
+from typing import Dict, List, TypeVar
+from uuid import UUID
+
+from app.schemas import (
+    CBTPermutationSchema,
+    CBTResponseSchema,
+    CBTSectionsResponseSchema,
+    CBTSkeletonSchema,
+    CBTSubSectionsResponseSchema,
+)
+
+T = TypeVar("T")
+
+
+class CandidateShuffler:
+    """
+    Applies a seeded permutation to the questions of every sub-section and to the options of every question.
+    A permutation is a list where the value at index `i` is the original position of the item shown at position `i`.
+    """
+
+    def __init__(self, candidate_seed: str):
+        self.candidate_seed = candidate_seed
+
+    def get_permutation(self, size: int, key: UUID) -> List[int]:
+        """
+        Deterministic permutation for the candidate seed and the key (sub-section or question uuid)
+        :param size: Number of items to be permuted
+        :param key: UUID of the entity whose items are permuted
+        :return: Permutation of range(size)
+        """
+        digest = hashlib.blake2b(f"{self.candidate_seed}:{key}".encode(), digest_size=8).digest()
+        permutation = list(range(size))
+        random.Random(int.from_bytes(digest, "big")).shuffle(permutation)
+        return permutation
+
+    @staticmethod
+    def apply(items: List[T], permutation: List[int]) -> List[T]:
+        """Reorder the items as per the permutation"""
+        return [items[idx] for idx in permutation]
+
+    @staticmethod
+    def invert(permutation: List[int]) -> List[int]:
+        """Inverse of a permutation, i.e. for every original position, the position it is shown at"""
+        inverse = [0] * len(permutation)
+        for position, original_position in enumerate(permutation):
+            inverse[original_position] = position
+        return inverse
+
+    def shuffle_sub_section(self, sub_section: CBTSubSectionsResponseSchema) -> CBTSubSectionsResponseSchema:
+        """Shuffle the questions of the sub-section and the options of every question, without changing the input"""
+        questions = [
+            question.copy(
+                update={
+                    "options": self.apply(question.options, self.get_permutation(len(question.options), question.uuid))
+                }
+            )
+            if question.options
+            else question
+            for question in sub_section.questions
+        ]
+        return sub_section.copy(
+            update={"questions": self.apply(questions, self.get_permutation(len(questions), sub_section.uuid))}
+        )
+
+    def shuffle_section(self, section: CBTSectionsResponseSchema) -> CBTSectionsResponseSchema:
+        """Shuffle every sub-section of the section, without changing the input"""
+        return section.copy(
+            update={"sub_sections": [self.shuffle_sub_section(sub_section) for sub_section in section.sub_sections]}
+        )
+
+    def shuffle_paper(self, paper: CBTResponseSchema) -> CBTResponseSchema:
+        """Shuffle every section of the paper, without changing the input. Sections keep their order."""
+        return paper.copy(update={"sections": [self.shuffle_section(section) for section in paper.sections]})
+
+    def shuffle_skeleton(self, skeleton: CBTSkeletonSchema) -> CBTSkeletonSchema:
+        """Shuffle the question uuids of every sub-section in the same order as shuffle_paper, without changing input"""
+        return skeleton.copy(
+            update={
+                "sections": [
+                    section.copy(
+                        update={
+                            "sub_sections": [
+                                sub_section.copy(
+                                    update={
+                                        "questions": self.apply(
+                                            sub_section.questions,
+                                            self.get_permutation(len(sub_section.questions), sub_section.uuid),
+                                        )
+                                    }
+                                )
+                                for sub_section in section.sub_sections
+                            ]
+                        }
+                    )
+                    for section in skeleton.sections
+                ]
+            }
+        )
+
+    def get_paper_permutation(self, paper: CBTResponseSchema) -> CBTPermutationSchema:
+        """
+        Permutations applied to the paper along with their inverse, used to un-shuffle the responses of the candidate
+        :param paper: Un-shuffled paper
+        :return: Permutations of questions (per sub-section) and options (per question)
+        """
+        questions: Dict[UUID, List[int]] = {}
+        options: Dict[UUID, List[int]] = {}
+        for section in paper.sections:
+            for sub_section in section.sub_sections:
+                questions[sub_section.uuid] = self.get_permutation(len(sub_section.questions), sub_section.uuid)
+                for question in sub_section.questions:
+                    if question.options:
+                        options[question.uuid] = self.get_permutation(len(question.options), question.uuid)
+
+        return CBTPermutationSchema(
+            candidate_seed=self.candidate_seed,
+            questions=questions,
+            options=options,
+            inverse_questions={key: self.invert(value) for key, value in questions.items()},
+            inverse_options={key: self.invert(value) for key, value in options.items()},
+        )
@@ -0,0 +1,335 @@
+"""
+Item statistics of the questions, computed from the response sheets of the graded attempts.
+
+Attempts are analyzed in batches, every attempt once (marked with `analyzed_at`), so a run only reads the attempts
+submitted since the previous run. The sheets of a paper are aggregated column by column, i.e. question by question,
+into sufficient statistics that are added to the stored ones:
+- p-value: fraction of the attempts that answered the question correctly
+- discrimination: point-biserial correlation of the correctness with the normalized score of the attempt
+- option counts: number of selections of every option, the distractors being the incorrect options
+Difficulty of a question is recalibrated from its p-value, on the scale of the difficulty buckets of the question bank.
+"""
+import asyncio
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from loguru import logger
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import configuration
+from app.core.db.session import async_session_maker
+from app.core.invalidation import invalidation_bus
+from app.core.models.attempts import AttemptsModel
+from app.core.models.questions import QuestionsModel, QuestionStatisticsModel
+from app.core.schemas.questions import QuestionStatisticsCreateUpdateSchema
+from app.core.services.base import BaseService
+from app.core.services.exams import PapersService
+from app.core.services.packing import AnswerKey, PaperLayout, ResponseSheet
+from app.core.services.question_bank import DIFFICULTY_BUCKET_SIZE
+from app.enums import AttemptStatusEnum
+from app.logger import logger as audit_logger
+from app.schemas import ItemStatisticsRunSchema
+from app.utils.exceptions.common_exceptions import UUIDNotFoundException
+
+# Key of the advisory lock held by a batch, so that concurrent runs do not add the same attempts twice
+ITEM_STATISTICS_LOCK_KEY = 7_340_040
+
+# Difficulty of a question that nobody answers correctly, p-value 0.5 maps to the default difficulty of 500
+MAX_DIFFICULTY = 10 * DIFFICULTY_BUCKET_SIZE
+
+# Rows per upsert statement, every row has 11 parameters and asyncpg allows 32767 parameters in a statement
+UPSERT_BATCH_SIZE = 2000
+
+STATISTICS_COLUMNS = (
+    "responses",
+    "attempted",
+    "correct",
+    "score_sum",
+    "score_square_sum",
+    "correct_score_sum",
+    "option_counts",
+    "p_value",
+    "discrimination",
+)
+
+
+class ItemStatistics:
+    """Sufficient statistics of a question, which can be added to those of other attempts"""
+
+    __slots__ = (
+        "responses",
+        "attempted",
+        "correct",
+        "score_sum",
+        "score_square_sum",
+        "correct_score_sum",
+        "option_counts",
+    )
+
+    def __init__(
+        self,
+        responses: int = 0,
+        attempted: int = 0,
+        correct: int = 0,
+        score_sum: float = 0.0,
+        score_square_sum: float = 0.0,
+        correct_score_sum: float = 0.0,
+        option_counts: Iterable[int] = (),
+    ):
+        self.responses = responses
+        self.attempted = attempted
+        self.correct = correct
+        self.score_sum = score_sum
+        self.score_square_sum = score_square_sum
+        self.correct_score_sum = correct_score_sum
+        self.option_counts = list(option_counts)
+
+    @classmethod
+    def from_instance(cls, instance: QuestionStatisticsModel) -> "ItemStatistics":
+        return cls(*(getattr(instance, column) for column in cls.__slots__))
+
+    def merge(self, other: "ItemStatistics"):
+        self.responses += other.responses
+        self.attempted += other.attempted
+        self.correct += other.correct
+        self.score_sum += other.score_sum
+        self.score_square_sum += other.score_square_sum
+        self.correct_score_sum += other.correct_score_sum
+        # Options added to the question after the previous run extend the counts
+        if len(other.option_counts) > len(self.option_counts):
+            self.option_counts.extend([0] * (len(other.option_counts) - len(self.option_counts)))
+        for idx, count in enumerate(other.option_counts):
+            self.option_counts[idx] += count
+
+    @property
+    def p_value(self) -> Optional[float]:
+        return self.correct / self.responses if self.responses else None
+
+    @property
+    def discrimination(self) -> Optional[float]:
+        """Point-biserial correlation, (M1 - M0) / s * sqrt(p * q), None if it is undefined"""
+        if not 0 < self.correct < self.responses:
+            return None
+        variance = self.score_square_sum / self.responses - (self.score_sum / self.responses) ** 2
+        if variance <= 1e-12:
+            return None
+
+        p_value = self.correct / self.responses
+        correct_mean = self.correct_score_sum / self.correct
+        incorrect_mean = (self.score_sum - self.correct_score_sum) / (self.responses - self.correct)
+        return (correct_mean - incorrect_mean) / math.sqrt(variance) * math.sqrt(p_value * (1 - p_value))
+
+    def get_difficulty(self) -> int:
+        """Difficulty calibrated from the p-value"""
+        return round(MAX_DIFFICULTY * (1 - self.p_value))
+
+    def to_schema(self, question_id: UUID) -> QuestionStatisticsCreateUpdateSchema:
+        return QuestionStatisticsCreateUpdateSchema(
+            question_id=question_id,
+            **{column: getattr(self, column) for column in self.__slots__},
+            p_value=self.p_value,
+            discrimination=self.discrimination,
+        )
+
+
+def aggregate_sheets(
+    layout: PaperLayout, answer_key: AnswerKey, attempts: List[Tuple[float, ResponseSheet]]
+) -> Dict[UUID, ItemStatistics]:
+    """
+    Aggregate the response sheets of a paper into the item statistics of its questions
+    :param layout: Layout of the paper
+    :param answer_key: Answer key of the paper
+    :param attempts: Score and response sheet of the attempts, packed with the layout
+    :return: Question uuid -> statistics of the attempts
+    """
+    max_score = sum(answer_key.positive_marks)
+    scores = [score / max_score if max_score else 0.0 for score, _ in attempts]
+    sheets = [sheet.answers for _, sheet in attempts]
+    score_sum = math.fsum(scores)
+    score_square_sum = math.fsum(score * score for score in scores)
+
+    statistics = {}
+    for idx, question_id in enumerate(layout.question_ids):
+        lower, upper = answer_key.lower[idx], answer_key.upper[idx]
+        is_nat = not math.isnan(upper)
+        option_count = len(layout.option_bits[question_id])
+        item = ItemStatistics(
+            responses=len(attempts),
+            score_sum=score_sum,
+            score_square_sum=score_square_sum,
+            option_counts=[0] * (0 if is_nat else option_count),
+        )
+
+        for answers, score in zip(sheets, scores):
+            answer = answers[idx]
+            if math.isnan(answer):
+                continue
+
+            item.attempted += 1
+            if is_nat:
+                is_correct = lower <= answer <= upper
+            else:
+                mask = int(answer)
+                is_correct = mask == int(lower)
+                for bit in range(option_count):
+                    if mask >> bit & 1:
+                        item.option_counts[bit] += 1
+
+            if is_correct:
+                item.correct += 1
+                item.correct_score_sum += score
+
+        statistics[question_id] = item
+    return statistics
+
+
+class ItemStatisticsService(
+    BaseService[QuestionStatisticsModel, QuestionStatisticsCreateUpdateSchema, QuestionStatisticsCreateUpdateSchema]
+):
+    def __init__(self, **kwargs):
+        super().__init__(model=QuestionStatisticsModel, **kwargs)
+
+    async def get_statistics(self, question_id: UUID) -> QuestionStatisticsModel:
+        """Get the item statistics of a question"""
+        instances = await self.filter([self.model.question_id == question_id])
+        if not instances:
+            raise UUIDNotFoundException(model=self.model, uuid=question_id)
+        return instances[0]
+
+    async def analyze_batch(self, batch_size: int) -> ItemStatisticsRunSchema:
+        """
+        Add a batch of the graded attempts, which are not analyzed yet, to the item statistics and recalibrate the
+        difficulty of their questions
+        :param batch_size: Maximum number of attempts in the batch
+        :return: Number of attempts analyzed, questions updated and questions recalibrated
+        """
+        await self.session.execute(select(func.pg_advisory_xact_lock(ITEM_STATISTICS_LOCK_KEY)))
+        result = await self.session.execute(
+            select(AttemptsModel.uuid, AttemptsModel.paper_id, AttemptsModel.score, AttemptsModel.response_sheet)
+            .where(AttemptsModel.status == AttemptStatusEnum.SUBMITTED, AttemptsModel.analyzed_at.is_(None))
+            .order_by(AttemptsModel.paper_id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return ItemStatisticsRunSchema()
+
+        papers: Dict[UUID, List[Tuple[float, ResponseSheet]]] = {}
+        for _, paper_id, score, response_sheet in rows:
+            if response_sheet is not None:
+                papers.setdefault(paper_id, []).append((score, ResponseSheet.from_bytes(response_sheet)))
+
+        statistics: Dict[UUID, ItemStatistics] = {}
+        papers_service = self.get_service(PapersService)
+        for paper_id, attempts in papers.items():
+            try:
+                layout = await papers_service.get_layout(paper_id)
+                answer_key = await papers_service.get_answer_key(paper_id)
+            except UUIDNotFoundException:
+                logger.warning(f"Paper {paper_id} was deleted, skipping its {len(attempts)} attempts")
+                continue
+
+            # Sheets packed before the questions of the paper were changed do not match the layout
+            matching_attempts = [(score, sheet) for score, sheet in attempts if len(sheet.answers) == len(layout)]
+            if len(matching_attempts) < len(attempts):
+                logger.warning(f"Skipping {len(attempts) - len(matching_attempts)} outdated sheets of paper {paper_id}")
+            if not matching_attempts:
+                continue
+
+            for question_id, item in aggregate_sheets(layout, answer_key, matching_attempts).items():
+                if question_id in statistics:
+                    statistics[question_id].merge(item)
+                else:
+                    statistics[question_id] = item
+
+        # Attempts are marked in the same transaction, so that they are added to the statistics exactly once
+        await self.session.execute(
+            update(AttemptsModel)
+            .where(AttemptsModel.uuid.in_([row[0] for row in rows]))
+            .values(analyzed_at=datetime.utcnow())
+        )
+        recalibrated = await self.save(statistics)
+        return ItemStatisticsRunSchema(attempts=len(rows), questions=len(statistics), recalibrated=recalibrated)
+
+    async def save(self, statistics: Dict[UUID, ItemStatistics]) -> int:
+        """
+        Add the statistics to the stored ones and recalibrate the difficulty of the questions having enough responses
+        :param statistics: Question uuid -> statistics of the new attempts
+        :return: Number of questions whose difficulty was changed
+        """
+        question_ids = list(statistics)
+        for instance in await self.filter([self.model.question_id.in_(question_ids)]):
+            stored_item = ItemStatistics.from_instance(instance)
+            stored_item.merge(statistics[instance.question_id])
+            statistics[instance.question_id] = stored_item
+
+        rows = [statistics[question_id].to_schema(question_id).dict() for question_id in question_ids]
+        for idx in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = insert(self.model).values([{"uuid": uuid4(), **row} for row in rows[idx : idx + UPSERT_BATCH_SIZE]])
+            stmt = stmt.on_conflict_do_update(
+                constraint="unique_question_statistics",
+                set_={**{column: stmt.excluded[column] for column in STATISTICS_COLUMNS}, "updated_at": func.now()},
+            )
+            await self.session.execute(stmt)
+
+        # Calibrated difficulties are written with a bulk update by primary key, only for the changed questions
+        result = await self.session.execute(
+            select(QuestionsModel.uuid, QuestionsModel.difficulty).where(QuestionsModel.uuid.in_(question_ids))
+        )
+        difficulties = []
+        for question_id, difficulty in result.all():
+            item = statistics[question_id]
+            if item.responses < configuration.ITEM_STATISTICS_MIN_RESPONSES:
+                continue
+            calibrated_difficulty = item.get_difficulty()
+            if calibrated_difficulty != difficulty:
+                difficulties.append({"uuid": question_id, "difficulty": calibrated_difficulty})
+                audit_logger.info(
+                    f"Recalibrated difficulty of {QuestionsModel.__tablename__} record with uuid: {question_id}",
+                    previous_state={"difficulty": difficulty},
+                    current_state={"difficulty": calibrated_difficulty},
+                    reference_uuid=question_id,
+                    table_name=QuestionsModel.__tablename__,
+                    action="update",
+                )
+
+        if difficulties:
+            await self.session.execute(update(QuestionsModel), difficulties)
+            # Difficulty buckets of the questions changed
+            invalidation_bus.invalidate(self.session, QuestionsModel.__tablename__)
+        return len(difficulties)
+
+
+async def refresh_item_statistics(
+    batch_size: int = configuration.ITEM_STATISTICS_BATCH_SIZE,
+) -> ItemStatisticsRunSchema:
+    """
+    Add the attempts graded since the previous run to the item statistics, one transaction per batch
+    :param batch_size: Number of attempts analyzed in a transaction
+    :return: Totals of the run
+    """
+    run = ItemStatisticsRunSchema()
+    while True:
+        async with async_session_maker() as session:
+            async with session.begin():
+                batch = await ItemStatisticsService(session=session).analyze_batch(batch_size)
+
+        run.attempts += batch.attempts
+        run.questions += batch.questions
+        run.recalibrated += batch.recalibrated
+        if batch.attempts < batch_size:
+            break
+
+    logger.info(
+        f"Item statistics refreshed with {run.attempts} attempts, {run.questions} question updates and "
+        f"{run.recalibrated} recalibrated difficulties"
+    )
+    return run
+
+
+if __name__ == "__main__":
+    # Run as a batch job, e.g. from cron: `python -m app.core.services.statistics`
+    asyncio.run(refresh_item_statistics())
@@ -0,0 +1,245 @@
+"""
+Server-side timers of the attempts.
+
+Every worker keeps the timers of the attempts it has served in a min-heap, having one entry per attempt for its next
+event, i.e. the end of the open section (in case of sectional timing) or the deadline of the attempt. Scheduling and
+expiring a timer is O(log n), so a single background task handles 100k+ attempts. Timers are derived from the start and
+deadline of the attempt along with the section times of the paper, so they are recovered from the database at startup.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from loguru import logger
+
+from app.config import configuration
+from app.core.metrics import attempt_timer_events_total, attempt_timers_active
+from app.schemas import CBTSkeletonSchema
+
+# Event of a heap entry, the index of the section to be locked or the submission of the attempt
+SUBMIT = -1
+
+
+def to_timestamp(value: datetime) -> float:
+    """Unix timestamp of a naive UTC datetime, as stored in the database"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def to_datetime(value: float) -> datetime:
+    """Naive UTC datetime of a unix timestamp"""
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+
+def get_section_times(skeleton: CBTSkeletonSchema) -> Optional[List[int]]:
+    """Time (in minutes) of every section of the paper, None if the sections are not timed separately"""
+    if not skeleton.settings.is_sectional_timing:
+        return None
+    return [section.section_time for section in skeleton.sections]
+
+
+class AttemptTimer:
+    """
+    Deadlines of an attempt as unix timestamps. With sectional timing, section `i` is open from the end of section
+    `i - 1` (or the start of the attempt) until `section_ends[i]`, and it is locked afterward.
+    """
+
+    __slots__ = ("attempt_id", "paper_id", "started_at", "deadline", "section_ends", "locked_sections")
+
+    def __init__(
+        self,
+        attempt_id: UUID,
+        paper_id: UUID,
+        started_at: datetime,
+        deadline_at: datetime,
+        section_times: Optional[List[int]] = None,
+    ):
+        self.attempt_id = attempt_id
+        self.paper_id = paper_id
+        self.started_at = to_timestamp(started_at)
+        self.deadline = to_timestamp(deadline_at)
+        self.section_ends: Tuple[float, ...] = tuple(
+            min(self.started_at + 60 * elapsed_time, self.deadline)
+            for elapsed_time in itertools.accumulate(section_times or [])
+        )
+        # Number of sections locked by the scheduler
+        self.locked_sections = 0
+
+    def is_expired(self, now: float) -> bool:
+        return now > self.deadline + configuration.ATTEMPT_DEADLINE_GRACE
+
+    def is_section_open(self, section_idx: int, now: float) -> bool:
+        """Whether the responses of the section are accepted"""
+        if not self.section_ends:
+            return True
+        if section_idx < self.locked_sections:
+            return False
+
+        section_start = self.section_ends[section_idx - 1] if section_idx else self.started_at
+        return section_start <= now <= self.section_ends[section_idx] + configuration.ATTEMPT_DEADLINE_GRACE
+
+    def get_open_section(self, now: float) -> Optional[int]:
+        """Index of the open section, None if the sections are not timed separately or the time is over"""
+        for section_idx, section_end in enumerate(self.section_ends):
+            if now < section_end:
+                return section_idx
+        return None
+
+
+class AttemptTimerScheduler:
+    """
+    Min-heap of (time, sequence, timer, event) having one entry per attempt. Cancelled timers are not removed from the
+    heap, their entries are skipped when they expire.
+    """
+
+    def __init__(self, submit_delay: float, retry_delay: float, batch_size: int):
+        # Attempts are submitted a while after the deadline, so that the autosaves accepted in the grace period and
+        # buffered by the other workers are written before the submission
+        self.submit_delay = submit_delay
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+
+        self._timers: Dict[UUID, AttemptTimer] = {}
+        self._heap: List[Tuple[float, int, AttemptTimer, int]] = []
+        self._sequence = itertools.count()
+
+        # Created on first use, so that it belongs to the event loop of the app
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def wakeup(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def get(self, attempt_id: UUID) -> Optional[AttemptTimer]:
+        return self._timers.get(attempt_id)
+
+    def schedule(self, timer: AttemptTimer) -> AttemptTimer:
+        """
+        Track the deadlines of an attempt, an attempt is tracked once
+        :param timer: Timer of the attempt
+        :return: Timer that is tracked for the attempt
+        """
+        if timer.attempt_id in self._timers:
+            return self._timers[timer.attempt_id]
+
+        # Sections that are already over are locked right away, say for the attempts recovered at startup
+        now = time.time()
+        while timer.locked_sections < len(timer.section_ends) and self._is_locked(timer, now):
+            timer.locked_sections += 1
+
+        self._timers[timer.attempt_id] = timer
+        attempt_timers_active.set(value=len(self._timers))
+        self._push_next_event(timer)
+        return timer
+
+    def cancel(self, attempt_id: UUID):
+        """Stop tracking the attempt, say once it is submitted"""
+        if self._timers.pop(attempt_id, None) is not None:
+            attempt_timers_active.set(value=len(self._timers))
+
+    @staticmethod
+    def _is_locked(timer: AttemptTimer, now: float) -> bool:
+        section_end = timer.section_ends[timer.locked_sections]
+        return section_end < timer.deadline and now > section_end + configuration.ATTEMPT_DEADLINE_GRACE
+
+    def _push(self, when: float, timer: AttemptTimer, event: int):
+        # The background task sleeps until the earliest entry, so it is woken up for an earlier entry
+        if not self._heap or when < self._heap[0][0]:
+            self.wakeup.set()
+        heapq.heappush(self._heap, (when, next(self._sequence), timer, event))
+
+    def _push_next_event(self, timer: AttemptTimer):
+        """Push the lock of the open section, or the submission if the open section ends with the attempt"""
+        if timer.locked_sections < len(timer.section_ends):
+            section_end = timer.section_ends[timer.locked_sections]
+            if section_end < timer.deadline:
+                self._push(section_end + configuration.ATTEMPT_DEADLINE_GRACE, timer, timer.locked_sections)
+                return
+        self._push(timer.deadline + self.submit_delay, timer, SUBMIT)
+
+    def pop_expired(self, now: float) -> List[AttemptTimer]:
+        """
+        Expire the entries up to now, sections are locked and the next event of the attempt is pushed
+        :param now: Unix timestamp
+        :return: Timers of the attempts to be submitted
+        """
+        expired_timers = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, timer, event = heapq.heappop(self._heap)
+            if self._timers.get(timer.attempt_id) is not timer:
+                continue
+
+            if event == SUBMIT:
+                expired_timers.append(timer)
+            else:
+                timer.locked_sections = event + 1
+                attempt_timer_events_total.inc("section_locked")
+                self._push_next_event(timer)
+        return expired_timers
+
+    async def submit(self, timers: List[AttemptTimer], handler: Callable[[List[UUID]], Awaitable[int]]):
+        """Submit the attempts in batches, the attempts of a failed batch are retried after the retry delay"""
+        for idx in range(0, len(timers), self.batch_size):
+            batch = timers[idx : idx + self.batch_size]
+            try:
+                submitted = await handler([timer.attempt_id for timer in batch])
+            except Exception:
+                logger.exception(f"Failed to submit {len(batch)} attempts, will retry in {self.retry_delay}s")
+                attempt_timer_events_total.inc("submit_failed", amount=len(batch))
+                for timer in batch:
+                    self._push(time.time() + self.retry_delay, timer, SUBMIT)
+                continue
+
+            # Attempts that were not submitted are already submitted, or being submitted by another worker
+            logger.info(f"Submitted {submitted} of {len(batch)} attempts that ran out of time")
+            attempt_timer_events_total.inc("submitted", amount=submitted)
+            for timer in batch:
+                self.cancel(timer.attempt_id)
+
+    async def _run(self, handler: Callable[[List[UUID]], Awaitable[int]]):
+        while True:
+            self.wakeup.clear()
+            expired_timers = self.pop_expired(time.time())
+            if expired_timers:
+                await self.submit(expired_timers, handler)
+
+            timeout = max(self._heap[0][0] - time.time(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, handler: Callable[[List[UUID]], Awaitable[int]]):
+        """
+        Start expiring the timers in the background, called at the startup of the app
+        :param handler: Coroutine function submitting the attempts, returns the number of attempts submitted
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(handler))
+            logger.info(f"Attempt timers started with {len(self._timers)} attempts")
+
+    async def stop(self):
+        """Stop expiring the timers, attempts are recovered from the database at the next startup"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+attempt_timers = AttemptTimerScheduler(
+    submit_delay=configuration.ATTEMPT_DEADLINE_GRACE + 2 * configuration.AUTOSAVE_FLUSH_INTERVAL,
+    retry_delay=configuration.ATTEMPT_SUBMIT_RETRY_DELAY,
+    batch_size=configuration.ATTEMPT_SUBMIT_BATCH_SIZE,
+)
@@ -0,0 +1,86 @@
+"""
+Warm-up of the paper cache.
+At the startup of a worker, the content of the published papers of the active exams (CBT payload with its serialized
+and compressed bodies, skeleton and answer key) is built before the worker reports ready, so a worker joining the pool
+mid-exam serves its first requests from the cache. A paper published later is warmed by every worker, as the publish
+is notified to all of them.
+"""
+import asyncio
+from typing import List
+from uuid import UUID
+
+from loguru import logger
+
+from app.config import configuration
+from app.core.cache import papers_cache
+from app.core.db.notifications import PAPER_PUBLISHED_CHANNEL, notification_listener
+from app.core.db.session import async_session_maker
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.invalidation import invalidation_bus
+from app.core.models.exams import PapersModel
+from app.core.services.exams import PapersService
+from app.utils.compression import BROTLI, GZIP
+from app.utils.responses import build_cached_response
+
+# Cache entries of a warmed paper: cbt, skeleton, solution, layout and answer_key
+ENTRIES_PER_PAPER = 5
+
+# Bodies of the CBT payload built ahead, the identity body is built along with them
+WARMUP_ENCODINGS = (GZIP, BROTLI)
+
+
+async def warm_paper(paper_id: UUID):
+    """
+    Build the cached content of a paper, each paper is built on a session of its own
+    :param paper_id: UUID of the paper
+    """
+    async with async_session_maker() as session:
+        papers_service = UnitOfWork.of(session).get_service(PapersService)
+        cbt_entry = await papers_service.get_cbt_entry(paper_id, decode=False)
+        await papers_service.get_skeleton_entry(paper_id)
+        await papers_service.get_answer_key(paper_id)
+
+    for encoding in WARMUP_ENCODINGS:
+        await build_cached_response(cbt_entry, encoding)
+
+
+async def warm_papers(paper_ids: List[UUID], concurrency: int) -> int:
+    """
+    Warm the papers concurrently, a paper that fails is logged and left to be built by its first request
+    :param paper_ids: UUIDs of the papers
+    :param concurrency: Number of papers built at a time, each of them holds a connection of the pool
+    :return: Number of papers warmed
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(paper_id: UUID) -> bool:
+        async with semaphore:
+            try:
+                await warm_paper(paper_id)
+                return True
+            except Exception:
+                logger.exception(f"Failed to warm the cache of paper {paper_id}")
+                return False
+
+    return sum(await asyncio.gather(*(warm(paper_id) for paper_id in paper_ids)))
+
+
+async def warm_up_papers_cache():
+    """Warm the published papers of the active exams, run by the lifespan as a startup stage having a timeout"""
+    # Papers beyond the size of the cache would evict the ones warmed before them
+    limit = max(papers_cache.max_size // ENTRIES_PER_PAPER, 1)
+    async with async_session_maker() as session:
+        paper_ids = await UnitOfWork.of(session).get_service(PapersService).get_published_ids(limit=limit)
+
+    warmed = await warm_papers(paper_ids, configuration.CACHE_WARMUP_CONCURRENCY)
+    logger.info(f"Warmed the cache of {warmed} of {len(paper_ids)} published papers")
+
+
+async def on_paper_published(payload: str):
+    """Warm a paper published by any worker, its content built while it was a draft is dropped first"""
+    paper_id = UUID(payload)
+    invalidation_bus.apply(PapersModel.__tablename__, [paper_id], origin="notification")
+    await warm_papers([paper_id], concurrency=1)
+
+
+notification_listener.subscribe(PAPER_PUBLISHED_CHANNEL, on_paper_published)
@@ -0,0 +1,336 @@
+"""
+On-disk store of the immutable payloads (say the serialized and compressed content of the published papers), shared by
+the worker processes of a host. Payloads are appended to a data file and located by an index, which is replaced
+atomically once the payloads are written, so readers never see a partial payload. Workers memory-map the data file and
+serve memoryviews over it, so a payload has a single copy in the page cache of the host whatever the number of workers.
+
+Layout of the directory:
+    data-<generation>.bin   Payloads of the generation, appended one after the other (8 byte aligned)
+    index.json              Generation, dead bytes and key -> variant -> (offset, length) in the data file
+    .lock                   Held by the writers, readers do not lock
+
+Payloads that are replaced or discarded are dead bytes of the data file, once they are more than a ratio of the file
+it is compacted: the live payloads are copied to the data file of the next generation, which is published with a new
+index. Readers keep serving from the mapping of the old file (it stays valid after the unlink) until they reload the
+index.
+"""
+import fcntl
+import mmap
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from loguru import logger
+
+from app.config import configuration
+from app.core.metrics import cache_requests_total
+
+INDEX_FILE_NAME = "index.json"
+LOCK_FILE_NAME = ".lock"
+
+# Payloads start at multiples of 8 bytes, so that arrays of float64 (say the answer keys) can be viewed in place
+ALIGNMENT = 8
+
+# key -> variant (say the content encoding) -> (offset, length) in the data file
+Entries = Dict[str, Dict[str, Tuple[int, int]]]
+
+
+class SnapshotIndex:
+    """Index of a generation of the store"""
+
+    __slots__ = ("generation", "dead", "size", "entries")
+
+    def __init__(self, generation: int = 0, dead: int = 0, size: int = 0, entries: Optional[Entries] = None):
+        self.generation = generation
+        self.dead = dead  # Bytes of the data file that are not referenced by the index
+        self.size = size  # Bytes of the data file referenced by the index, padding included
+        self.entries: Entries = entries or {}
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "SnapshotIndex":
+        index = orjson.loads(payload)
+        entries = {
+            key: {variant: (location[0], location[1]) for variant, location in variants.items()}
+            for key, variants in index["entries"].items()
+        }
+        return cls(index["generation"], index["dead"], index["size"], entries)
+
+    def to_bytes(self) -> bytes:
+        return orjson.dumps(
+            {"generation": self.generation, "dead": self.dead, "size": self.size, "entries": self.entries}
+        )
+
+    def remove(self, key: str) -> bool:
+        """Remove the key, its payloads become dead bytes"""
+        variants = self.entries.pop(key, None)
+        if variants is None:
+            return False
+        self.dead += sum(get_padded_length(length) for _, length in variants.values())
+        return True
+
+
+def get_padded_length(length: int) -> int:
+    return -(-length // ALIGNMENT) * ALIGNMENT
+
+
+class SnapshotStore:
+    """
+    Store of the payloads of immutable values, every key has one payload per variant (say identity, gzip and br).
+    Disabled (nothing is stored or found) if no location is configured, or it is empty.
+    """
+
+    def __init__(self, location: Optional[str], compaction_ratio: float, compaction_min_size: int):
+        self.location = location
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_size = compaction_min_size
+
+        self._index = SnapshotIndex()
+        self._index_stat: Optional[Tuple[int, int]] = None
+        # Mapping of the data file of the generation of the index
+        self._map: Optional[mmap.mmap] = None
+        self._map_generation: Optional[int] = None
+        # Payloads are written off the event loop, while the index is read on it
+        self._lock = threading.Lock()
+        # Thread discarding the keys for the event loop, created on first use
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.location)
+
+    def get_data_path(self, generation: int) -> str:
+        return os.path.join(self.location, f"data-{generation}.bin")
+
+    def get(self, key: str) -> Optional[Dict[str, memoryview]]:
+        """
+        Get the payloads of a key, without copying them
+        :param key: Key of the value
+        :return: Variant -> read-only view over the mapped data file, None if the key is not stored
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self._refresh()
+            try:
+                variants = self._index.entries.get(key)
+                payloads = self._get_views(variants) if variants is not None else None
+            except FileNotFoundError:
+                # Data file was removed by a compaction after the index was read, the new index refers to the new one
+                self._index_stat = None
+                self._refresh()
+                variants = self._index.entries.get(key)
+                payloads = self._get_views(variants) if variants is not None else None
+
+        cache_requests_total.inc("snapshots", "miss" if payloads is None else "hit")
+        return payloads
+
+    def put(self, key: str, payloads: Dict[str, bytes], replace: bool = True) -> Dict[str, memoryview]:
+        """
+        Append the payloads of a key and publish them, replacing the stored ones. Writes to the disk, so it is called
+        off the event loop.
+        :param key: Key of the value
+        :param payloads: Variant -> payload
+        :param replace: Whether the stored payloads are replaced, else they are kept (say the payloads of immutable values)
+        :return: Variant -> view over the mapped data file, to be served instead of the payloads, empty if the key was
+            discarded by another process meanwhile
+        """
+        with self._locked():
+            index = self._load_index()
+            if replace or key not in index.entries:
+                index.remove(key)
+                index.entries[key] = self._append(index, payloads)
+                self._publish(self._compact(index) if self._should_compact(index) else index)
+
+        with self._lock:
+            self._refresh()
+            variants = self._index.entries.get(key)
+            return self._get_views(variants) if variants is not None else {}
+
+    def discard(self, keys: Iterable[str]) -> int:
+        """
+        Remove the keys from the store, their payloads are removed from the disk by the next compaction
+        :param keys: Keys of the values
+        :return: Number of keys removed
+        """
+        if not self.enabled:
+            return 0
+
+        # Most of the keys are not stored (say the keys of draft papers), so the store is locked only if needed
+        keys = list(keys)
+        with self._lock:
+            self._refresh()
+            if not any(key in self._index.entries for key in keys):
+                return 0
+
+        with self._locked():
+            index = self._load_index()
+            removed = sum(index.remove(key) for key in keys)
+            if removed:
+                self._publish(self._compact(index) if self._should_compact(index) else index)
+        logger.info(f"Discarded {removed} keys from the snapshot store")
+        return removed
+
+    def discard_later(self, keys: Iterable[str]) -> Optional[Future]:
+        """
+        Discard the keys in the writer thread of the store, as a discard waits for the lock held by the writers of the
+        other processes and may compact the store, which would block the event loop
+        :param keys: Keys of the values
+        :return: Future of the number of keys removed, None if the store is disabled
+        """
+        if not self.enabled:
+            return None
+
+        if self._writer is None:
+            # Single thread, so the discards are applied in the order of the invalidations
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+        future = self._writer.submit(self.discard, list(keys))
+        future.add_done_callback(self._discard_done)
+        return future
+
+    @staticmethod
+    def _discard_done(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.opt(exception=future.exception()).error("Failed to discard keys from the snapshot store")
+
+    def close(self):
+        """Wait for the pending discards, called at the shutdown of the app"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+    def compact(self):
+        """Copy the live payloads to a data file of the next generation and remove the current one"""
+        with self._locked():
+            index = self._load_index()
+            if index.size + index.dead:
+                self._publish(self._compact(index))
+
+    def _append(self, index: SnapshotIndex, payloads: Dict[str, bytes]) -> Dict[str, Tuple[int, int]]:
+        """Append the payloads to the data file of the index, called with the lock held"""
+        variants = {}
+        with open(self.get_data_path(index.generation), "ab") as data_file:
+            # Bytes left by a writer that failed before publishing are skipped, as the next payload is aligned
+            offset = get_padded_length(data_file.tell())
+            data_file.write(b"\0" * (offset - data_file.tell()))
+            for variant, payload in payloads.items():
+                data_file.write(payload)
+                data_file.write(b"\0" * (get_padded_length(len(payload)) - len(payload)))
+                variants[variant] = (offset, len(payload))
+                offset += get_padded_length(len(payload))
+            data_file.flush()
+            os.fsync(data_file.fileno())
+
+        index.size += sum(get_padded_length(length) for _, length in variants.values())
+        return variants
+
+    def _should_compact(self, index: SnapshotIndex) -> bool:
+        total = index.size + index.dead
+        return total >= self.compaction_min_size and index.dead > self.compaction_ratio * total
+
+    def _compact(self, index: SnapshotIndex) -> SnapshotIndex:
+        """Write the live payloads of the index to the data file of the next generation, called with the lock held"""
+        compacted = SnapshotIndex(generation=index.generation + 1)
+        with open(self.get_data_path(index.generation), "rb") as old_file, open(
+            self.get_data_path(compacted.generation), "wb"
+        ) as data_file:
+            for key, variants in index.entries.items():
+                compacted.entries[key] = {}
+                for variant, (offset, length) in variants.items():
+                    old_file.seek(offset)
+                    data_file.write(old_file.read(length))
+                    data_file.write(b"\0" * (get_padded_length(length) - length))
+                    compacted.entries[key][variant] = (compacted.size, length)
+                    compacted.size += get_padded_length(length)
+            data_file.flush()
+            os.fsync(data_file.fileno())
+
+        logger.info(
+            f"Compacted the snapshot store to generation {compacted.generation}, "
+            f"{index.size + index.dead} bytes -> {compacted.size} bytes"
+        )
+        return compacted
+
+    def _publish(self, index: SnapshotIndex) -> SnapshotIndex:
+        """Replace the index atomically and remove the data files of the older generations, called with the lock held"""
+        index_path = os.path.join(self.location, INDEX_FILE_NAME)
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as index_file:
+            index_file.write(index.to_bytes())
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        os.replace(temp_path, index_path)
+
+        for file_name in os.listdir(self.location):
+            if file_name.startswith("data-") and file_name != os.path.basename(self.get_data_path(index.generation)):
+                # Mappings of the file stay valid, so the readers are not affected
+                os.unlink(os.path.join(self.location, file_name))
+        return index
+
+    def _load_index(self) -> SnapshotIndex:
+        """Read the published index"""
+        try:
+            with open(os.path.join(self.location, INDEX_FILE_NAME), "rb") as index_file:
+                return SnapshotIndex.from_bytes(index_file.read())
+        except FileNotFoundError:
+            return SnapshotIndex()
+
+    def _refresh(self):
+        """Load the index again if another process published one, called with the thread lock held"""
+        try:
+            stat = os.stat(os.path.join(self.location, INDEX_FILE_NAME))
+        except FileNotFoundError:
+            return
+
+        index_stat = (stat.st_ino, stat.st_mtime_ns)
+        if index_stat != self._index_stat:
+            self._index = self._load_index()
+            self._index_stat = index_stat
+
+    def _get_views(self, variants: Dict[str, Tuple[int, int]]) -> Dict[str, memoryview]:
+        """Views over the mapped data file, the file is mapped again if it grew or its generation changed"""
+        end = max(offset + length for offset, length in variants.values())
+        if self._map is None or self._map_generation != self._index.generation or len(self._map) < end:
+            with open(self.get_data_path(self._index.generation), "rb") as data_file:
+                # Previous mapping is closed once the views over it are released
+                self._map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_generation = self._index.generation
+
+        view = memoryview(self._map)
+        return {variant: view[offset : offset + length] for variant, (offset, length) in variants.items()}
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the lock of the writers, across the processes of the host"""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, LOCK_FILE_NAME), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# Snapshots of a paper, the CBT payload and the packed answer key
+PAPER_SNAPSHOTS = ("cbt", "answer_key")
+
+
+def get_snapshot_key(name: str, paper_id: UUID) -> str:
+    return f"{name}:{paper_id}"
+
+
+def get_paper_keys(paper_id: UUID) -> List[str]:
+    """Keys of the snapshots of a paper"""
+    return [get_snapshot_key(name, paper_id) for name in PAPER_SNAPSHOTS]
+
+
+# Payloads of the published papers, shared by the workers of the host
+snapshot_store = SnapshotStore(
+    location=configuration.SNAPSHOT_STORE_LOCATION,
+    compaction_ratio=configuration.SNAPSHOT_COMPACTION_RATIO,
+    compaction_min_size=configuration.SNAPSHOT_COMPACTION_MIN_SIZE,
+)
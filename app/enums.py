@@ -37,3 +37,8 @@ class CalculatorTypeEnum(Enum):
 class LanguageEnum(Enum):
     ENGLISH = "English"
     HINDI = "Hindi"
+
+
+class AttemptStatusEnum(Enum):
+    IN_PROGRESS = "in_progress"
+    SUBMITTED = "submitted"
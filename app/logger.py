@@ -41,18 +41,18 @@ def serialize_log_message(record: Dict):
     return "{extra[serialized]}\n"
 
 
-# Setup logger
-logger.remove()
-logger.configure()
-
-
 # Creating file name
 LOG_FILE_NAME = f"examina_api.log"
 
-logger.add(
-    sink=f"{configuration.AUDIT_LOG_LOCATION}/{LOG_FILE_NAME}",
-    rotation="6 days",
-    retention=5,
-    serialize=False,
-    format=serialize_log_message,
-)
+
+def setup_logger():
+    """Write the logs to the audit log file, called at the startup of the app rather than at import"""
+    logger.remove()
+    logger.configure()
+    logger.add(
+        sink=f"{configuration.AUDIT_LOG_LOCATION}/{LOG_FILE_NAME}",
+        rotation="6 days",
+        retention=5,
+        serialize=False,
+        format=serialize_log_message,
+    )
@@ -1,10 +1,51 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from loguru import logger
 
 from app.api import api_routers
+from app.api.middlewares import CompressionMiddleware
 from app.config import configuration
+from app.core.db.notifications import notification_listener
+from app.core.db.session import dispose_engines, warm_up_pool
+from app.core.readiness import readiness
+from app.core.services.attempts import recover_attempt_timers, submit_expired_attempts
+from app.core.services.autosave import responses_buffer
+from app.core.services.timers import attempt_timers
+from app.core.services.warmup import warm_up_papers_cache
+from app.core.snapshots import snapshot_store
+from app.logger import setup_logger
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    setup_logger()
+    readiness.begin()
+    # Engine is created here rather than at import, the worker is reported ready once the pool is warm
+    await readiness.run_stage("database", warm_up_pool, timeout=configuration.POOL_WARMUP_TIMEOUT)
+    # Listening before the warm-up, so a paper published meanwhile is warmed as well
+    notification_listener.start()
+    # Papers that are not warmed within the timeout are built by their first request
+    await readiness.run_stage(
+        "papers_cache", warm_up_papers_cache, timeout=configuration.CACHE_WARMUP_TIMEOUT, required=False
+    )
+    # Autosaves are flushed in the background, and the pending ones are written before the app exits
+    responses_buffer.start()
+    # Attempts are submitted in the background at their deadline, the timers of the attempts in progress are recovered
+    # as a stage, so a worker started without the database is not ready until it recovers them on a retry
+    attempt_timers.start(submit_expired_attempts)
+    await readiness.run_stage(
+        "attempt_timers", recover_attempt_timers, timeout=configuration.ATTEMPT_TIMERS_RECOVERY_TIMEOUT
+    )
+    readiness.finish()
+    yield
+    await attempt_timers.stop()
+    await responses_buffer.stop()
+    await notification_listener.stop()
+    snapshot_store.close()
+    await dispose_engines()
 
 
 def get_application():
@@ -14,6 +55,7 @@ def get_application():
         title=configuration.PROJECT_NAME,
         debug=configuration.PROJECT_DEBUG,
         version=configuration.PROJECT_API_VERSION,
+        lifespan=lifespan,
     )
 
     # Add routers
@@ -25,9 +67,12 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
-        expose_headers=["Content-Disposition"],
+        expose_headers=["Content-Disposition", "X-SQL-Count", "X-SQL-Time-Ms", "X-SQL-N-Plus-One", "X-Profile-Id"],
     )
 
+    # Compress the responses as per the Accept-Encoding header, cached payloads are already compressed
+    _app.add_middleware(CompressionMiddleware)
+
     # Add API pagination
     add_pagination(_app)
 
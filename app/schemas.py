@@ -1,5 +1,6 @@
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field, root_validator
@@ -7,7 +8,7 @@ from pydantic import BaseModel, Field, root_validator
 from app.core.schemas.base import ORMBaseSchema
 from app.core.schemas.exams import ExamPatternSettingsSchema
 from app.core.schemas.questions import QuestionsUploadSchema
-from app.enums import ContentTypeEnum, LanguageEnum, QuestionTypeEnum
+from app.enums import AttemptStatusEnum, ContentTypeEnum, LanguageEnum, QuestionTypeEnum
 
 # RESPONSE SCHEMAS
 
@@ -96,6 +97,38 @@ class CBTResponseSchema(CBTPaperBaseSchema):
     sections: List[CBTSectionsResponseSchema]
 
 
+class CBTSkeletonSubSectionSchema(BaseModel):
+    uuid: UUID
+    name: str
+    questions: List[UUID]
+
+
+class CBTSkeletonSectionSchema(BaseModel):
+    uuid: UUID
+    name: str
+    section_time: int
+    sub_sections: List[CBTSkeletonSubSectionSchema]
+
+
+class CBTSkeletonSchema(CBTPaperBaseSchema):
+    # Paper Details
+    uuid: UUID
+    year: int = Field(default=datetime.now().year)
+    paper_set: str = Field(default="A")
+
+    # Sections, having only the uuids of the questions
+    sections: List[CBTSkeletonSectionSchema]
+
+
+class CBTPermutationSchema(BaseModel):
+    # A permutation maps the displayed position to the original position, the inverse maps it the other way round
+    candidate_seed: str
+    questions: Dict[UUID, List[int]]  # Sub-section uuid -> permutation of its questions
+    options: Dict[UUID, List[int]]  # Question uuid -> permutation of its options
+    inverse_questions: Dict[UUID, List[int]]
+    inverse_options: Dict[UUID, List[int]]
+
+
 # CBT REQUEST SCHEMAS
 
 
@@ -121,6 +154,137 @@ class CBTRequestSchema(CBTResponseSchema):
     sections: List[CBTSectionsRequestSchema]
 
 
+# GENERATOR SCHEMAS
+
+
+class DifficultyBandSchema(BaseModel):
+    start: int  # Inclusive
+    end: int  # Exclusive
+    weight: float = Field(default=1.0, gt=0)
+
+    @root_validator
+    def validate_range(cls, values):
+        if values.get("start") is not None and values.get("end") is not None and values["start"] >= values["end"]:
+            raise ValueError(f"Difficulty band start {values['start']} should be less than end {values['end']}")
+        return values
+
+
+class BlueprintSubSectionSchema(BaseModel):
+    name: str
+    subject: str
+    tags: Optional[List[str]] = Field(default=[])  # Questions should have at least one of these tags
+    question_types: Dict[QuestionTypeEnum, int]  # Number of questions for each question type
+    difficulty: Optional[List[DifficultyBandSchema]] = Field(default=[])  # Empty means any difficulty
+    positive_marks: float
+    negative_marks: float = Field(default=0.0)
+
+
+class BlueprintSectionSchema(BaseModel):
+    name: str
+    section_time: int
+    sub_sections: List[BlueprintSubSectionSchema]
+
+
+class PaperBlueprintSchema(CBTPaperBaseSchema):
+    year: int = Field(default=datetime.now().year)
+    paper_set: str = Field(default="A")
+    seed: Optional[int]  # Same seed and question bank generates the same paper
+
+    sections: List[BlueprintSectionSchema]
+
+
+# ATTEMPT SCHEMAS
+
+
+class AttemptCreateSchema(BaseModel):
+    paper_id: UUID
+    candidate_id: str
+    candidate_seed: Optional[str]  # Seed used to fetch the paper, if the paper is shuffled for the candidate
+
+
+class AttemptResponseSchema(ORMBaseSchema):
+    uuid: UUID
+    paper_id: UUID
+    candidate_id: str
+    candidate_seed: Optional[str]
+    status: AttemptStatusEnum
+    started_at: datetime
+    deadline_at: datetime
+    submitted_at: Optional[datetime]
+    score: Optional[float]
+
+
+class CandidateResponseSchema(ORMBaseSchema):
+    question_id: UUID
+    selected_options: Optional[List[UUID]]  # In case of MCQ/MSQ, uuids of the selected options
+    value: Optional[float]  # In case of NAT
+    is_marked_for_review: bool = Field(default=False)
+    time_spent: int = Field(default=0, ge=0, le=2**31 - 1)  # Time in seconds, stored as integer
+    # Order of the autosaves of the client, defaults to the time (in ms) the autosave is received, stored as bigint
+    sequence: int = Field(default_factory=lambda: time.time_ns() // 1_000_000, ge=0, le=2**63 - 1)
+
+
+class AutosaveRequestSchema(BaseModel):
+    responses: List[CandidateResponseSchema]
+
+
+class AutosaveResponseSchema(BaseModel):
+    attempt_id: UUID
+    accepted: int  # Number of responses accepted in the autosave buffer
+
+
+class AttemptTimerSchema(BaseModel):
+    server_time: datetime
+    started_at: datetime
+    deadline_at: datetime
+    section_ends: List[datetime]  # In case of sectional timing, time at which every section is locked
+    open_section: Optional[int]  # Index of the open section, in case of sectional timing
+
+
+class AttemptScoreSchema(BaseModel):
+    score: float
+    correct: int
+    incorrect: int
+    unattempted: int
+    section_scores: List[float] = Field(default=[])  # Score of every section, in the order of the paper
+
+
+class SectionRankSchema(BaseModel):
+    section_id: UUID
+    score: float
+    rank: int
+    percentile: float
+
+
+class AttemptRankSchema(BaseModel):
+    attempt_id: UUID
+    score: float
+    rank: int  # 1 + number of candidates with a higher score
+    percentile: float  # Percentage of candidates with the same or lower score
+    candidates: int  # Number of candidates ranked
+    sections: List[SectionRankSchema]
+
+
+# ITEM STATISTICS SCHEMAS
+
+
+class QuestionStatisticsResponseSchema(ORMBaseSchema):
+    question_id: UUID
+    responses: int  # Number of graded attempts having the question
+    attempted: int
+    correct: int
+    option_counts: List[int]  # Selections of every option, in option_order
+    p_value: Optional[float]  # Fraction of the attempts that answered correctly
+    discrimination: Optional[float]  # Point-biserial correlation of correctness and normalized score
+    updated_at: datetime
+
+
+class ItemStatisticsRunSchema(BaseModel):
+    attempts: int = Field(default=0)  # Attempts analyzed
+    questions: int = Field(default=0)  # Statistics updated, a question in many batches is counted once per batch
+    recalibrated: int = Field(default=0)  # Questions whose difficulty changed
+
+
 # UPDATE SCHEMAS
 
 
@@ -141,3 +305,43 @@ class CBTQuestionUpdateSchema(BaseModel):
     tags: Optional[List[str]]
     positive_marks: Optional[float]
     negative_marks: Optional[float]
+
+
+class CBTQuestionBatchUpdateSchema(BaseModel):
+    question_id: UUID
+
+    # Model values, passage and tags are updated one question at a time
+    question: Optional[str]
+    explanation: Optional[str]
+    subject: Optional[str]
+    language: Optional[LanguageEnum]
+    knowledge_level: Optional[int]
+    difficulty: Optional[int]
+    source: Optional[str]
+
+    # Marks of the question in the paper
+    positive_marks: Optional[float] = Field(ge=0)
+    negative_marks: Optional[float] = Field(ge=0)
+
+
+class CBTQuestionsBatchUpdateResponseSchema(BaseModel):
+    paper_id: UUID
+    questions: int  # Questions updated
+    marks: int  # Questions whose marks were updated
+    forked: int = Field(default=0)  # Questions shared with other papers, copied before the edit
+
+
+class CBTPaperCloneSchema(BaseModel):
+    # Columns of the unique_exam_paper_set constraint, the ones not passed are taken from the source paper
+    name: Optional[str]
+    year: Optional[int]
+    paper_set: Optional[str]
+
+
+class SoftDeleteCascadeSchema(BaseModel):
+    # Number of records deleted / restored together in every table
+    exams: int = Field(default=0)
+    papers: int = Field(default=0)
+    questions: int = Field(default=0)
+    options: int = Field(default=0)
+    range_answers: int = Field(default=0)
@@ -0,0 +1,81 @@
+"""
+Content negotiation and compression of response bodies.
+Brotli is used only when the `brotli` package is installed, gzip is always available.
+"""
+import gzip
+from typing import Dict, List, Optional
+
+from app.config import configuration
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+# Encodings in the order of preference, when the client accepts more than one with the same quality
+SUPPORTED_ENCODINGS: List[str] = [BROTLI, GZIP] if brotli else [GZIP]
+
+# Compression levels for the responses which are compressed on every request, cheap but decent
+DYNAMIC_COMPRESSION_LEVELS: Dict[str, int] = {GZIP: 6, BROTLI: 4}
+
+# Compression levels for the cached responses, these are compressed only once so we spend more CPU on them
+CACHED_COMPRESSION_LEVELS: Dict[str, int] = {GZIP: 9, BROTLI: 9}
+
+# Only text like content is worth compressing
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the encoding for the response from the `Accept-Encoding` header of the request
+    :param accept_encoding: Value of the Accept-Encoding header, say "gzip, deflate, br;q=0.9"
+    :return: Supported encoding with the highest quality, None if the client accepts none of them
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for value in accept_encoding.split(","):
+        encoding, _, parameters = value.strip().partition(";")
+        quality = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[encoding.strip().lower()] = quality
+
+    best_encoding, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def should_compress(body_size: int, media_type: Optional[str]) -> bool:
+    """Small responses and binary content are sent as they are"""
+    if body_size < configuration.COMPRESSION_MINIMUM_SIZE:
+        return False
+    return bool(media_type) and media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """
+    Compress the body
+    :param body: Response body
+    :param encoding: One of SUPPORTED_ENCODINGS
+    :param cached: If the compressed body is going to be cached, a higher compression level is used
+    :return: Compressed body
+    """
+    levels = CACHED_COMPRESSION_LEVELS if cached else DYNAMIC_COMPRESSION_LEVELS
+    if encoding == GZIP:
+        return gzip.compress(body, compresslevel=levels[GZIP], mtime=0)
+    if encoding == BROTLI and brotli:
+        return brotli.compress(body, quality=levels[BROTLI])
+    raise ValueError(f"Unsupported encoding {encoding}")
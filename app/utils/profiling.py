@@ -0,0 +1,81 @@
+"""
+On-demand profiling of a single request with cProfile.
+A request is profiled when profiling is enabled in the configuration and the request carries the `x-profile-token`
+header matching `PROFILING_TOKEN`. Profiles are written to `AUDIT_LOG_LOCATION/profiles/<profile_id>.prof`, the profile
+id is returned in the `X-Profile-Id` header and logged along with the trace id of the request. Profiles can be read with
+`python -m pstats` or snakeviz.
+"""
+import cProfile
+import hmac
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from fastapi import Request, Response
+from loguru import logger
+
+from app.config import configuration
+
+PROFILES_DIRECTORY = os.path.join(configuration.AUDIT_LOG_LOCATION, "profiles")
+
+# cProfile profiles the whole thread, so only one request is profiled at a time
+_profile_in_progress = False
+
+
+def is_profiling_requested(request: Request) -> bool:
+    """Check if the request carries a valid profiling token"""
+    token = request.headers.get("x-profile-token")
+    return bool(token and configuration.PROFILING_TOKEN) and hmac.compare_digest(token, configuration.PROFILING_TOKEN)
+
+
+@contextmanager
+def profile_request(trace_id: str) -> Iterator[Optional[str]]:
+    """
+    Profile the code within the block and write the profile to the profiles directory
+    :param trace_id: Trace ID of the request, logged along with the profile
+    :return: ID of the profile, None if another request is already being profiled
+    """
+    global _profile_in_progress
+    if _profile_in_progress:
+        logger.warning("Skipped profiling as another request is being profiled")
+        yield None
+        return
+
+    _profile_in_progress = True
+    # Trace ID comes from a header of the client, so it is never used in the path
+    profile_id = str(uuid.uuid4())
+    profile_path = os.path.join(PROFILES_DIRECTORY, f"{profile_id}.prof")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profile_id
+    finally:
+        profiler.disable()
+        _profile_in_progress = False
+
+        os.makedirs(PROFILES_DIRECTORY, exist_ok=True)
+        profiler.dump_stats(profile_path)
+        logger.info(f"Profile of the request written to {profile_path}", profile_path=profile_path, trace_id=trace_id)
+
+
+def profiling_route_handler(route_handler: Callable) -> Callable:
+    """
+    Wrap a route handler to profile the requests asking for it.
+    Concurrent requests served while a request is profiled show up in its profile as well, so profile on a quiet worker.
+    :param route_handler: Route handler of a FastAPI route, `request.state.trace_id` should be set before calling it
+    :return: Route handler
+    """
+
+    async def profiled_route_handler(request: Request) -> Response:
+        if not is_profiling_requested(request):
+            return await route_handler(request)
+
+        with profile_request(request.state.trace_id) as profile_id:
+            response = await route_handler(request)
+
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    return profiled_route_handler
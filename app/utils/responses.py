@@ -0,0 +1,82 @@
+from typing import Any, Dict, Optional, Union
+from uuid import UUID
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import CacheEntry
+from app.utils.compression import IDENTITY, SUPPORTED_ENCODINGS, compress, negotiate_encoding, should_compress
+
+
+def examina_response_json_serializer(obj: Any) -> Any:
+    """Serializer for the objects that orjson does not support natively"""
+    # Pydantic models are already validated, so their fields are dumped as they are, nested models come back here
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+
+    # asyncpg returns its own UUID class, which orjson does not recognise as UUID
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError
+
+
+class ExaminaORJSONResponse(ORJSONResponse):
+    """
+    Response class which serializes the content with orjson.
+    When a route returns this response, FastAPI does not validate the content against the `response_model` again,
+    so it should only be used with content that is already validated by the service layer.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=examina_response_json_serializer, option=orjson.OPT_NON_STR_KEYS)
+
+
+class PayloadResponse(Response):
+    """
+    Response of a stored payload. The body can be a memoryview over the snapshot store, which is sent as it is, so the
+    payload is not copied out of the page cache.
+    """
+
+    def render(self, content: Any) -> Union[bytes, memoryview]:
+        if isinstance(content, memoryview):
+            return content
+        return super().render(content)
+
+
+def build_payloads(value: Any) -> Dict[str, bytes]:
+    """Serialized body of an (already validated) value along with its variant in every supported encoding"""
+    body = ExaminaORJSONResponse(value).body
+    return {IDENTITY: body, **{encoding: compress(body, encoding, cached=True) for encoding in SUPPORTED_ENCODINGS}}
+
+
+async def build_cached_response(cache_entry: CacheEntry, accept_encoding: Optional[str]) -> Response:
+    """
+    Build the response for a cached value.
+    The serialized body and its compressed variants are stored next to the cache entry, so the value is serialized
+    once and compressed once per encoding, no matter how many requests are served from the entry.
+    :param cache_entry: Cache entry having the (already validated) value
+    :param accept_encoding: Value of the Accept-Encoding header of the request
+    :return: Response with the body encoded as per the request
+    """
+    body = cache_entry.payloads.get(IDENTITY)
+    if body is None:
+        body = cache_entry.payloads[IDENTITY] = ExaminaORJSONResponse(cache_entry.value).body
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None or not should_compress(len(body), ExaminaORJSONResponse.media_type):
+        # Body depends on the Accept-Encoding of the request all the same, so shared caches keep a copy per encoding
+        return PayloadResponse(body, media_type=ExaminaORJSONResponse.media_type, headers={"Vary": "Accept-Encoding"})
+
+    compressed_body = cache_entry.payloads.get(encoding)
+    if compressed_body is None:
+        # Compression at a high level takes a while for big papers, so keep it off the event loop
+        compressed_body = await run_in_threadpool(compress, body, encoding, cached=True)
+        cache_entry.payloads[encoding] = compressed_body
+
+    return PayloadResponse(
+        compressed_body,
+        media_type=ExaminaORJSONResponse.media_type,
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+    )
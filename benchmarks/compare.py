@@ -0,0 +1,54 @@
+"""
+Compare two result files of `benchmarks.suite`, say of the base branch and of a change.
+
+Usage:
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+"""
+import argparse
+import json
+from typing import Dict, Iterator, Tuple
+
+
+def flatten(results: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Median timing of every benchmark, keyed by its path in the results"""
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if "median_ms" in value:
+                yield f"{prefix}{key}", value["median_ms"]
+            else:
+                yield from flatten(value, f"{prefix}{key}.")
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> int:
+    """
+    Print the change of the median of every benchmark present in both results
+    :param threshold: Change (in percent) above which a benchmark is reported as a regression
+    :return: Number of regressions
+    """
+    baseline_medians = dict(flatten(baseline["scales"]))
+    regressions = 0
+    print(f"{'benchmark':<60} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, median in flatten(current["scales"]):
+        if name not in baseline_medians:
+            continue
+        change = (median - baseline_medians[name]) / baseline_medians[name] * 100 if baseline_medians[name] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = " REGRESSION"
+        print(f"{name:<60} {baseline_medians[name]:>10.3f} {median:>10.3f} {change:>7.1f}%{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline_results, current_results = json.load(baseline_file), json.load(current_file)
+
+    print(f"Baseline {baseline_results['commit']}, current {current_results['commit']}")
+    raise SystemExit(1 if compare(baseline_results, current_results, args.threshold) else 0)
@@ -0,0 +1,296 @@
+"""
+Seeded generator of synthetic exams, papers and question banks.
+
+Same seed generates the same data, so the benchmark results of different commits can be compared.
+Papers are generated in the request format of `POST /v1/exams/{exam_id}/paper` and questions in the format of
+`POST /v1/questions/bulk_create`. Large question banks are written with core inserts, as the service layer is what we
+benchmark and not what we seed with.
+"""
+import random
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.exams import PapersModel
+from app.core.models.questions import OptionsModel, PassagesModel, QuestionsModel, RangeAnswersModel
+from app.core.schemas.exams import ExamsCreateDatabaseSchema
+from app.core.services.exams import ExamsService, PapersService
+from app.core.services.questions import LanguageService, SubjectsService
+from app.enums import ContentTypeEnum, LanguageEnum, QuestionTypeEnum
+from app.schemas import CBTRequestSchema
+
+WORDS = (
+    "value velocity particle charge field energy mass reaction compound acid equation function matrix integral "
+    "probability triangle circle author passage argument premise conclusion inference table chart ratio profit "
+    "speed distance time work pipe mixture interest average series sequence graph vector angle area volume"
+).split()
+
+# Shape of the papers, section -> sub-sections with (subject, question types, passages, positive marks, negative marks)
+PAPER_SHAPES: Dict[str, Dict] = {
+    "jee_main": {
+        "settings": {"total_time": 180},
+        "sections": [
+            {
+                "name": subject,
+                "section_time": 60,
+                "sub_sections": [
+                    ("Section A", subject, {QuestionTypeEnum.MCQ: 20}, 0, 4.0, 1.0),
+                    ("Section B", subject, {QuestionTypeEnum.NAT: 10}, 0, 4.0, 0.0),
+                ],
+            }
+            for subject in ("Physics", "Chemistry", "Mathematics")
+        ],
+    },
+    "jee_advanced": {
+        "settings": {"total_time": 180},
+        "sections": [
+            {
+                "name": subject,
+                "section_time": 60,
+                "sub_sections": [
+                    ("Section 1", subject, {QuestionTypeEnum.MCQ: 4}, 0, 3.0, 1.0),
+                    ("Section 2", subject, {QuestionTypeEnum.MSQ: 6}, 0, 4.0, 2.0),
+                    ("Section 3", subject, {QuestionTypeEnum.NAT: 6}, 0, 3.0, 0.0),
+                    ("Section 4", subject, {QuestionTypeEnum.MCQ: 2}, 1, 3.0, 1.0),
+                ],
+            }
+            for subject in ("Physics", "Chemistry", "Mathematics")
+        ],
+    },
+    "cat": {
+        "settings": {"total_time": 120, "is_sectional_timing": True, "is_calculator_allowed": True},
+        "sections": [
+            {
+                "name": "VARC",
+                "section_time": 40,
+                "sub_sections": [
+                    ("Reading Comprehension", "English", {QuestionTypeEnum.MCQ: 16}, 4, 3.0, 1.0),
+                    ("Verbal Ability", "English", {QuestionTypeEnum.MCQ: 5, QuestionTypeEnum.NAT: 3}, 0, 3.0, 1.0),
+                ],
+            },
+            {
+                "name": "DILR",
+                "section_time": 40,
+                "sub_sections": [
+                    ("Sets", "Reasoning", {QuestionTypeEnum.MCQ: 14, QuestionTypeEnum.NAT: 6}, 4, 3.0, 1.0),
+                ],
+            },
+            {
+                "name": "QA",
+                "section_time": 40,
+                "sub_sections": [
+                    ("Quantitative Ability", "Quant", {QuestionTypeEnum.MCQ: 14, QuestionTypeEnum.NAT: 8}, 0, 3.0, 1.0),
+                ],
+            },
+        ],
+    },
+}
+
+# Mix of the question bank, passages are shared by PASSAGE_GROUP_SIZE questions
+BANK_QUESTION_TYPES = ((QuestionTypeEnum.MCQ, 0.7), (QuestionTypeEnum.MSQ, 0.15), (QuestionTypeEnum.NAT, 0.15))
+BANK_PASSAGE_RATIO = 0.1
+PASSAGE_GROUP_SIZE = 4
+BANK_SUBJECTS = ("Physics", "Chemistry", "Mathematics", "English", "Reasoning", "Quant")
+
+
+class DatasetGenerator:
+    """Generates the synthetic data, everything is derived from the seed"""
+
+    def __init__(self, seed: int = 42, passage_length: int = 1500):
+        self.rng = random.Random(seed)
+        self.passage_length = passage_length
+
+    def uuid(self) -> UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def text(self, words: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def passage(self) -> str:
+        return self.text(self.passage_length // 8)[: self.passage_length] + "."
+
+    def options(self, question_type: QuestionTypeEnum) -> List[Dict]:
+        correct = set(self.rng.sample(range(4), self.rng.randint(1, 3) if question_type == QuestionTypeEnum.MSQ else 1))
+        return [{"option": self.text(4), "is_correct_option": idx in correct} for idx in range(4)]
+
+    def answer(self) -> Dict:
+        start = round(self.rng.uniform(0, 100), 2)
+        return {"start": start, "end": round(start + self.rng.choice((0, 0.01, 0.5)), 2)}
+
+    def question(self, subject: str, question_type: QuestionTypeEnum, passage: Optional[str] = None) -> Dict:
+        """Question in the format of `POST /v1/questions/bulk_create`"""
+        question = {
+            "question": f"{self.text(14)}?",
+            "explanation": self.text(30),
+            "question_type": question_type.value,
+            "subject": subject,
+            "language": LanguageEnum.ENGLISH.value,
+            "knowledge_level": self.rng.randint(9, 13),
+            "difficulty": self.rng.randint(100, 1300),
+            "source": "benchmark",
+            "passage": passage,
+            "tags": self.rng.sample(WORDS, 2),
+        }
+        if question_type == QuestionTypeEnum.NAT:
+            question["answer"] = self.answer()
+        else:
+            question["options"] = self.options(question_type)
+        return question
+
+    def paper(self, shape: str, name: Optional[str] = None) -> CBTRequestSchema:
+        """Paper in the format of `POST /v1/exams/{exam_id}/paper`"""
+        paper_shape = PAPER_SHAPES[shape]
+        sections = []
+        for section in paper_shape["sections"]:
+            sub_sections = []
+            for sub_section_name, subject, question_types, passages, positive_marks, negative_marks in section[
+                "sub_sections"
+            ]:
+                questions = [
+                    {
+                        **self.question(subject, question_type),
+                        "positive_marks": positive_marks,
+                        "negative_marks": negative_marks,
+                    }
+                    for question_type, count in question_types.items()
+                    for _ in range(count)
+                ]
+                if passages:
+                    # Questions of a passage are consecutive, as in the actual papers
+                    passage_texts = [self.passage() for _ in range(passages)]
+                    for idx, question in enumerate(questions):
+                        question["passage"] = passage_texts[idx * passages // len(questions)]
+                sub_sections.append({"name": sub_section_name, "questions": questions})
+            sections.append(
+                {"name": section["name"], "section_time": section["section_time"], "sub_sections": sub_sections}
+            )
+
+        return CBTRequestSchema.parse_obj(
+            {
+                "name": name or f"{shape} {self.rng.randint(1000, 9999)}",
+                "instructions": self.text(40),
+                "year": 2024,
+                "paper_set": "A",
+                "language": LanguageEnum.ENGLISH.value,
+                "settings": paper_shape["settings"],
+                "sections": sections,
+            }
+        )
+
+    def question_bank_rows(
+        self, size: int, subject_uuids: Dict[str, UUID], language_uuid: UUID, batch_size: int
+    ) -> Iterator[Dict[type, List[Dict]]]:
+        """
+        Rows of a question bank, in batches of `batch_size` questions
+        :param size: Number of questions
+        :param subject_uuids: Subject name -> uuid
+        :param language_uuid: Language of the questions
+        :param batch_size: Number of questions in a batch
+        :return: Batches of model -> rows
+        """
+        subjects = list(subject_uuids.values())
+        question_types, weights = zip(*BANK_QUESTION_TYPES)
+        for batch_start in range(0, size, batch_size):
+            rows: Dict[type, List[Dict]] = {
+                PassagesModel: [],
+                QuestionsModel: [],
+                OptionsModel: [],
+                RangeAnswersModel: [],
+            }
+            passage_id, passage_left = None, 0
+            for _ in range(min(batch_size, size - batch_start)):
+                if not passage_left and self.rng.random() < BANK_PASSAGE_RATIO / PASSAGE_GROUP_SIZE:
+                    passage_id, passage_left = self.uuid(), PASSAGE_GROUP_SIZE
+                    rows[PassagesModel].append({"uuid": passage_id, "passage_text": self.passage()})
+
+                question_type = self.rng.choices(question_types, weights)[0]
+                question = self.question("", question_type)
+                question_id = self.uuid()
+                rows[QuestionsModel].append(
+                    {
+                        "uuid": question_id,
+                        "question": question["question"],
+                        "explanation": question["explanation"],
+                        "question_type": question_type,
+                        "content_type": ContentTypeEnum.PASSAGE if passage_left else ContentTypeEnum.NORMAL,
+                        "passage_id": passage_id if passage_left else None,
+                        "subject_id": self.rng.choice(subjects),
+                        "knowledge_level": question["knowledge_level"],
+                        "difficulty": question["difficulty"],
+                        "source": question["source"],
+                        "language_id": language_uuid,
+                        "is_deleted": False,
+                    }
+                )
+                passage_left = max(passage_left - 1, 0)
+
+                if question_type == QuestionTypeEnum.NAT:
+                    rows[RangeAnswersModel].append(
+                        {"uuid": self.uuid(), "question_id": question_id, **question["answer"]}
+                    )
+                else:
+                    rows[OptionsModel].extend(
+                        {"uuid": self.uuid(), "question_id": question_id, "option_order": idx + 1, **option}
+                        for idx, option in enumerate(question["options"])
+                    )
+            yield rows
+
+
+async def seed_question_bank(
+    session: AsyncSession, size: int, seed: int = 42, batch_size: int = 2000
+) -> Tuple[Dict[str, UUID], UUID]:
+    """
+    Write a question bank of `size` questions
+    :param session: Database session, the caller commits
+    :param size: Number of questions
+    :param seed: Seed of the generator
+    :param batch_size: Number of questions inserted at once
+    :return: Subject name -> uuid, language uuid
+    """
+    subject_instances = await SubjectsService(session=session).create_bulk(list(BANK_SUBJECTS))
+    subject_uuids = {subject_instance.name: subject_instance.uuid for subject_instance in subject_instances}
+    language_instance = await LanguageService(session=session).create(LanguageEnum.ENGLISH)
+
+    generator = DatasetGenerator(seed)
+    for rows in generator.question_bank_rows(size, subject_uuids, language_instance.uuid, batch_size):
+        # Parents before children, because of the foreign keys
+        for model in (PassagesModel, QuestionsModel, OptionsModel, RangeAnswersModel):
+            if rows[model]:
+                await session.execute(insert(model), rows[model])
+    return subject_uuids, language_instance.uuid
+
+
+async def seed_exam(session: AsyncSession, shape: str, seed: int = 42, papers: int = 1) -> Tuple[UUID, List[UUID]]:
+    """
+    Create an exam with `papers` papers of the shape, through the service layer.
+    Exam and papers are created only once for a seed, later calls return the existing ones.
+    :param session: Database session, the caller commits
+    :param shape: One of PAPER_SHAPES
+    :param seed: Seed of the generator
+    :param papers: Number of papers
+    :return: Exam uuid, paper uuids
+    """
+    generator = DatasetGenerator(seed)
+    exam_instance = (
+        await ExamsService(session=session).create_bulk(
+            [ExamsCreateDatabaseSchema(name=f"Benchmark {shape} {seed}", description="Synthetic exam")]
+        )
+    )[0]
+
+    papers_service = PapersService(session=session)
+    paper_uuids = []
+    for idx in range(papers):
+        # Papers are generated even if they exist, so that the generator is in the same state for the next paper
+        paper_data = generator.paper(shape, name=f"Benchmark {shape} {seed} paper {idx}")
+
+        # Papers of a previous run are reused
+        paper_instances = await papers_service.filter(
+            [PapersModel.exam_id == exam_instance.uuid, PapersModel.name == paper_data.name]
+        )
+        if not paper_instances:
+            paper_instances = [await papers_service.create_paper(exam_instance.uuid, paper_data)]
+        paper_uuids.append(paper_instances[0].uuid)
+    return exam_instance.uuid, paper_uuids
@@ -0,0 +1,298 @@
+"""
+Load test simulating the start of an exam: N candidates fetch the paper within the ramp-up window, autosave their
+responses periodically and then submit.
+
+The app is driven in-process through ASGI within its lifespan, so the autosave buffer and the attempt timers run as in a
+worker (the database of the configuration is used), or a running server is targeted with `--base-url`. DB pool usage is
+sampled from the engine in-process and from `/metrics` otherwise.
+
+Usage:
+    configmap_path=app/config/.env python -m benchmarks.loadtest --paper-id <uuid> --candidates 500 --ramp-up 10
+    python -m benchmarks.loadtest --scenario scenario.json --base-url http://localhost:8001 --output report.json
+
+A scenario file has the fields of `Scenario`, paths and bodies are formatted with `paper_id`, `candidate` (index of the
+candidate), `candidate_seed`, `attempt_id` (uuid of the attempt started by the candidate) and `sequence` (index of the
+autosave). Say, to autosave and submit the attempts:
+    {
+        "paper_id": "<paper_uuid>",
+        "autosave_path": "/v1/attempts/{attempt_id}/responses",
+        "autosave_body": {"responses": [{"question_id": "<question_uuid>", "value": 1, "sequence": "{sequence}"}]},
+        "submit_path": "/v1/attempts/{attempt_id}/submit"
+    }
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+from benchmarks.suite import get_commit
+
+
+class Scenario(BaseModel):
+    paper_id: str
+    candidates: int = Field(default=100, gt=0)
+    ramp_up: float = Field(default=5.0, ge=0)  # Seconds within which all the candidates start
+    shuffle: bool = Field(default=True)  # Every candidate fetches the paper with its own seed
+
+    # Requests sent by every candidate at the start
+    fetch_paths: List[str] = Field(default=["/v1/paper/{paper_id}/skeleton", "/v1/paper/{paper_id}"])
+    accept_encoding: Optional[str] = Field(default="gzip")
+
+    # Attempt started by every candidate after fetching the paper, its uuid is used by the autosaves and the submission.
+    # Skipped if the path is not set
+    attempt_path: Optional[str] = Field(default="/v1/attempts/")
+    attempt_body: Optional[Any] = Field(
+        default={
+            "paper_id": "{paper_id}",
+            "candidate_id": "loadtest-{candidate}",
+            "candidate_seed": "{candidate_seed}",
+        }
+    )
+
+    # Autosaves are skipped if the path is not set
+    autosave_path: Optional[str]
+    autosave_method: str = Field(default="PUT")
+    autosave_body: Optional[Any]
+    autosaves: int = Field(default=5, ge=0)
+    autosave_interval: float = Field(default=2.0, ge=0)  # Seconds, with +/- 25% jitter
+
+    # Submission is skipped if the path is not set
+    submit_path: Optional[str]
+    submit_method: str = Field(default="POST")
+    submit_body: Optional[Any]
+
+    timeout: float = Field(default=30.0, gt=0)
+    pool_sample_interval: float = Field(default=0.1, gt=0)
+
+
+def render(template: Any, context: Dict) -> Any:
+    """Format the strings of a (JSON like) template with the context"""
+    if isinstance(template, str):
+        return template.format(**context)
+    if isinstance(template, list):
+        return [render(value, context) for value in template]
+    if isinstance(template, dict):
+        return {key: render(value, context) for key, value in template.items()}
+    return template
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class LoadTest:
+    def __init__(self, scenario: Scenario, client: httpx.AsyncClient, in_process: bool):
+        self.scenario = scenario
+        self.client = client
+        self.in_process = in_process
+        self.rng = random.Random(0)
+
+        # Step -> latencies (seconds), status code -> count, errors
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+        self.pool_samples: List[Dict[str, float]] = []
+
+    async def request(self, step: str, method: str, path: str, body: Any = None) -> Optional[httpx.Response]:
+        """Send a request of a step and record its latency and status, returns the response if it succeeded"""
+        start_time = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.request(method, path, json=body, timeout=self.scenario.timeout)
+            status = str(response.status_code)
+            if response.status_code >= 400:
+                self.errors[step] = self.errors.get(step, 0) + 1
+                response = None
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            self.errors[step] = self.errors.get(step, 0) + 1
+
+        self.latencies.setdefault(step, []).append(time.perf_counter() - start_time)
+        step_statuses = self.statuses.setdefault(step, {})
+        step_statuses[status] = step_statuses.get(status, 0) + 1
+        return response
+
+    async def candidate(self, idx: int, start_delay: float):
+        """Journey of a candidate"""
+        scenario = self.scenario
+        context = {
+            "paper_id": scenario.paper_id,
+            "candidate": idx,
+            "candidate_seed": f"candidate-{idx}",
+            "attempt_id": None,
+            "sequence": 0,
+        }
+        await asyncio.sleep(start_delay)
+
+        for path in scenario.fetch_paths:
+            path = render(path, context)
+            if scenario.shuffle:
+                path += ("&" if "?" in path else "?") + f"candidate_seed={context['candidate_seed']}"
+            await self.request("fetch " + path.replace(scenario.paper_id, "{paper_id}").split("?")[0], "GET", path)
+
+        if scenario.attempt_path:
+            response = await self.request(
+                "attempt", "POST", render(scenario.attempt_path, context), render(scenario.attempt_body, context)
+            )
+            if response is None:
+                # Autosaves and the submission need the attempt
+                return
+            context["attempt_id"] = response.json()["uuid"]
+
+        if scenario.autosave_path:
+            for sequence in range(scenario.autosaves):
+                await asyncio.sleep(scenario.autosave_interval * self.rng.uniform(0.75, 1.25))
+                context["sequence"] = sequence
+                await self.request(
+                    "autosave",
+                    scenario.autosave_method,
+                    render(scenario.autosave_path, context),
+                    render(scenario.autosave_body, context),
+                )
+
+        if scenario.submit_path:
+            await self.request(
+                "submit",
+                scenario.submit_method,
+                render(scenario.submit_path, context),
+                render(scenario.submit_body, context),
+            )
+
+    async def sample_pool(self):
+        """Sample the DB pool usage until cancelled"""
+        while True:
+            sample = None
+            if self.in_process:
+                from app.config import configuration
+                from app.core.db.session import get_async_engine
+
+                # Imported here, as the app (and its engine) is not loaded when a running server is targeted
+                pool = get_async_engine().pool
+                sample = {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "max_overflow": configuration.POSTGRES_MAX_OVERFLOW,
+                }
+            else:
+                try:
+                    response = await self.client.get("/metrics")
+                    sample = {
+                        line.split('state="')[1].split('"')[0]: float(line.rsplit(" ", 1)[1])
+                        for line in response.text.splitlines()
+                        if line.startswith("examina_db_pool_connections{")
+                    }
+                except httpx.HTTPError:
+                    pass
+
+            if sample:
+                self.pool_samples.append(sample)
+            await asyncio.sleep(self.scenario.pool_sample_interval)
+
+    async def run(self) -> Dict:
+        scenario = self.scenario
+        sampler = asyncio.create_task(self.sample_pool())
+        start_time = time.perf_counter()
+        await asyncio.gather(
+            *(self.candidate(idx, self.rng.uniform(0, scenario.ramp_up)) for idx in range(scenario.candidates))
+        )
+        duration = time.perf_counter() - start_time
+        sampler.cancel()
+        return self.report(duration)
+
+    def report(self, duration: float) -> Dict:
+        total_requests = sum(len(latencies) for latencies in self.latencies.values())
+        steps = {}
+        for step, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            steps[step] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / duration, 2),
+                "error_rate": round(self.errors.get(step, 0) / len(latencies), 4),
+                "statuses": self.statuses[step],
+                **{
+                    f"{name}_ms": round(percentile(latencies, fraction) * 1000, 2)
+                    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))
+                },
+                "max_ms": round(latencies[-1] * 1000, 2),
+            }
+
+        pool = {}
+        if self.pool_samples:
+            capacity = self.pool_samples[-1].get("size", 0) + self.pool_samples[-1].get("max_overflow", 0)
+            checked_out = [sample.get("checked_out", 0) for sample in self.pool_samples]
+            pool = {
+                "capacity": capacity,
+                "max_checked_out": max(checked_out),
+                "mean_checked_out": round(sum(checked_out) / len(checked_out), 2),
+                # Fraction of the samples where every connection was in use, i.e. requests were queueing for one
+                "saturation": round(sum(value >= capacity for value in checked_out) / len(checked_out), 4)
+                if capacity
+                else None,
+            }
+
+        return {
+            "commit": get_commit(),
+            "scenario": self.scenario.dict(),
+            "duration_s": round(duration, 3),
+            "requests": total_requests,
+            "throughput_rps": round(total_requests / duration, 2),
+            "error_rate": round(sum(self.errors.values()) / total_requests, 4) if total_requests else 0.0,
+            "steps": steps,
+            "db_pool": pool,
+        }
+
+
+async def run(scenario: Scenario, base_url: Optional[str] = None) -> Dict:
+    """Run the scenario in-process, or against the server at base_url"""
+    headers = {"accept-encoding": scenario.accept_encoding} if scenario.accept_encoding else {}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            # Unhandled errors of the app are reported as 500, like a server would, instead of failing the run
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://loadtest",
+            headers=headers,
+            limits=limits,
+        )
+
+        # Lifespan starts the autosave flusher and the attempt timers, which a request alone does not
+        async with app.router.lifespan_context(app), client:
+            return await LoadTest(scenario, client, in_process=True).run()
+
+    async with client:
+        return await LoadTest(scenario, client, in_process=False).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the start of an exam")
+    parser.add_argument("--scenario", help="JSON file with the scenario, other arguments override it")
+    parser.add_argument("--paper-id")
+    parser.add_argument("--candidates", type=int)
+    parser.add_argument("--ramp-up", type=float)
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--output", help="File to write the report to, printed if not passed")
+    args = parser.parse_args()
+
+    scenario_data = {}
+    if args.scenario:
+        with open(args.scenario) as scenario_file:
+            scenario_data = json.load(scenario_file)
+    for field, value in (("paper_id", args.paper_id), ("candidates", args.candidates), ("ramp_up", args.ramp_up)):
+        if value is not None:
+            scenario_data[field] = value
+
+    output = json.dumps(asyncio.run(run(Scenario.parse_obj(scenario_data), args.base_url)), indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
@@ -0,0 +1,142 @@
+"""
+Benchmark for serializing the CBT paper payload.
+
+Compares the default FastAPI path (validating the content against `response_model` and encoding it with the
+stdlib `json` encoder) with `ExaminaORJSONResponse`, which serializes the already validated schema directly.
+
+Usage:
+    python -m benchmarks.serialization --sections 3 --questions 30 --passage-length 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Callable, Dict
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas import (
+    CBTOptionsResponseSchema,
+    CBTQuestionsResponseSchema,
+    CBTResponseSchema,
+    CBTSectionsResponseSchema,
+    CBTSubSectionsResponseSchema,
+)
+from app.utils.responses import ExaminaORJSONResponse
+
+
+def build_paper(sections: int, sub_sections: int, questions: int, passage_length: int) -> CBTResponseSchema:
+    """
+    Build a synthetic paper, every second question is a passage question
+    :param sections: Number of sections
+    :param sub_sections: Number of sub-sections in each section
+    :param questions: Number of questions in each sub-section
+    :param passage_length: Number of characters in each passage
+    :return: Paper in CBTResponseSchema
+    """
+    passage = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * (passage_length // 56 + 1))[
+        :passage_length
+    ]
+    return CBTResponseSchema(
+        uuid=uuid.uuid4(),
+        name="Benchmark Paper",
+        instructions="Read all instructions carefully before starting the exam.",
+        year=2024,
+        paper_set="A",
+        language="English",
+        settings={"total_time": 180},
+        sections=[
+            CBTSectionsResponseSchema(
+                uuid=uuid.uuid4(),
+                name=f"Section {section_idx}",
+                section_time=60,
+                sub_sections=[
+                    CBTSubSectionsResponseSchema(
+                        uuid=uuid.uuid4(),
+                        name=f"Sub-section {sub_section_idx}",
+                        questions=[
+                            CBTQuestionsResponseSchema(
+                                uuid=uuid.uuid4(),
+                                question=f"Question {question_idx}: what is the value of x in the given figure?",
+                                question_type="MCQ",
+                                content_type="passage" if question_idx % 2 else "normal",
+                                passage=passage if question_idx % 2 else None,
+                                options=[
+                                    CBTOptionsResponseSchema(uuid=uuid.uuid4(), option=f"Option {option_idx}")
+                                    for option_idx in range(4)
+                                ],
+                                positive_marks=4.0,
+                                negative_marks=1.0,
+                            )
+                            for question_idx in range(questions)
+                        ],
+                    )
+                    for sub_section_idx in range(sub_sections)
+                ],
+            )
+            for section_idx in range(sections)
+        ],
+    )
+
+
+def measure(function: Callable[[], bytes], repeat: int) -> Dict:
+    """Run the function `repeat` times and return the timings in milliseconds along with the payload size"""
+    body = function()
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    timings.sort()
+    return {
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(timings[len(timings) // 2], 3),
+        "max_ms": round(timings[-1], 3),
+        "bytes": len(body),
+    }
+
+
+def run(sections: int, sub_sections: int, questions: int, passage_length: int, repeat: int) -> Dict:
+    """Benchmark both serialization paths for the same paper"""
+    paper = build_paper(sections, sub_sections, questions, passage_length)
+    response_field = create_response_field(name="benchmark_response", type_=CBTResponseSchema)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_default() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=response_field, response_content=paper))
+        return JSONResponse(content).body
+
+    def orjson_fast_path() -> bytes:
+        return ExaminaORJSONResponse(paper).body
+
+    # Both paths should produce the same document
+    assert json.loads(fastapi_default()) == json.loads(orjson_fast_path())
+
+    results = {
+        "paper": {
+            "sections": sections,
+            "sub_sections": sub_sections,
+            "questions": sections * sub_sections * questions,
+            "passage_length": passage_length,
+        },
+        "fastapi_default": measure(fastapi_default, repeat),
+        "orjson_fast_path": measure(orjson_fast_path, repeat),
+    }
+    results["speedup"] = round(results["fastapi_default"]["median_ms"] / results["orjson_fast_path"]["median_ms"], 2)
+    loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CBT paper serialization")
+    parser.add_argument("--sections", type=int, default=3)
+    parser.add_argument("--sub-sections", type=int, default=2)
+    parser.add_argument("--questions", type=int, default=30, help="Questions in each sub-section")
+    parser.add_argument("--passage-length", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.sections, args.sub_sections, args.questions, args.passage_length, args.repeat), indent=4))
@@ -0,0 +1,93 @@
+"""
+Benchmark of the startup of a worker, against the startup time budget (`STARTUP_TIME_BUDGET`).
+
+Every run starts a fresh interpreter which imports the app and runs the startup of its lifespan (engine creation,
+pool warm-up, recovery of the attempt timers), the way a new uvicorn worker does. With `--import-only` the lifespan is
+not run, so no database is needed, importing the app must not connect to one.
+
+Usage:
+    configmap_path=app/config/.env python -m benchmarks.startup --repeat 10 --output startup.json
+    configmap_path=app/config/.env python -m benchmarks.startup --import-only
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from app.config import configuration
+from benchmarks.suite import get_commit, summarize
+
+# Run in the child interpreter, prints the timings (in seconds) as JSON on its last line
+WORKER_SCRIPT = """
+import asyncio, json, time
+start_time = time.perf_counter()
+from app.main import app
+result = {"import": time.perf_counter() - start_time}
+
+async def start():
+    async with app.router.lifespan_context(app):
+        from app.core.readiness import readiness
+        result["lifespan"] = time.perf_counter() - start_time - result["import"]
+        result["ready"] = readiness.is_ready
+
+if RUN_LIFESPAN:
+    asyncio.run(start())
+print(json.dumps(result))
+"""
+
+
+def start_worker(run_lifespan: bool) -> Dict:
+    """Start a fresh interpreter and get the timings of its startup"""
+    start_time = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT.replace("RUN_LIFESPAN", str(run_lifespan))],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Worker failed to start:\n{completed.stderr}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start_time
+    return result
+
+
+def run(repeat: int, run_lifespan: bool) -> Dict:
+    """Start the worker `repeat` times and summarize the timings against the budget"""
+    runs: List[Dict] = [start_worker(run_lifespan) for _ in range(repeat)]
+    startup = [run_["import"] + run_.get("lifespan", 0) for run_ in runs]
+    results = {
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "lifespan": run_lifespan,
+        "budget_ms": configuration.STARTUP_TIME_BUDGET * 1000,
+        "import": summarize([run_["import"] for run_ in runs]),
+        "startup": summarize(startup),
+        "process": summarize([run_["process"] for run_ in runs]),
+        "ready": all(run_.get("ready", True) for run_ in runs),
+    }
+    if run_lifespan:
+        results["lifespan_startup"] = summarize([run_["lifespan"] for run_ in runs])
+    results["within_budget"] = results["startup"]["p95_ms"] <= results["budget_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the startup of a worker against the startup time budget")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-only", action="store_true", help="Only import the app, no database is needed")
+    parser.add_argument("--output", help="File to write the results to, printed if not passed")
+    args = parser.parse_args()
+
+    results = run(args.repeat, not args.import_only)
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+    # Fails CI when the startup is over the budget
+    sys.exit(0 if results["within_budget"] and results["ready"] else 1)
@@ -0,0 +1,216 @@
+"""
+Benchmark suite of the service-layer hot paths and HTTP endpoints, against the PostgreSQL of the configuration.
+
+For every scale, a question bank of that many questions is seeded (skipped if the database already has it) along with
+an exam having papers of every shape. Write paths (`create_paper`, `QuestionsService.create_bulk`) run in a transaction
+that is rolled back, so repeated runs measure the same database. Read paths are measured cold (paper cache cleared
+before every call) and warm.
+
+Usage:
+    configmap_path=app/config/.env python -m benchmarks.suite --scales 1k 100k --repeat 20 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Tuple
+from uuid import UUID
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.cache import papers_cache
+from app.core.db.session import async_session_maker
+from app.core.models.questions import QuestionsModel
+from app.core.services.exams import PapersService
+from app.core.services.questions import QuestionsService
+from benchmarks.datasets import BANK_QUESTION_TYPES, PAPER_SHAPES, DatasetGenerator, seed_exam, seed_question_bank
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def summarize(timings: List[float]) -> Dict:
+    """Summary of the timings (in seconds), in milliseconds"""
+    timings = sorted(timing * 1000 for timing in timings)
+    return {
+        "runs": len(timings),
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+    }
+
+
+async def measure(function: Callable[[], Awaitable], repeat: int, warmup: int = 1) -> Dict:
+    """Run the coroutine function `warmup + repeat` times and summarize the timings of the last `repeat` runs"""
+    for _ in range(warmup):
+        await function()
+
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        await function()
+        timings.append(time.perf_counter() - start_time)
+    return summarize(timings)
+
+
+async def in_session(function: Callable, rollback: bool = False):
+    """Run the function with a new session, the transaction is committed or rolled back"""
+    async with async_session_maker() as session:
+        transaction = await session.begin()
+        try:
+            result = await function(session)
+        except Exception:
+            await transaction.rollback()
+            raise
+
+        if rollback:
+            await transaction.rollback()
+        else:
+            await transaction.commit()
+        return result
+
+
+async def prepare(scale: int, seed: int) -> Dict[str, Tuple[UUID, UUID]]:
+    """
+    Seed the question bank up to `scale` questions and create a paper of every shape
+    :return: Shape -> (exam uuid, paper uuid)
+    """
+
+    async def count_questions(session):
+        return await session.scalar(select(func.count()).select_from(QuestionsModel))
+
+    existing_questions = await in_session(count_questions)
+    if existing_questions < scale:
+        print(f"Seeding {scale - existing_questions} questions")
+        await in_session(lambda session: seed_question_bank(session, scale - existing_questions, seed=seed + scale))
+
+    papers = {}
+    for shape in PAPER_SHAPES:
+        exam_uuid, (paper_uuid,) = await in_session(lambda session: seed_exam(session, shape, seed=seed + scale))
+        papers[shape] = (exam_uuid, paper_uuid)
+    return papers
+
+
+async def run_service_benchmarks(papers: Dict[str, Tuple[UUID, UUID]], seed: int, repeat: int) -> Dict:
+    """Benchmarks of the service layer hot paths"""
+    generator = DatasetGenerator(seed)
+    results = {}
+
+    for shape, (exam_uuid, paper_uuid) in papers.items():
+        paper_data = generator.paper(shape)
+
+        async def create_paper(session):
+            # create_paper updates the request, so every run gets its own copy
+            await PapersService(session=session).create_paper(exam_uuid, paper_data.copy(deep=True))
+
+        async def get_for_cbt_cold(session):
+            papers_cache.clear()
+            await PapersService(session=session).get_for_cbt(paper_uuid)
+
+        async def get_for_cbt_warm(session):
+            await PapersService(session=session).get_for_cbt(paper_uuid)
+
+        async def get_solution_cold(session):
+            papers_cache.clear()
+            await PapersService(session=session).get_solution(paper_uuid)
+
+        results[shape] = {
+            "create_paper": await measure(lambda: in_session(create_paper, rollback=True), repeat),
+            "get_for_cbt_cold": await measure(lambda: in_session(get_for_cbt_cold, rollback=True), repeat),
+            "get_for_cbt_warm": await measure(lambda: in_session(get_for_cbt_warm, rollback=True), repeat),
+            "get_solution_cold": await measure(lambda: in_session(get_solution_cold, rollback=True), repeat),
+        }
+
+    question_types, weights = zip(*BANK_QUESTION_TYPES)
+    questions = [
+        generator.question("Physics", question_type)
+        for question_type in generator.rng.choices(question_types, weights, k=100)
+    ]
+
+    async def bulk_create(session):
+        # create_bulk updates the dicts, so every run gets its own copy
+        await QuestionsService(session=session).create_bulk(copy.deepcopy(questions))
+
+    results["questions_create_bulk_100"] = await measure(lambda: in_session(bulk_create, rollback=True), repeat)
+    return results
+
+
+async def run_http_benchmarks(papers: Dict[str, Tuple[UUID, UUID]], repeat: int, base_url: str = None) -> Dict:
+    """Benchmarks of the read endpoints, in-process through ASGI or against a running server"""
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+    results = {}
+    async with client:
+        for shape, (_, paper_uuid) in papers.items():
+
+            async def get(path: str, headers: Dict = None):
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+
+            results[shape] = {
+                "get_paper": await measure(lambda: get(f"/v1/paper/{paper_uuid}"), repeat),
+                "get_paper_gzip": await measure(
+                    lambda: get(f"/v1/paper/{paper_uuid}", headers={"accept-encoding": "gzip"}), repeat
+                ),
+                "get_paper_shuffled": await measure(
+                    lambda: get(f"/v1/paper/{paper_uuid}?candidate_seed=benchmark"), repeat
+                ),
+                "get_solution": await measure(lambda: get(f"/v1/paper/{paper_uuid}/solution"), repeat),
+            }
+    return results
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(scales: List[str], seed: int, repeat: int, base_url: str = None) -> Dict:
+    """Run the benchmarks for every scale, results are tagged with the commit so runs can be compared"""
+    results = {
+        "commit": get_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "repeat": repeat,
+        "scales": {},
+    }
+    for scale in scales:
+        papers = await prepare(SCALES[scale], seed)
+        results["scales"][scale] = {
+            "questions": SCALES[scale],
+            "service": await run_service_benchmarks(papers, seed, repeat),
+            "http": await run_http_benchmarks(papers, repeat, base_url),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the service layer and HTTP endpoints")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["1k"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="File to write the results to, printed if not passed")
+    args = parser.parse_args()
+
+    output = json.dumps(asyncio.run(run(args.scales, args.seed, args.repeat, args.base_url)), indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
@@ -0,0 +1,123 @@
+"""
+Fixtures of the tests. The settings are read from `tests/.env` unless `configmap_path` is set, and can be overridden by
+environment variables (say POSTGRES_HOST). Tests using the database are skipped when it cannot be reached, every such
+test runs in a transaction that is rolled back at the end of the test.
+"""
+import asyncio
+import os
+from typing import Callable, List
+
+import pytest
+
+os.environ.setdefault("configmap_path", os.path.join(os.path.dirname(__file__), ".env"))
+
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core.db.migrations import run_migrations  # noqa: E402
+from app.core.db.session import dispose_engines, get_async_engine, get_engine  # noqa: E402
+from app.core.db.unit_of_work import UnitOfWork  # noqa: E402
+from app.core.models import PapersModel, SectionsModel, SubSectionQuestionsModel, SubSectionsModel  # noqa: E402
+from app.core.schemas.exams import ExamsCreateDatabaseSchema  # noqa: E402
+from app.core.services.exams import ExamsService, PapersService  # noqa: E402
+from app.schemas import CBTRequestSchema  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for all the tests, the engine and its connections are bound to it"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+async def database():
+    """Migrated database of the tests"""
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError as exc:
+        pytest.skip(f"Database of the tests is not reachable: {exc.orig}")
+
+    run_migrations()
+    yield
+    await dispose_engines()
+
+
+@pytest.fixture
+async def session(database) -> AsyncSession:
+    """Session of a test, the commits of the services release savepoints of a transaction which is rolled back"""
+    async with get_async_engine().connect() as connection:
+        transaction = await connection.begin()
+        async with AsyncSession(
+            bind=connection, join_transaction_mode="create_savepoint", autoflush=False, expire_on_commit=False
+        ) as async_session:
+            yield async_session
+        await transaction.rollback()
+
+
+def build_question(text: str, question_type: str = "MCQ", correct: List[int] = (1,), marks: float = 4.0) -> dict:
+    """Question of a paper payload, with a tag and two options for MCQ / MSQ or a range answer for NAT"""
+    question = {
+        "question": text,
+        "question_type": question_type,
+        "subject": "Physics",
+        "content_type": "normal",
+        "language": "English",
+        "difficulty": 500,
+        "positive_marks": marks,
+        "negative_marks": 1.0,
+        "tags": ["Mechanics"],
+    }
+    if question_type == "NAT":
+        question["answer"] = {"start": 1.5, "end": 2.5}
+    else:
+        question["options"] = [
+            {"option": f"{text} option {idx}", "is_correct_option": idx in correct} for idx in range(2)
+        ]
+    return question
+
+
+@pytest.fixture
+def create_paper(session) -> Callable:
+    """Create a draft paper of a new exam, with one section and one sub-section having the questions"""
+
+    async def _create_paper(questions: List[dict], name: str = "Paper") -> PapersModel:
+        unit_of_work = UnitOfWork.of(session)
+        (exam,) = await unit_of_work.get_service(ExamsService).create_bulk(
+            [ExamsCreateDatabaseSchema(name=f"Exam of {name}", description="Exam of the tests")]
+        )
+        paper_data = CBTRequestSchema.parse_obj(
+            {
+                "name": name,
+                "year": 2024,
+                "paper_set": "A",
+                "instructions": "Instructions",
+                "language": "English",
+                "settings": {"total_time": 60, "is_calculator_allowed": False, "calculator_type": "normal"},
+                "sections": [
+                    {
+                        "name": "Section",
+                        "section_time": 60,
+                        "sub_sections": [{"name": "Sub-section", "questions": questions}],
+                    }
+                ],
+            }
+        )
+        return await unit_of_work.get_service(PapersService).create_paper(exam.uuid, paper_data)
+
+    return _create_paper
+
+
+async def get_question_ids(session: AsyncSession, paper_id) -> list:
+    """UUIDs of the questions linked by the paper, in their order"""
+    result = await session.execute(
+        select(SubSectionQuestionsModel.question_id)
+        .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+        .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+        .where(SectionsModel.paper_id == paper_id)
+        .order_by(SubSectionQuestionsModel.order)
+    )
+    return list(result.scalars())
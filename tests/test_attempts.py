@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import select
+
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.models import OptionsModel, ResponsesModel
+from app.core.services.attempts import AttemptsService
+from app.core.services.autosave import responses_buffer
+from app.core.services.exams import PapersService
+from app.core.services.responses import ResponsesService
+from app.enums import AttemptStatusEnum, PapersStatusEnum
+from app.schemas import AttemptCreateSchema, CandidateResponseSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+from tests.conftest import build_question, get_question_ids
+
+
+async def start_attempts(session, create_paper, candidate_ids, questions=None):
+    """Publish a paper (by default of two MCQs, the second option is correct) and start an attempt of every candidate"""
+    paper = await create_paper(questions or [build_question("First"), build_question("Second")])
+    unit_of_work = UnitOfWork.of(session)
+    await unit_of_work.get_service(PapersService).update_status(paper.uuid, PapersStatusEnum.PUBLISHED)
+    attempts_service = unit_of_work.get_service(AttemptsService)
+    attempts = [
+        await attempts_service.create_attempt(AttemptCreateSchema(paper_id=paper.uuid, candidate_id=candidate_id))
+        for candidate_id in candidate_ids
+    ]
+    return paper, attempts_service, attempts
+
+
+async def get_options(session, question_id) -> list:
+    result = await session.scalars(
+        select(OptionsModel.uuid).where(OptionsModel.question_id == question_id).order_by(OptionsModel.option_order)
+    )
+    return list(result)
+
+
+async def test_submit_grades_pending_responses(session, create_paper):
+    paper, attempts_service, (attempt,) = await start_attempts(session, create_paper, ["candidate"])
+    first_id, second_id = await get_question_ids(session, paper.uuid)
+    first_options, second_options = await get_options(session, first_id), await get_options(session, second_id)
+
+    accepted = await attempts_service.save_responses(
+        attempt.uuid,
+        [
+            CandidateResponseSchema(question_id=first_id, selected_options=[first_options[1]]),
+            CandidateResponseSchema(question_id=second_id, selected_options=[second_options[0]]),
+        ],
+    )
+    assert accepted == 2
+
+    # Responses still in the buffer are written along with the submission and graded
+    submitted = await attempts_service.submit(attempt.uuid)
+    assert submitted.status == AttemptStatusEnum.SUBMITTED
+    assert submitted.score == 4.0 - 1.0
+    assert not responses_buffer.get_pending(attempt.uuid)
+    result = await session.scalars(select(ResponsesModel.question_id).where(ResponsesModel.attempt_id == attempt.uuid))
+    assert set(result) == {first_id, second_id}
+
+
+async def test_upsert_rejects_responses_of_submitted_attempts(session, create_paper):
+    paper, attempts_service, (submitted, in_progress) = await start_attempts(
+        session, create_paper, ["submitted", "in_progress"]
+    )
+    question_id, _ = await get_question_ids(session, paper.uuid)
+    await attempts_service.submit(submitted.uuid)
+
+    # Say autosaves flushed by another worker after the submission
+    responses = [
+        {
+            "attempt_id": attempt.uuid,
+            "question_id": question_id,
+            "selected_mask": 1,
+            "value": None,
+            "is_marked_for_review": False,
+            "time_spent": 10,
+            "sequence": 1,
+        }
+        for attempt in (submitted, in_progress)
+    ]
+    assert await UnitOfWork.of(session).get_service(ResponsesService).upsert_bulk(responses) == 1
+
+    result = await session.scalars(
+        select(ResponsesModel.attempt_id).where(ResponsesModel.attempt_id.in_([submitted.uuid, in_progress.uuid]))
+    )
+    assert list(result) == [in_progress.uuid]
+
+
+async def test_save_responses_rejects_mismatched_types(session, create_paper):
+    questions = [build_question("Single"), build_question("Multiple", "MSQ"), build_question("Value", "NAT")]
+    paper, attempts_service, (attempt,) = await start_attempts(session, create_paper, ["candidate"], questions)
+    mcq_id, msq_id, nat_id = await get_question_ids(session, paper.uuid)
+    mcq_options, msq_options = await get_options(session, mcq_id), await get_options(session, msq_id)
+
+    for response in (
+        CandidateResponseSchema(question_id=mcq_id, value=1.0),
+        CandidateResponseSchema(question_id=mcq_id, selected_options=mcq_options),
+        CandidateResponseSchema(question_id=nat_id, selected_options=mcq_options[:1]),
+    ):
+        with pytest.raises(DataLogicException):
+            await attempts_service.save_responses(attempt.uuid, [response])
+    assert not responses_buffer.get_pending(attempt.uuid)
+
+    accepted = await attempts_service.save_responses(
+        attempt.uuid,
+        [
+            CandidateResponseSchema(question_id=mcq_id, selected_options=mcq_options[1:]),
+            CandidateResponseSchema(question_id=msq_id, selected_options=msq_options),
+            CandidateResponseSchema(question_id=nat_id, value=2.0),
+        ],
+    )
+    assert accepted == 3
+    await responses_buffer.pop(attempt.uuid)
@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+from app.core.services.autosave import ResponsesWriteBehindBuffer
+
+
+def build_response(question_id, sequence: int, selected_mask: int = 1) -> dict:
+    return {
+        "question_id": question_id,
+        "selected_mask": selected_mask,
+        "value": None,
+        "is_marked_for_review": False,
+        "time_spent": 10,
+        "sequence": sequence,
+    }
+
+
+async def test_coalescing():
+    buffer = ResponsesWriteBehindBuffer(flush_interval=60, max_pending=3)
+    attempt_id, other_attempt_id = uuid4(), uuid4()
+    first_id, second_id = uuid4(), uuid4()
+
+    # A question answered many times is buffered once, with the response having the highest sequence
+    assert buffer.add(attempt_id, [build_response(first_id, 1), build_response(first_id, 3, selected_mask=4)]) == 2
+    assert buffer.add(attempt_id, [build_response(first_id, 2, selected_mask=2), build_response(second_id, 1)]) == 1
+    assert len(buffer) == 2
+    assert not buffer.flush_requested.is_set()
+    pending = {response["question_id"]: response for response in buffer.get_pending(attempt_id)}
+    assert (pending[first_id]["selected_mask"], pending[first_id]["attempt_id"]) == (4, attempt_id)
+
+    # A flush is requested once too many responses are pending
+    buffer.add(other_attempt_id, [build_response(first_id, 1)])
+    assert len(buffer) == 3
+    assert buffer.flush_requested.is_set()
+
+    # Popped responses are left to the caller, the responses of the other attempts stay
+    assert len(await buffer.pop(attempt_id)) == 2
+    assert (len(buffer), buffer.get_pending(attempt_id)) == (1, [])
+    assert len(buffer.get_pending(other_attempt_id)) == 1
+
+
+async def test_requeue_keeps_newer_responses():
+    buffer = ResponsesWriteBehindBuffer(flush_interval=60, max_pending=10)
+    attempt_id, question_id = uuid4(), uuid4()
+
+    # An autosave received during a failed flush is newer than the requeued response
+    buffer.add(attempt_id, [build_response(question_id, 5, selected_mask=8)])
+    buffer._requeue(
+        {attempt_id: {question_id: {**build_response(question_id, 4), "attempt_id": attempt_id}}},
+        ConnectionError("Database is down"),
+    )
+    assert len(buffer) == 1
+    assert [response["selected_mask"] for response in buffer.get_pending(attempt_id)] == [8]
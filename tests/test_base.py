@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.models import ExamsModel, SectionsModel, SubSectionQuestionsModel, SubSectionsModel
+from app.core.schemas.exams import ExamsCreateDatabaseSchema
+from app.core.services.exams import ExamsService, SubSectionQuestionsService
+from app.utils.exceptions.common_exceptions import UUIDNotFoundException
+from tests.conftest import build_question
+
+
+async def test_bulk_updates_synchronize_instances(session):
+    exams_service = UnitOfWork.of(session).get_service(ExamsService)
+    (exam,) = await exams_service.create_bulk([ExamsCreateDatabaseSchema(name="Synchronized", description="Exam")])
+    instance = await exams_service.get(exam.uuid)
+
+    await exams_service.update_bulk(filters=[ExamsModel.uuid == exam.uuid], updated_values={"is_active": True})
+    assert instance.is_active
+
+    # Soft deleted instances are not returned by the loaded records, and are returned again once restored
+    deleted_at = datetime.utcnow()
+    assert await exams_service.soft_delete_bulk([ExamsModel.uuid == exam.uuid], deleted_at) == [exam.uuid]
+    assert (instance.is_deleted, instance.deleted_at) == (True, deleted_at)
+    with pytest.raises(UUIDNotFoundException):
+        await exams_service.get(exam.uuid)
+
+    assert await exams_service.restore_bulk([ExamsModel.uuid == exam.uuid], deleted_at) == [exam.uuid]
+    assert (instance.is_deleted, instance.deleted_at) == (False, None)
+    assert await exams_service.get(exam.uuid) is instance
+
+
+async def test_update_from_values_synchronizes_instances(session, create_paper):
+    paper = await create_paper([build_question("First"), build_question("Second")])
+    result = await session.execute(
+        select(SubSectionQuestionsModel.uuid)
+        .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+        .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+        .where(SectionsModel.paper_id == paper.uuid)
+    )
+    service = UnitOfWork.of(session).get_service(SubSectionQuestionsService)
+    instances = await service.get_by_uuids(list(result.scalars()))
+
+    updated_count = await service.update_from_values(
+        [{"uuid": instance.uuid, "positive_marks": 2.0 + idx} for idx, instance in enumerate(instances)]
+    )
+    assert updated_count == len(instances) == 2
+    assert [instance.positive_marks for instance in instances] == [2.0, 3.0]
+
+
+async def test_expired_records_are_refreshed(session):
+    unit_of_work = UnitOfWork.of(session)
+    exams_service = unit_of_work.get_service(ExamsService)
+    (exam,) = await exams_service.create_bulk([ExamsCreateDatabaseSchema(name="Refreshed", description="Exam")])
+    instance = await exams_service.get(exam.uuid)
+
+    # Written on the table, say by a statement of another service, the loaded instance is not changed
+    table = ExamsModel.__table__
+    await session.execute(update(table).where(table.c.uuid == exam.uuid).values(description="Changed"))
+    assert instance.description == "Exam"
+
+    unit_of_work.expire(ExamsModel)
+    assert await exams_service.get(exam.uuid) is instance
+    assert instance.description == "Changed"
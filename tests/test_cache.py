@@ -0,0 +1,39 @@
+from uuid import uuid4
+
+from app.core.cache import NO_EXPIRY, LocalCache
+
+
+def test_tag_eviction():
+    cache = LocalCache(name="tests", max_size=10)
+    paper_id, other_paper_id = uuid4(), uuid4()
+    cache.set(("cbt", paper_id), "content", tags=[paper_id])
+    cache.set(("solution", paper_id), "solution", tags=[paper_id])
+    cache.set(("cbt", other_paper_id), "other content", tags=[other_paper_id])
+
+    # Only the entries of the paper are evicted
+    assert cache.evict_tag(paper_id) == 2
+    assert cache.get(("cbt", paper_id)) is None
+    assert cache.get(("cbt", other_paper_id)) == "other content"
+    assert cache.evict_tag(paper_id) == 0
+
+    # An entry set again under a key is no longer tagged with the tags of the previous entry
+    cache.set(("cbt", other_paper_id), "replaced", tags=[paper_id])
+    assert cache.evict_tag(other_paper_id) == 0
+    assert cache.evict_tag(paper_id) == 1
+    assert len(cache) == 0
+
+
+def test_expiry_and_size():
+    cache = LocalCache(name="tests", max_size=2, ttl=-1)
+    cache.set("expired", 1)
+    cache.set("kept", 2, ttl=NO_EXPIRY)
+    assert cache.get("expired") is None
+    assert cache.get("kept") == 2
+
+    # The least recently used entries are removed first, along with their tags
+    tag = uuid4()
+    cache.set("first", 1, tags=[tag], ttl=NO_EXPIRY)
+    cache.get("kept")
+    cache.set("second", 2, ttl=NO_EXPIRY)
+    assert (cache.get("first"), cache.get("kept"), cache.get("second")) == (None, 2, 2)
+    assert cache.evict_tag(tag) == 0
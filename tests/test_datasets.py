@@ -0,0 +1,28 @@
+from uuid import uuid4
+
+from app.core.models.questions import OptionsModel, QuestionsModel, RangeAnswersModel
+from benchmarks.datasets import PAPER_SHAPES, DatasetGenerator
+
+
+def test_papers_are_seeded():
+    paper = DatasetGenerator(7).paper("jee_main")
+    assert paper == DatasetGenerator(7).paper("jee_main")
+    assert paper != DatasetGenerator(8).paper("jee_main")
+
+    # The paper has the shape of the exam, 20 MCQs and 10 NATs in each of the three sections
+    assert [len(section.sub_sections) for section in paper.sections] == [2] * len(PAPER_SHAPES["jee_main"]["sections"])
+    assert [len(sub_section.questions) for sub_section in paper.sections[0].sub_sections] == [20, 10]
+
+
+def test_question_bank_rows():
+    subject_uuids, language_uuid = {"Physics": uuid4(), "Chemistry": uuid4()}, uuid4()
+    batches = list(DatasetGenerator(7).question_bank_rows(25, subject_uuids, language_uuid, batch_size=10))
+    assert [len(rows[QuestionsModel]) for rows in batches] == [10, 10, 5]
+    assert batches == list(DatasetGenerator(7).question_bank_rows(25, subject_uuids, language_uuid, batch_size=10))
+
+    # Every question has its options or answer range
+    for rows in batches:
+        answered = {row["question_id"] for row in rows[OptionsModel]} | {
+            row["question_id"] for row in rows[RangeAnswersModel]
+        }
+        assert answered == {row["uuid"] for row in rows[QuestionsModel]}
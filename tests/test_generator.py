@@ -0,0 +1,73 @@
+import random
+from uuid import uuid4
+
+import pytest
+
+from app.core.services.generator import PaperGeneratorService
+from app.core.services.question_bank import DifficultyBucket
+from app.enums import QuestionTypeEnum
+from app.schemas import BlueprintSubSectionSchema, DifficultyBandSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+
+SUB_SECTION = BlueprintSubSectionSchema(
+    name="Mechanics", subject="Physics", question_types={QuestionTypeEnum.MCQ: 1}, positive_marks=4.0
+)
+
+
+def build_buckets(difficulties) -> tuple:
+    """Buckets of the index with a question for each difficulty, along with the difficulty of every question"""
+    buckets, question_difficulties = {}, {}
+    for difficulty in difficulties:
+        question_uuid = uuid4()
+        buckets.setdefault(difficulty // 100, DifficultyBucket()).add(question_uuid, difficulty)
+        question_difficulties[question_uuid] = difficulty
+    for bucket in buckets.values():
+        bucket.sort()
+    return buckets, question_difficulties
+
+
+def sample(pool, count, exclude=(), tagged_questions=None, seed=0) -> list:
+    return PaperGeneratorService._sample(
+        pool, count, set(exclude), tagged_questions, random.Random(seed), SUB_SECTION, QuestionTypeEnum.MCQ
+    )
+
+
+def test_allocate():
+    bands = [DifficultyBandSchema(start=0, end=100, weight=1), DifficultyBandSchema(start=100, end=200, weight=2)]
+    assert PaperGeneratorService._allocate(3, bands) == [1, 2]
+    # The remaining question goes to the band with the largest fractional part
+    assert PaperGeneratorService._allocate(4, bands) == [1, 3]
+    assert PaperGeneratorService._allocate(0, bands) == [0, 0]
+
+
+def test_sample_within_band():
+    buckets, difficulties = build_buckets([*range(100, 200, 10), *range(200, 300, 10)])
+    band = DifficultyBandSchema(start=150, end=230)
+    ((pool, count),) = PaperGeneratorService._get_pools(buckets, [band], 6)
+
+    # The buckets at the edges of the band are clamped to its exact range
+    assert count == 6
+    assert sum(end - start for _, start, end in pool) == 8
+    sampled = sample(pool, count)
+    assert len(set(sampled)) == 6
+    assert all(150 <= difficulties[question_uuid] < 230 for question_uuid in sampled)
+
+    with pytest.raises(DataLogicException):
+        sample(pool, 9)
+
+
+def test_sample_filters():
+    buckets, difficulties = build_buckets(range(0, 100, 5))
+    ((pool, _),) = PaperGeneratorService._get_pools(buckets, [], 4)
+    question_uuids = list(difficulties)
+
+    # Excluded and untagged questions are skipped
+    tagged_questions = set(question_uuids[:6])
+    sampled = sample(pool, 4, exclude=question_uuids[:2], tagged_questions=tagged_questions)
+    assert set(sampled) == set(question_uuids[2:6])
+    with pytest.raises(DataLogicException):
+        sample(pool, 5, exclude=question_uuids[:2], tagged_questions=tagged_questions)
+
+    # Samples depend on the seed alone
+    assert sample(pool, 10, seed=7) == sample(pool, 10, seed=7)
+    assert sorted(sample(pool, 20)) == sorted(question_uuids)
@@ -0,0 +1,27 @@
+from app.core.cache import papers_cache
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.invalidation import invalidation_bus
+from app.core.services.exams import ExamsService, PapersService
+from app.enums import PapersStatusEnum
+from tests.conftest import build_question
+
+
+async def test_invalidated_entities_are_watched(session, create_paper, monkeypatch):
+    paper = await create_paper([build_question("Cached")])
+    papers_cache.set(("cbt", paper.uuid), "cached", tags=[paper.uuid])
+    invalidated = []
+    invalidate = invalidation_bus.invalidate
+
+    def record(session, entity, uuids=None):
+        invalidated.append(entity)
+        invalidate(session, entity, uuids)
+
+    monkeypatch.setattr(invalidation_bus, "invalidate", record)
+    unit_of_work = UnitOfWork.of(session)
+    await unit_of_work.get_service(ExamsService).update_active_status(paper.exam_id, True)
+    await unit_of_work.get_service(PapersService).update_status(paper.uuid, PapersStatusEnum.ARCHIVED)
+
+    # Nothing is cached by exam, the papers are invalidated and evicted by their watchers
+    assert invalidated == ["papers"]
+    assert invalidation_bus._watchers.get("papers")
+    assert papers_cache.get(("cbt", paper.uuid)) is None
@@ -0,0 +1,77 @@
+import math
+from uuid import uuid4
+
+import pytest
+
+from app.core.services.packing import AnswerKey, PaperLayout, ResponseSheet
+from app.schemas import CBTQuestionsResponseSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+
+
+def build_question(question_type: str, options: int = 0, marks: float = 4.0) -> CBTQuestionsResponseSchema:
+    return CBTQuestionsResponseSchema.parse_obj(
+        {
+            "uuid": uuid4(),
+            "question": f"{question_type} question",
+            "question_type": question_type,
+            "content_type": "normal",
+            "options": [{"uuid": uuid4(), "option": f"Option {idx}"} for idx in range(options)],
+            "positive_marks": marks,
+            "negative_marks": 1.0,
+        }
+    )
+
+
+@pytest.fixture
+def paper():
+    """Layout, answer key and questions of a paper having a MCQ and a MSQ in the first section and a NAT in the second"""
+    mcq, msq, nat = build_question("MCQ", 4), build_question("MSQ", 4), build_question("NAT", marks=3.0)
+    layout = PaperLayout(uuid4(), [[mcq, msq], [nat]])
+    solution = {
+        mcq.uuid: [mcq.options[2].uuid],
+        msq.uuid: [msq.options[0].uuid, msq.options[3].uuid],
+        nat.uuid: [-0.5, 0.5],
+    }
+    return layout, AnswerKey.build(layout, [mcq, msq, nat], solution), (mcq, msq, nat)
+
+
+def test_options_round_trip(paper):
+    layout, _, (_, msq, _) = paper
+    option_ids = [msq.options[3].uuid, msq.options[1].uuid]
+    mask = layout.encode_options(msq.uuid, option_ids)
+    assert mask == 0b1010
+    assert layout.decode_options(msq.uuid, mask) == [msq.options[1].uuid, msq.options[3].uuid]
+
+    with pytest.raises(DataLogicException):
+        layout.encode_options(msq.uuid, [uuid4()])
+
+
+def test_packing_round_trip(paper):
+    layout, answer_key, (mcq, msq, nat) = paper
+    sheet = ResponseSheet.from_responses(layout, [(mcq.uuid, 0b100, None), (nat.uuid, None, 0.0), (uuid4(), 1, None)])
+    assert list(ResponseSheet.from_bytes(sheet.to_bytes()).answers)[::2] == [4.0, 0.0]
+    assert math.isnan(sheet.answers[1])
+
+    payload = answer_key.to_bytes()
+    assert len(payload) == 8 * 4 * len(layout)
+    for unpacked in (AnswerKey.from_bytes(payload), AnswerKey.from_buffer(memoryview(payload))):
+        assert unpacked.to_bytes() == payload
+        assert list(unpacked.positive_marks) == [4.0, 4.0, 3.0]
+
+
+def test_grade(paper):
+    layout, answer_key, (mcq, msq, nat) = paper
+
+    # MSQ needs every correct option and nothing else, NAT needs a value within the range
+    sheet = ResponseSheet.from_responses(
+        layout, [(mcq.uuid, 0b100, None), (msq.uuid, 0b0001, None), (nat.uuid, None, 0.5)]
+    )
+    score = answer_key.grade(sheet, layout)
+    assert (score.score, score.correct, score.incorrect, score.unattempted) == (6.0, 2, 1, 0)
+    assert score.section_scores == [3.0, 3.0]
+
+    # Empty selections are not attempted, the section scores are computed only along with the layout
+    sheet = ResponseSheet.from_responses(layout, [(mcq.uuid, 0, None), (msq.uuid, 0b1001, None), (nat.uuid, None, 1)])
+    score = answer_key.grade(sheet)
+    assert (score.score, score.correct, score.incorrect, score.unattempted) == (3.0, 1, 1, 1)
+    assert score.section_scores == []
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import select
+
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.models import OptionsModel, QuestionsModel, SectionsModel, SubSectionQuestionsModel, SubSectionsModel
+from app.core.services.exams import PapersService
+from app.schemas import CBTPaperCloneSchema, CBTQuestionBatchUpdateSchema
+from app.utils.exceptions.common_exceptions import DataLogicException
+from tests.conftest import build_question, get_question_ids
+
+
+async def get_links(session, paper_id) -> list:
+    """Question, marks and text of the questions linked by the paper, in their order"""
+    result = await session.execute(
+        select(
+            SubSectionQuestionsModel.question_id,
+            SubSectionQuestionsModel.positive_marks,
+            SubSectionQuestionsModel.negative_marks,
+            QuestionsModel.question,
+        )
+        .join(QuestionsModel, QuestionsModel.uuid == SubSectionQuestionsModel.question_id)
+        .join(SubSectionsModel, SubSectionsModel.uuid == SubSectionQuestionsModel.sub_section_id)
+        .join(SectionsModel, SectionsModel.uuid == SubSectionsModel.section_id)
+        .where(SectionsModel.paper_id == paper_id)
+        .order_by(SubSectionQuestionsModel.order)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def get_options(session, question_id) -> list:
+    result = await session.execute(
+        select(OptionsModel.option, OptionsModel.is_correct_option)
+        .where(OptionsModel.question_id == question_id)
+        .order_by(OptionsModel.option_order)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def test_clone_paper(session, create_paper):
+    paper = await create_paper([build_question("First"), build_question("Second", marks=2.0)])
+    papers_service = UnitOfWork.of(session).get_service(PapersService)
+    clone = await papers_service.clone_paper(paper.uuid, CBTPaperCloneSchema(name="Clone", paper_set="B"))
+
+    # The values not passed are taken from the paper, the clone links the same questions with the same marks
+    assert (clone.name, clone.year, clone.paper_set, clone.exam_id) == ("Clone", paper.year, "B", paper.exam_id)
+    assert clone.uuid != paper.uuid
+    assert await get_links(session, clone.uuid) == await get_links(session, paper.uuid)
+
+
+async def test_update_questions(session, create_paper):
+    paper = await create_paper([build_question("Shared"), build_question("Own"), build_question("Marks")])
+    shared_id, own_id, marks_id = await get_question_ids(session, paper.uuid)
+    papers_service = UnitOfWork.of(session).get_service(PapersService)
+    clone = await papers_service.clone_paper(paper.uuid, CBTPaperCloneSchema(name="Clone"))
+
+    # The clone gets its own copy of the second question, which is then edited through versions
+    response = await papers_service.update_questions(
+        clone.uuid, [CBTQuestionBatchUpdateSchema(question_id=own_id, question="Own edited")]
+    )
+    assert (response.questions, response.forked) == (1, 1)
+    _, own_fork_id, _ = await get_question_ids(session, clone.uuid)
+    assert own_fork_id != own_id
+
+    # A shared question is forked, a question of the clone alone gets a new version and the marks are set on the links
+    response = await papers_service.update_questions(
+        clone.uuid,
+        [
+            CBTQuestionBatchUpdateSchema(question_id=shared_id, question="Shared edited", difficulty=700),
+            CBTQuestionBatchUpdateSchema(question_id=own_fork_id, question="Own edited again"),
+            CBTQuestionBatchUpdateSchema(question_id=marks_id, positive_marks=3.0, negative_marks=0.5),
+        ],
+    )
+    assert (response.questions, response.marks, response.forked) == (3, 1, 1)
+
+    shared_fork, own_version, marks_link = await get_links(session, clone.uuid)
+    assert shared_fork[0] not in (shared_id, own_fork_id, marks_id)
+    assert shared_fork[1:] == (4.0, 1.0, "Shared edited")
+    assert own_version[1:] == (4.0, 1.0, "Own edited again")
+    assert marks_link == (marks_id, 3.0, 0.5, "Marks")
+
+    result = await session.execute(
+        select(QuestionsModel.uuid, QuestionsModel.root_id, QuestionsModel.version, QuestionsModel.difficulty).where(
+            QuestionsModel.uuid.in_([shared_fork[0], own_version[0], own_fork_id])
+        )
+    )
+    questions = {row.uuid: row for row in result.all()}
+    assert (questions[shared_fork[0]].root_id, questions[shared_fork[0]].difficulty) == (None, 700)
+    assert (questions[own_version[0]].root_id, questions[own_version[0]].version) == (own_fork_id, 2)
+    assert questions[own_fork_id].version == 1
+
+    # Answers are copied along with the questions
+    assert await get_options(session, shared_fork[0]) == await get_options(session, shared_id)
+    assert await get_options(session, own_version[0]) == await get_options(session, own_id)
+
+    # The source paper is not changed by the edits of the clone
+    assert await get_links(session, paper.uuid) == [
+        (shared_id, 4.0, 1.0, "Shared"),
+        (own_id, 4.0, 1.0, "Own"),
+        (marks_id, 4.0, 1.0, "Marks"),
+    ]
+
+
+async def test_update_questions_duplicates(session, create_paper):
+    paper = await create_paper([build_question("Duplicate")])
+    (question_id,) = await get_question_ids(session, paper.uuid)
+
+    with pytest.raises(DataLogicException):
+        await UnitOfWork.of(session).get_service(PapersService).update_questions(
+            paper.uuid,
+            [
+                CBTQuestionBatchUpdateSchema(question_id=question_id, question="First"),
+                CBTQuestionBatchUpdateSchema(question_id=question_id, positive_marks=2.0),
+            ],
+        )
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.core.db.unit_of_work import UnitOfWork
+from app.core.models import OptionsModel, QuestionsModel, QuestionTagsModel
+from app.core.services.questions import QuestionsService
+from app.utils.exceptions.common_exceptions import DataLogicException
+from tests.conftest import build_question, get_question_ids
+
+
+async def test_create_versions(session, create_paper):
+    paper = await create_paper([build_question("Edited"), build_question("Kept")])
+    edited_id, kept_id = await get_question_ids(session, paper.uuid)
+    questions_service = UnitOfWork.of(session).get_service(QuestionsService)
+
+    versions = await questions_service.create_versions([edited_id])
+    assert list(versions) == [edited_id]
+    version_id = versions[edited_id]
+
+    result = await session.execute(
+        select(QuestionsModel.uuid, QuestionsModel.root_id, QuestionsModel.version, QuestionsModel.is_latest).where(
+            QuestionsModel.uuid.in_([edited_id, kept_id, version_id])
+        )
+    )
+    rows = {row.uuid: row for row in result.all()}
+    # The previous version is kept, the new version is the latest one of the same root
+    assert (rows[edited_id].root_id, rows[edited_id].version, rows[edited_id].is_latest) == (None, 1, False)
+    assert (rows[version_id].root_id, rows[version_id].version, rows[version_id].is_latest) == (edited_id, 2, True)
+    assert rows[kept_id].is_latest
+
+    # Options and tags are copied to the new version
+    result = await session.execute(
+        select(OptionsModel.question_id, OptionsModel.option, OptionsModel.is_correct_option)
+        .where(OptionsModel.question_id.in_([edited_id, version_id]))
+        .order_by(OptionsModel.option_order)
+    )
+    options = result.all()
+    assert [option[1:] for option in options if option.question_id == version_id] == [
+        option[1:] for option in options if option.question_id == edited_id
+    ]
+    result = await session.execute(
+        select(func.count()).where(QuestionTagsModel.question_id == version_id).select_from(QuestionTagsModel)
+    )
+    assert result.scalar_one() == 1
+
+    # Versions are added to the latest version only, the next version is the third one of the root
+    with pytest.raises(DataLogicException):
+        await questions_service.create_versions([edited_id])
+    next_versions = await questions_service.create_versions([version_id])
+    result = await session.execute(
+        select(QuestionsModel.root_id, QuestionsModel.version).where(QuestionsModel.uuid == next_versions[version_id])
+    )
+    assert tuple(result.one()) == (edited_id, 3)
@@ -0,0 +1,50 @@
+import random
+
+from app.core.services.ranking import FenwickTree, ScoreDistribution, ScoreScale
+
+
+def test_fenwick_tree_prefix_sums():
+    rng = random.Random(0)
+    counts = [0] * 37
+    tree = FenwickTree(len(counts))
+    for _ in range(200):
+        idx, delta = rng.randrange(len(counts)), rng.randint(-2, 5)
+        counts[idx] += delta
+        tree.add(idx, delta)
+    assert [tree.prefix_sum(idx) for idx in range(len(counts))] == [
+        sum(counts[: idx + 1]) for idx in range(len(counts))
+    ]
+
+
+def test_score_scale():
+    # Marks of 4, 2.5 and -1 / -0.5 are multiples of 0.5, the scores go from -1.5 to 6.5
+    scale = ScoreScale([4.0, 2.5], [1.0, 0.5])
+    assert (scale.granularity, scale.minimum, scale.size) == (0.5, -1.5, 17)
+    assert [scale.get_bucket(score) for score in (-1.5, 0.0, 3.5, 6.5)] == [0, 3, 10, 16]
+    assert all(scale.get_score(scale.get_bucket(score)) == score for score in (-1.5, 0.0, 3.5, 6.5))
+
+    # Scores out of the scale are clamped to its ends, a paper without marks has a single score
+    assert (scale.get_bucket(-10.0), scale.get_bucket(10.0)) == (0, 16)
+    assert ScoreScale([], []).size == 1
+
+    # Fractions such as a third of a mark are kept exact
+    assert ScoreScale([1.0, 1 / 3], []).size == 5
+
+
+def test_score_distribution_ranks():
+    distribution = ScoreDistribution(ScoreScale([4.0] * 5, [1.0] * 5))
+    assert distribution.get_rank(10.0) == (1, 100.0)
+
+    scores = [20.0, 15.0, 15.0, 7.0, -3.0]
+    for score in scores:
+        distribution.add(score)
+
+    # Same scores share a rank, the percentile counts the scores that are the same or lower
+    assert [distribution.get_rank(score) for score in scores] == [
+        (1, 100.0),
+        (2, 80.0),
+        (2, 80.0),
+        (4, 40.0),
+        (5, 20.0),
+    ]
+    assert distribution.get_rank(8.0) == (4, 40.0)
@@ -0,0 +1,30 @@
+from app.core.readiness import Readiness
+
+
+async def test_retry_failed_stages():
+    readiness = Readiness()
+    calls = []
+
+    async def recover():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ConnectionRefusedError("Database is down")
+
+    async def warm_up():
+        raise ConnectionRefusedError("Database is down")
+
+    readiness.begin()
+    assert not await readiness.run_stage("attempt_timers", recover, timeout=1)
+    assert not await readiness.run_stage("papers_cache", warm_up, timeout=1, required=False)
+    readiness.finish()
+
+    # Failed optional stages are done, the failed required ones keep the worker from being ready until they succeed
+    assert not readiness.is_ready
+    assert readiness.to_dict()["stages"]["papers_cache"]["done"]
+    await readiness.retry()
+    assert readiness.is_ready
+    assert calls == [0, 1]
+
+    # Stages that are done are not run again
+    await readiness.retry()
+    assert calls == [0, 1]
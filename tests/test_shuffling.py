@@ -0,0 +1,112 @@
+from uuid import uuid4
+
+from app.core.services.shuffling import CandidateShuffler
+from app.schemas import CBTResponseSchema, CBTSkeletonSchema
+
+
+def build_paper() -> CBTResponseSchema:
+    """Paper of a section with a sub-section of six MCQs having four options and a NAT"""
+    questions = [
+        {
+            "uuid": uuid4(),
+            "question": f"Question {idx}",
+            "question_type": "MCQ",
+            "content_type": "normal",
+            "options": [{"uuid": uuid4(), "option": f"Option {idx}.{option_idx}"} for option_idx in range(4)],
+            "positive_marks": 4.0,
+            "negative_marks": 1.0,
+        }
+        for idx in range(6)
+    ]
+    questions.append(
+        {
+            "uuid": uuid4(),
+            "question": "Value",
+            "question_type": "NAT",
+            "content_type": "normal",
+            "positive_marks": 4.0,
+            "negative_marks": 0.0,
+        }
+    )
+    return CBTResponseSchema.parse_obj(
+        {
+            "uuid": uuid4(),
+            "name": "Paper",
+            "instructions": "Instructions",
+            "language": "English",
+            "settings": {"total_time": 60, "is_calculator_allowed": False, "calculator_type": "normal"},
+            "sections": [
+                {
+                    "uuid": uuid4(),
+                    "name": "Section",
+                    "section_time": 60,
+                    "sub_sections": [{"uuid": uuid4(), "name": "Sub-section", "questions": questions}],
+                }
+            ],
+        }
+    )
+
+
+def test_permutations():
+    key = uuid4()
+    permutation = CandidateShuffler("candidate").get_permutation(10, key)
+    assert sorted(permutation) == list(range(10))
+
+    # The same candidate always gets the same order, other candidates get their own
+    assert CandidateShuffler("candidate").get_permutation(10, key) == permutation
+    assert CandidateShuffler("other").get_permutation(10, key) != permutation
+    assert CandidateShuffler("candidate").get_permutation(10, uuid4()) != permutation
+
+    items = [f"Item {idx}" for idx in range(10)]
+    shuffled = CandidateShuffler.apply(items, permutation)
+    assert CandidateShuffler.apply(shuffled, CandidateShuffler.invert(permutation)) == items
+
+
+def test_shuffle_paper():
+    paper = build_paper()
+    original = paper.copy(deep=True)
+    shuffler = CandidateShuffler("candidate")
+    shuffled = shuffler.shuffle_paper(paper)
+    permutation = shuffler.get_paper_permutation(paper)
+    assert paper == original
+
+    (sub_section,), (shuffled_sub_section,) = paper.sections[0].sub_sections, shuffled.sections[0].sub_sections
+    inverse = permutation.inverse_questions[sub_section.uuid]
+    assert shuffled_sub_section.questions != sub_section.questions
+    assert [shuffled_sub_section.questions[position].uuid for position in inverse] == [
+        question.uuid for question in sub_section.questions
+    ]
+
+    # The options are un-shuffled with the inverse of their permutation, a NAT has no options to shuffle
+    for question in shuffled_sub_section.questions:
+        original_question = next(item for item in sub_section.questions if item.uuid == question.uuid)
+        if not question.options:
+            assert question.uuid not in permutation.options
+            continue
+        assert [question.options[position] for position in permutation.inverse_options[question.uuid]] == (
+            original_question.options
+        )
+
+    # The skeleton lists the questions in the order of the shuffled paper
+    skeleton = CBTSkeletonSchema.parse_obj(
+        {
+            **paper.dict(exclude={"sections"}),
+            "sections": [
+                {
+                    "uuid": paper.sections[0].uuid,
+                    "name": "Section",
+                    "section_time": 60,
+                    "sub_sections": [
+                        {
+                            "uuid": sub_section.uuid,
+                            "name": "Sub-section",
+                            "questions": [question.uuid for question in sub_section.questions],
+                        }
+                    ],
+                }
+            ],
+        }
+    )
+    assert shuffler.shuffle_skeleton(skeleton).sections[0].sub_sections[0].questions == [
+        question.uuid for question in shuffled_sub_section.questions
+    ]